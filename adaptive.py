@@ -0,0 +1,199 @@
+# Visage
+# a color game by Conor Eager
+# Adaptive difficulty: instead of the difference between the colors shrinking at a set rate as the levels go up,
+# each puzzle's difference is chosen to learn as much as possible about the player, so the game finds the smallest
+# difference they can see (their threshold) in a handful of clicks, and then keeps them at the edge of it.
+# This module doesn't use Tk, so it can be used without a display.
+#
+# This is the Psi method (Kontsevich & Tyler, 1999), estimating the threshold only ("Psi-marginal", Prins 2013).
+# The chance of a correct click at a difference x (on a log10 scale) is modelled as a Weibull curve:
+#   P(correct) = guess + (1 - guess - LAPSE) * (1 - exp(-10^(slope * (x - threshold))))
+# where guess is the chance of clicking the different cell by luck (1 in the number of cells). Every possible
+# (threshold, slope) pair is kept on a grid with how likely it is (the posterior); each click multiplies it by the
+# chance of what happened. The next difference is the one whose result is expected to leave the least uncertainty
+# (entropy) about the threshold.
+#
+# NumPy is used to score every difference against the whole grid at once if it's installed. Without it, a smaller
+# grid is scored in pure Python, which is less precise, but still takes only a few milliseconds.
+
+# IMPORTS
+# Import math for the pure Python version of the calculations
+import math
+
+# Import NumPy for scoring the whole grid at once, if it's installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# CONSTANTS
+
+# The chance of a player missing a difference they can see (e.g. a slip of the mouse).
+LAPSE = 0.02
+
+# The number of differences to choose from, thresholds and slopes on the grid, with and without NumPy.
+CANDIDATES = 48
+THRESHOLDS = 81
+SLOPES = 10
+PYTHON_CANDIDATES = 16
+PYTHON_THRESHOLDS = 31
+PYTHON_SLOPES = 4
+
+# The range of slopes on the grid (how sharply the chance of seeing a difference rises, per factor of 10).
+MIN_SLOPE = 1.0
+MAX_SLOPE = 16.0
+
+# How far (in factors of 10) the thresholds on the grid go beyond the differences that can be shown, so players
+# who can see every difference (or none) still get a sensible estimate.
+MARGIN = 0.5
+
+# CLASSES
+
+
+class AdaptiveGenerator:
+    """This class generates Puzzles at the difference that will tell the most about the player.
+    It wraps a colors.PuzzleGenerator or perceptual.PerceptualGenerator (which draws the colors), and can be
+    used anywhere they can. The game tells it whether each puzzle was solved with observe().
+    """
+
+    def __init__(self, generator, low, high, whole=False):
+        """Create an AdaptiveGenerator.
+
+        Args:
+            generator (colors.PuzzleGenerator or perceptual.PerceptualGenerator): The generator to draw puzzles with,
+            through its generate_at() method.
+            low (float): The smallest difference it can show.
+            high (float): The largest difference it can show.
+            whole (bool, optional): Whether differences must be whole numbers (e.g. steps in an RGB component).
+            Defaults to False.
+        """
+        self.generator = generator
+        count = CANDIDATES if numpy is not None else PYTHON_CANDIDATES
+        intensities = [low * (high / low) ** (i / (count - 1)) for i in range(count)]
+        if (whole):
+            intensities = sorted(set(max(1, round(value)) for value in intensities))
+        # The differences to choose from, and their logarithms.
+        self.intensities = intensities
+        log_intensities = [math.log10(value) for value in intensities]
+
+        # The grid of thresholds (as logarithms) and slopes.
+        count = THRESHOLDS if numpy is not None else PYTHON_THRESHOLDS
+        start, end = log_intensities[0] - MARGIN, log_intensities[-1] + MARGIN
+        self.thresholds = [start + (end - start) * i / (count - 1) for i in range(count)]
+        count = SLOPES if numpy is not None else PYTHON_SLOPES
+        slopes = [MIN_SLOPE * (MAX_SLOPE / MIN_SLOPE) ** (i / (count - 1)) for i in range(count)]
+
+        # The chance of the player seeing each difference, for every threshold & slope, before guessing & lapses.
+        # Every threshold & slope starts equally likely.
+        if (numpy is not None):
+            x = numpy.array(log_intensities)[:, None, None]
+            threshold = numpy.array(self.thresholds)[None, :, None]
+            slope = numpy.array(slopes)[None, None, :]
+            self.seen = 1 - numpy.exp(-numpy.power(10.0, slope * (x - threshold)))
+            self.posterior = numpy.full(
+                (len(self.thresholds), len(slopes)), 1 / (len(self.thresholds) * len(slopes)))
+        else:
+            # Kept flat, threshold by threshold, with each cell's threshold number alongside.
+            self.cell_thresholds = [t for t in range(len(self.thresholds)) for s in slopes]
+            self.seen = [[1 - math.exp(-10.0 ** min(300.0, slope * (x - threshold)))
+                          for threshold in self.thresholds for slope in slopes]
+                         for x in log_intensities]
+            self.posterior = [1 / len(self.cell_thresholds)] * len(self.cell_thresholds)
+
+        # The puzzle waiting for a result: (the difference's index, the chance of guessing it).
+        self.waiting = None
+        # The number of results so far.
+        self.trials = 0
+
+    def generate(self, level, difficulty):
+        """Generate the puzzle for a level. The difference between the colors is chosen adaptively,
+        so the difficulty setting isn't used for it (it still sets the lives and the score).
+
+        Args:
+            level (int): The current game level (the number of rows and columns in the grid).
+            difficulty (float): The difficulty setting.
+
+        Returns:
+            colors.Puzzle: The new puzzle.
+        """
+        guess = 1 / (level * level)
+        index = self.choose(guess)
+        self.waiting = (index, guess)
+        return self.generator.generate_at(level, self.intensities[index])
+
+    def choose(self, guess):
+        """Choose the difference expected to leave the least uncertainty about the threshold.
+
+        Args:
+            guess (float): The chance of clicking the different cell by luck.
+
+        Returns:
+            int: The index of the difference in self.intensities.
+        """
+        if (numpy is not None):
+            correct = self.posterior * (guess + (1 - guess - LAPSE) * self.seen)
+            wrong = self.posterior - correct
+            # Over both results, the expected entropy of the threshold afterwards is
+            # sum(P(result) log P(result)) - sum(P(result, threshold) log P(result, threshold)).
+            expected = numpy.zeros(len(self.intensities))
+            for joint in (correct, wrong):
+                marginal = joint.sum(axis=2)
+                total = marginal.sum(axis=1)
+                expected += total * numpy.log(numpy.maximum(total, 1e-300))
+                expected -= (marginal * numpy.log(numpy.maximum(marginal, 1e-300))).sum(axis=1)
+            return int(numpy.argmin(expected))
+
+        best, best_entropy = 0, math.inf
+        scale = 1 - guess - LAPSE
+        for index, seen in enumerate(self.seen):
+            correct = [0.0] * len(self.thresholds)
+            wrong = [0.0] * len(self.thresholds)
+            for threshold, probability, chance in zip(self.cell_thresholds, self.posterior, seen):
+                right = probability * (guess + scale * chance)
+                correct[threshold] += right
+                wrong[threshold] += probability - right
+            entropy = 0.0
+            for marginal in (correct, wrong):
+                total = sum(marginal)
+                if (total > 0):
+                    entropy += total * math.log(total)
+                entropy -= sum(p * math.log(p) for p in marginal if p > 0)
+            if (entropy < best_entropy):
+                best, best_entropy = index, entropy
+        return best
+
+    def observe(self, puzzle, correct):
+        """Update the estimate with the result of the last puzzle generated.
+
+        Args:
+            puzzle (colors.Puzzle): The puzzle that was clicked.
+            correct (bool): Whether the click was on the different cell.
+        """
+        if (self.waiting is None):
+            return
+        index, guess = self.waiting
+        self.waiting = None
+        self.trials += 1
+        scale = 1 - guess - LAPSE
+        if (numpy is not None):
+            chance = guess + scale * self.seen[index]
+            self.posterior *= chance if correct else 1 - chance
+            self.posterior /= self.posterior.sum()
+        else:
+            posterior = [probability * (guess + scale * seen if correct else 1 - guess - scale * seen)
+                         for probability, seen in zip(self.posterior, self.seen[index])]
+            total = sum(posterior)
+            self.posterior = [probability / total for probability in posterior]
+
+    def threshold(self):
+        """Get the current estimate of the player's threshold: the difference they see about two thirds of the time.
+
+        Returns:
+            float: The difference, in the same units as the differences shown.
+        """
+        if (numpy is not None):
+            marginal = self.posterior.sum(axis=1)
+            return 10 ** float(numpy.dot(marginal, self.thresholds))
+        mean = sum(probability * self.thresholds[threshold]
+                   for threshold, probability in zip(self.cell_thresholds, self.posterior))
+        return 10 ** mean
@@ -0,0 +1,515 @@
+# Visage
+# a color game by Conor Eager
+# Session analytics: running statistics across every game played (reaction times for each level, accuracy and the
+# level reached at each difficulty), updated as each click and game happens rather than worked out from the history.
+# Distributions are kept in quantile sketches (DDSketch): a small set of counters, one per band of values, where
+# each band is 2% wide. So any percentile is within 1% of the real value, memory is bounded however many games
+# are played, and sketches from different sessions (or different copies of the game) merge by adding counters.
+# This module doesn't use Tk, so it can be used without a display.
+#
+# The analytics file holds:
+#   {"format": "visage-analytics", "version": 1,
+#    "reaction": {"12": <sketch>, ...},      reaction times in milliseconds, by level
+#    "accuracy": {"10": [hits, misses], ...}, clicks, by difficulty (times 10, as shown in the options)
+#    "levels": {"10": <sketch>, ...}}         the level reached in each game, by difficulty
+
+# IMPORTS
+# Import concurrent.futures and threading so the analytics can be saved in the background,
+# and collections for keeping failed saves until the game reports them
+import collections
+import concurrent.futures
+import threading
+
+# Import json for the analytics file
+import json
+
+# Import math for the sketches' logarithmic bands
+import math
+
+# Import the storage module for writing the file safely, and the profiles module for locking it
+import storage
+import profiles
+
+# CONSTANTS
+
+# The name saved in the file, so other JSON files aren't mistaken for it.
+FORMAT_NAME = "visage-analytics"
+
+# The current version of the file format.
+VERSION = 1
+
+# How close each percentile is to the real value, as a fraction of it (1%).
+RELATIVE_ACCURACY = 0.01
+
+# The most bands a sketch keeps. With 1% accuracy, this covers values from 1 to about 10^17 before the
+# lowest bands start being merged together (which only makes the lowest percentiles less accurate).
+MAX_BUCKETS = 2048
+
+# Values at or below this are counted together, as zero (logarithms can't be taken of them).
+MIN_VALUE = 1e-9
+
+# CLASSES
+
+
+class AnalyticsError(ValueError):
+    """Raised when an analytics file (or a sketch in one) can't be understood.
+    """
+    pass
+
+
+class Sketch:
+    """A DDSketch: an approximate distribution of values, from which any percentile can be read.
+    Each value is counted in a band, [gamma^(i-1), gamma^i), so the sketch's size depends on the range of values,
+    not how many there are. Two sketches with the same accuracy merge exactly, by adding their counts.
+    """
+    __slots__ = ("accuracy", "gamma", "log_gamma", "buckets",
+                 "zero", "count", "total", "minimum", "maximum")
+
+    def __init__(self, accuracy=RELATIVE_ACCURACY):
+        """Create an empty sketch.
+
+        Args:
+            accuracy (float, optional): How close percentiles are to the real values, as a fraction. Defaults to RELATIVE_ACCURACY.
+        """
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        # The count in each band, by band number.
+        self.buckets = dict()
+        # The number of values at or below MIN_VALUE.
+        self.zero = 0
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value, weight=1):
+        """Add a value.
+
+        Args:
+            value (float): The value. Negative values are counted as zero.
+            weight (int, optional): How many times to add it. Defaults to 1.
+        """
+        if (value <= MIN_VALUE):
+            self.zero += weight
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + weight
+            if (len(self.buckets) > MAX_BUCKETS):
+                self.collapse()
+        self.count += weight
+        self.total += value * weight
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def collapse(self):
+        """Merge the lowest bands together until there are no more than MAX_BUCKETS.
+        """
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - MAX_BUCKETS
+        if (excess <= 0):
+            return
+        moved = sum(self.buckets.pop(index) for index in indexes[:excess])
+        self.buckets[indexes[excess]] += moved
+
+    def merge(self, other):
+        """Add every value in another sketch to this one.
+
+        Args:
+            other (Sketch): The sketch to merge in. It isn't changed.
+
+        Raises:
+            AnalyticsError: If the sketches have different accuracies, so their bands don't line up.
+        """
+        if (other.gamma != self.gamma):
+            raise AnalyticsError(
+                "Sketches with different accuracies can't be merged.")
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        if (len(self.buckets) > MAX_BUCKETS):
+            self.collapse()
+        self.zero += other.zero
+        self.count += other.count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def quantile(self, q):
+        """Get a percentile (as a quantile, from 0 to 1).
+
+        Args:
+            q (float): The quantile, e.g. 0.5 for the median or 0.9 for the 90th percentile.
+
+        Returns:
+            float: The value, within the sketch's accuracy, or None if the sketch is empty.
+        """
+        if (self.count == 0):
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if (seen > rank):
+            return max(self.minimum, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if (seen > rank):
+                # The middle of the band, which is within the accuracy of every value in it.
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.minimum), self.maximum)
+        return self.maximum
+
+    @property
+    def mean(self):
+        """float: The mean of the values (exact, not estimated), or None if the sketch is empty."""
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        """Convert the sketch to a dictionary, to be saved as JSON.
+
+        Returns:
+            dict: The sketch.
+        """
+        indexes = sorted(self.buckets)
+        return {"accuracy": self.accuracy, "zero": self.zero, "count": self.count, "total": self.total,
+                "min": self.minimum if self.count else None, "max": self.maximum if self.count else None,
+                "indexes": indexes, "counts": [self.buckets[index] for index in indexes]}
+
+    @classmethod
+    def from_dict(cls, fields):
+        """Read a sketch saved with to_dict().
+
+        Args:
+            fields (dict): The saved sketch.
+
+        Raises:
+            AnalyticsError: If the sketch isn't valid.
+
+        Returns:
+            Sketch: The sketch.
+        """
+        try:
+            sketch = cls(float(fields["accuracy"]))
+            indexes, counts = fields["indexes"], fields["counts"]
+            if (len(indexes) != len(counts)):
+                raise AnalyticsError("Sketch has a different number of bands and counts.")
+            sketch.buckets = {int(index): int(count)
+                              for index, count in zip(indexes, counts)}
+            sketch.zero = int(fields["zero"])
+            sketch.count = int(fields["count"])
+            sketch.total = float(fields["total"])
+            if (sketch.count):
+                sketch.minimum = float(fields["min"])
+                sketch.maximum = float(fields["max"])
+        except AnalyticsError:
+            raise
+        except (KeyError, TypeError, ValueError, ZeroDivisionError) as e:
+            raise AnalyticsError(f"Sketch is not valid: {e!r}")
+        if (sketch.count != sketch.zero + sum(sketch.buckets.values())):
+            raise AnalyticsError("Sketch's counts don't add up.")
+        return sketch
+
+
+class Analytics:
+    """This class keeps the statistics themselves: a sketch of reaction times for each level, hit & miss counts
+    for each difficulty, and a sketch of the level reached for each difficulty.
+    Difficulties are kept by difficulty_key(), so they match the values shown in the options.
+    """
+
+    def __init__(self):
+        # Reaction times in milliseconds, by level.
+        self.reaction = dict()
+        # [hits, misses], by difficulty key.
+        self.accuracy = dict()
+        # The level reached in each game, by difficulty key.
+        self.levels = dict()
+
+    def click(self, level, difficulty, reaction, correct):
+        """Count a click.
+
+        Args:
+            level (int): The level the click was on.
+            difficulty (float): The difficulty setting.
+            reaction (float): How long after the puzzle appeared the click came, in milliseconds.
+            correct (bool): Whether the click was on the different cell.
+        """
+        if (level not in self.reaction):
+            self.reaction[level] = Sketch()
+        self.reaction[level].add(reaction)
+        counts = self.accuracy.setdefault(difficulty_key(difficulty), [0, 0])
+        counts[0 if correct else 1] += 1
+
+    def game_over(self, difficulty, level):
+        """Count a finished game.
+
+        Args:
+            difficulty (float): The difficulty setting.
+            level (int): The level reached.
+        """
+        key = difficulty_key(difficulty)
+        if (key not in self.levels):
+            self.levels[key] = Sketch()
+        self.levels[key].add(level)
+
+    def merge(self, other):
+        """Add everything counted in other analytics (e.g. another session's) to these.
+
+        Args:
+            other (Analytics): The analytics to merge in. They aren't changed.
+        """
+        for level, sketch in other.reaction.items():
+            self.reaction.setdefault(level, Sketch()).merge(sketch)
+        for key, (hits, misses) in other.accuracy.items():
+            counts = self.accuracy.setdefault(key, [0, 0])
+            counts[0] += hits
+            counts[1] += misses
+        for key, sketch in other.levels.items():
+            self.levels.setdefault(key, Sketch()).merge(sketch)
+
+    def reaction_times(self, levels=None):
+        """Get the reaction times across several levels.
+
+        Args:
+            levels (iterable, optional): The levels to include. Defaults to None (every level).
+
+        Returns:
+            Sketch: The reaction times, in milliseconds.
+        """
+        sketch = Sketch()
+        for level, level_sketch in self.reaction.items():
+            if (levels is None or level in levels):
+                sketch.merge(level_sketch)
+        return sketch
+
+    def hit_rate(self, difficulty=None):
+        """Get the fraction of clicks that were correct.
+
+        Args:
+            difficulty (float, optional): Only count clicks on this difficulty. Defaults to None (every difficulty).
+
+        Returns:
+            float: From 0 to 1, or None if no clicks have been counted.
+        """
+        if (difficulty is None):
+            counts = self.accuracy.values()
+        else:
+            counts = [self.accuracy.get(difficulty_key(difficulty), [0, 0])]
+        hits = sum(hit for hit, miss in counts)
+        clicks = hits + sum(miss for hit, miss in counts)
+        return hits / clicks if clicks else None
+
+    def levels_reached(self, difficulty=None):
+        """Get the levels reached.
+
+        Args:
+            difficulty (float, optional): Only include games on this difficulty. Defaults to None (every difficulty).
+
+        Returns:
+            Sketch: The levels reached.
+        """
+        if (difficulty is not None):
+            sketch = Sketch()
+            if (difficulty_key(difficulty) in self.levels):
+                sketch.merge(self.levels[difficulty_key(difficulty)])
+            return sketch
+        sketch = Sketch()
+        for level_sketch in self.levels.values():
+            sketch.merge(level_sketch)
+        return sketch
+
+    def to_dict(self):
+        """Convert the analytics to a dictionary, to be saved as JSON.
+
+        Returns:
+            dict: The analytics.
+        """
+        return {"format": FORMAT_NAME, "version": VERSION,
+                "reaction": {str(level): sketch.to_dict() for level, sketch in self.reaction.items()},
+                "accuracy": {str(key): list(counts) for key, counts in self.accuracy.items()},
+                "levels": {str(key): sketch.to_dict() for key, sketch in self.levels.items()}}
+
+    @classmethod
+    def from_dict(cls, fields):
+        """Read analytics saved with to_dict().
+
+        Args:
+            fields (dict): The saved analytics.
+
+        Raises:
+            AnalyticsError: If they aren't valid.
+
+        Returns:
+            Analytics: The analytics.
+        """
+        if (not isinstance(fields, dict) or fields.get("format") != FORMAT_NAME):
+            raise AnalyticsError("File is not a Visage analytics file.")
+        if (fields.get("version") != VERSION):
+            raise AnalyticsError(
+                f"Analytics file is format {fields.get('version')}, but this version of Visage reads format {VERSION}.")
+        analytics = cls()
+        try:
+            analytics.reaction = {int(level): Sketch.from_dict(sketch)
+                                  for level, sketch in fields["reaction"].items()}
+            analytics.accuracy = {int(key): [int(hits), int(misses)]
+                                  for key, (hits, misses) in fields["accuracy"].items()}
+            analytics.levels = {int(key): Sketch.from_dict(sketch)
+                                for key, sketch in fields["levels"].items()}
+        except AnalyticsError:
+            raise
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise AnalyticsError(f"Analytics file is not valid: {e!r}")
+        return analytics
+
+
+class AnalyticsStore:
+    """This class keeps the analytics for every game played, on disk and in memory.
+    Clicks and games are counted in memory straight away, so the statistics can be read at any time without
+    touching the disk. save() adds what's new to the file in the background, merging it with anything other
+    copies of the game saved in the meantime. Failed saves are kept for the game to collect (with take_error())
+    and report to the user, like storage.SaveWriter's.
+    """
+
+    def __init__(self, location=None):
+        """Open (or start) an analytics file.
+
+        Args:
+            location (str, optional): The path of the file. Defaults to None (kept in memory, not saved).
+
+        Raises:
+            AnalyticsError: If the file isn't valid.
+            OSError: If the file can't be read.
+        """
+        self.location = location
+        # Everything counted, in this session and before.
+        self.totals = Analytics()
+        # What's been counted since it was last saved.
+        self.pending = Analytics()
+        # Events are counted on the Tk thread and saved on the writer thread, so only one changes them at a time.
+        self.lock = threading.Lock()
+        # The saves not finished yet, and the saves that failed, as (location, exception), until the game collects them.
+        self.saving = set()
+        self.errors = collections.deque()
+        if (location is not None):
+            self.file_lock = profiles.FileLock(location + ".lock")
+            self.totals = self.read()
+        self.writer = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="Visage analytics writer")
+
+    def read(self):
+        """Read the analytics file.
+
+        Raises:
+            AnalyticsError: If the file isn't valid.
+
+        Returns:
+            Analytics: What's in the file, or nothing if there isn't one yet.
+        """
+        try:
+            with open(self.location, "rb") as file:
+                raw = file.read()
+        except FileNotFoundError:
+            return Analytics()
+        try:
+            fields = json.loads(raw.decode("utf-8"))
+        except ValueError as e:
+            raise AnalyticsError(f"Analytics file is not valid JSON: {e}")
+        return Analytics.from_dict(fields)
+
+    def click(self, level, difficulty, reaction, correct):
+        """Count a click. See Analytics.click()."""
+        with self.lock:
+            self.totals.click(level, difficulty, reaction, correct)
+            self.pending.click(level, difficulty, reaction, correct)
+
+    def game_over(self, difficulty, level):
+        """Count a finished game. See Analytics.game_over()."""
+        with self.lock:
+            self.totals.game_over(difficulty, level)
+            self.pending.game_over(difficulty, level)
+
+    def save(self):
+        """Add everything counted since the last save to the file. This returns straight away;
+        the file is written in the background.
+
+        Returns:
+            concurrent.futures.Future: Completes once the file has been written (or fails with the error).
+        """
+        future = self.writer.submit(self.write)
+        with self.lock:
+            self.saving.add(future)
+        future.add_done_callback(self.finished)
+        return future
+
+    def finished(self, future):
+        """Note that a save has finished, keeping its error if it failed. Called by the save's Future.
+
+        Args:
+            future (concurrent.futures.Future): The save.
+        """
+        with self.lock:
+            self.saving.discard(future)
+            if (not future.cancelled() and future.exception() is not None):
+                self.errors.append((self.location, future.exception()))
+
+    def idle(self):
+        """Check whether every save has finished.
+
+        Returns:
+            bool: True if there is nothing waiting to be written, or being written.
+        """
+        with self.lock:
+            return not self.saving
+
+    def take_error(self):
+        """Collect the oldest failed save, if there is one.
+
+        Returns:
+            tuple: (location, exception) for the failed save, or None.
+        """
+        with self.lock:
+            return self.errors.popleft() if self.errors else None
+
+    def write(self):
+        """Add everything counted since the last save to the file straight away. Used by save().
+        """
+        if (self.location is None):
+            return
+        with self.lock:
+            pending, self.pending = self.pending, Analytics()
+        try:
+            with self.file_lock:
+                # Re-read the file under the lock, so anything other copies of the game saved isn't lost.
+                saved = self.read()
+                saved.merge(pending)
+                storage.write_atomic(self.location, json.dumps(
+                    saved.to_dict(), separators=(",", ":")).encode("utf-8"))
+        except BaseException:
+            # Keep what wasn't saved, to try again next time.
+            with self.lock:
+                pending.merge(self.pending)
+                self.pending = pending
+            raise
+        # Pick up what the other copies saved, along with anything counted while the file was being written.
+        with self.lock:
+            saved.merge(self.pending)
+            self.totals = saved
+
+    def flush(self):
+        """Wait for every save so far to be written."""
+        self.writer.submit(lambda: None).result()
+
+    def close(self):
+        """Finish writing, then stop the writer thread."""
+        self.writer.shutdown(wait=True)
+
+# FUNCTIONS
+
+
+def difficulty_key(difficulty):
+    """Get the key a difficulty's statistics are kept under: the difficulty times 10, as entered in the options.
+
+    Args:
+        difficulty (float): The difficulty setting.
+
+    Returns:
+        int: The key.
+    """
+    return round(difficulty * 10)
@@ -0,0 +1,400 @@
+# Visage
+# a color game by Conor Eager
+# Benchmarks for puzzle generation (classic and perceptual), grid building and level transitions.
+#
+# Usage:
+#   python benchmark.py [--levels 3-100] [--repeat 200] [--rounds 3] [--output benchmark.json]
+#                       [--baseline benchmark_baseline.json] [--tolerance 0.25] [--stub]
+#
+# Results are written as JSON. Each result is compared against the baseline (benchmark_baseline.json by default,
+# which is kept with the code), and the script exits with status 1 if anything got slower by more than the tolerance.
+# Results from the other backend aren't compared, as a real canvas and the stub take very different times.
+# The grid benchmarks use a real Tk canvas if a display is available (e.g. under xvfb-run),
+# and a stub canvas that only does the bookkeeping otherwise (or if --stub is given).
+
+# IMPORTS
+# Import argparse for the command-line interface
+import argparse
+
+# Import json for writing the results and reading the baseline
+import json
+
+# Import os for checking whether there is a baseline to compare against
+import os
+
+# Import platform for recording what the benchmarks were run on
+import platform
+
+# Import random for seeding the puzzle generators
+import random
+
+# Import statistics for summarising the timings
+import statistics
+
+# Import sys for the exit status
+import sys
+
+# Import time for the clock
+import time
+
+# Import the colors module, the engine and the perceptual color model, which are being benchmarked
+import colors
+import engine
+import perceptual
+
+# CONSTANTS
+
+# The Easy, Normal and Hard presets from the settings window.
+DIFFICULTIES = (0.5, 1.0, 2.0)
+
+# The size of the grid, in pixels (the same as in GameWindow).
+GRID_SIZE = 400
+
+# The results each run is compared against, kept with the code. It was recorded with the default options
+# and the stub canvas; write a new one with --output to move it on after a deliberate change.
+BASELINE = "benchmark_baseline.json"
+
+# CLASSES
+
+
+class StubCanvas:
+    """This class stands in for a tk.Canvas when there is no display.
+    It keeps track of items, tags and coordinates like Tk does (so the grid's own work is still measured),
+    and runs scheduled callbacks as soon as pump() is called instead of waiting for them.
+    """
+
+    def __init__(self):
+        self.items = dict()
+        self.tags = dict()
+        self.next_id = 1
+        self.queue = list()
+
+    def create(self, coords, tags=(), **options):
+        item = self.next_id
+        self.next_id += 1
+        if (isinstance(tags, str)):
+            tags = (tags,)
+        self.items[item] = [list(coords), options, tags]
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(item)
+        return item
+
+    def create_rectangle(self, *coords, **options):
+        return self.create(coords, **options)
+
+    def create_line(self, *coords, **options):
+        return self.create(coords, **options)
+
+    def create_text(self, *coords, **options):
+        return self.create(coords, **options)
+
+    def create_image(self, *coords, **options):
+        return self.create(coords, **options)
+
+    def find(self, tag):
+        if (isinstance(tag, int)):
+            return (tag,) if tag in self.items else ()
+        return tuple(self.tags.get(tag, ()))
+
+    def delete(self, *tags):
+        for tag in tags:
+            for item in self.find(tag):
+                for item_tag in self.items.pop(item)[2]:
+                    self.tags[item_tag].discard(item)
+
+    def itemconfigure(self, tag, **options):
+        for item in self.find(tag):
+            self.items[item][1].update(options)
+
+    def itemcget(self, tag, option):
+        return self.items[self.find(tag)[0]][1].get(option, "")
+
+    def coords(self, tag, *coords):
+        for item in self.find(tag):
+            self.items[item][0] = list(coords)
+
+    def scale(self, tag, x, y, xscale, yscale):
+        for item in self.find(tag):
+            coords = self.items[item][0]
+            coords[0::2] = [x + (value - x) * xscale for value in coords[0::2]]
+            coords[1::2] = [y + (value - y) * yscale for value in coords[1::2]]
+
+    def tag_raise(self, *args):
+        pass
+
+    def tag_lower(self, *args):
+        pass
+
+    def bind(self, *args):
+        pass
+
+    def after(self, ms, callback):
+        self.queue.append(callback)
+        return callback
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, callback):
+        if (callback in self.queue):
+            self.queue.remove(callback)
+
+    def pump(self):
+        """Run scheduled callbacks until there are none left."""
+        while (self.queue):
+            self.queue.pop(0)()
+
+
+class Backend:
+    """This class sets up the canvases for the grid benchmarks, using Tk if there's a display and StubCanvas if not.
+    """
+
+    def __init__(self, stub=False):
+        """Set up the backend.
+
+        Args:
+            stub (bool, optional): Always use StubCanvas, even if there's a display. Defaults to False.
+        """
+        self.root = None
+        if (not stub):
+            try:
+                import tkinter as tk
+                self.root = tk.Tk()
+                self.tk = tk
+            except Exception:
+                # No display (or no Tk at all). Fall back to the stub.
+                self.root = None
+        self.name = "stub" if self.root is None else "tk"
+
+    def canvas(self):
+        """Create a new, empty canvas."""
+        if (self.root is None):
+            return StubCanvas()
+        canvas = self.tk.Canvas(self.root, width=GRID_SIZE, height=GRID_SIZE,
+                                bg="#2b2b2b", highlightthickness=0)
+        canvas.grid(row=0, column=0)
+        return canvas
+
+    def destroy(self, canvas):
+        """Get rid of a canvas once a benchmark is done with it."""
+        if (self.root is not None):
+            canvas.destroy()
+
+    def wait(self, canvas, done):
+        """Run the event loop until done() returns True."""
+        while (not done()):
+            if (self.root is None):
+                canvas.pump()
+            else:
+                self.root.update()
+
+
+# FUNCTIONS
+
+
+def summarise(samples):
+    """Summarise a list of timings, in nanoseconds, as microseconds.
+
+    Args:
+        samples (list): The timings, in nanoseconds.
+
+    Returns:
+        dict: The median and 95th percentile, in microseconds.
+    """
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, round(len(samples) * 0.95))]
+    return {"value": statistics.median(samples) / 1000, "p95": p95 / 1000, "unit": "us"}
+
+
+def bench_colors(levels, repeat):
+    """Measure how long it takes to generate a puzzle, at each level and difficulty.
+    """
+    results = dict()
+    generator = colors.PuzzleGenerator(random.Random(0))
+    for difficulty in DIFFICULTIES:
+        for level in levels:
+            samples = list()
+            for _ in range(repeat):
+                start = time.perf_counter_ns()
+                generator.generate(level, difficulty)
+                samples.append(time.perf_counter_ns() - start)
+            results[f"colors/d{int(difficulty * 10)}/L{level}"] = summarise(samples)
+    return results
+
+
+def bench_perceptual(levels, repeat):
+    """Measure how long it takes to generate a puzzle with the perceptual color model, at each level and difficulty.
+    """
+    results = dict()
+    generator = perceptual.PerceptualGenerator(random.Random(0))
+    for difficulty in DIFFICULTIES:
+        for level in levels:
+            samples = list()
+            for _ in range(repeat):
+                start = time.perf_counter_ns()
+                generator.generate(level, difficulty)
+                samples.append(time.perf_counter_ns() - start)
+            results[f"perceptual/d{int(difficulty * 10)}/L{level}"] = summarise(
+                samples)
+    return results
+
+
+def bench_build(levels, rounds, backend):
+    """Measure how long it takes to build a grid from nothing, at each level.
+    This is the worst case for the grid, e.g. when a game starts.
+    """
+    import game
+
+    results = dict()
+    for level in levels:
+        samples = list()
+        for _ in range(rounds):
+            canvas = backend.canvas()
+            grid = game.CanvasGrid(None, GRID_SIZE, game.Data(),
+                                   lambda row, col: None, canvas=canvas)
+            done = list()
+            start = time.perf_counter_ns()
+            grid.draw(level, "#000000", "#010101", 0, 0,
+                      callback=lambda: done.append(True))
+            backend.wait(canvas, lambda: done)
+            samples.append(time.perf_counter_ns() - start)
+            backend.destroy(canvas)
+        results[f"build/L{level}"] = summarise(samples)
+    return results
+
+
+def bench_transition(levels, rounds, backend):
+    """Measure the time from a correct click to the next grid being ready, at each level and difficulty.
+    This is everything GameWindow does between a click and accepting the next one.
+    """
+    import game
+
+    results = dict()
+    for difficulty in DIFFICULTIES:
+        canvas = backend.canvas()
+        grid = game.CanvasGrid(None, GRID_SIZE, game.Data(),
+                               lambda row, col: None, canvas=canvas)
+        state = engine.GameState(
+            difficulty, colors.PuzzleGenerator(random.Random(0)), level=levels[0] - 1)
+        done = list()
+
+        def show():
+            done.clear()
+            puzzle = state.puzzle
+            grid.draw(puzzle.level, puzzle.color_str, puzzle.different_color_str,
+                      puzzle.row, puzzle.col, callback=lambda: done.append(True))
+            backend.wait(canvas, lambda: done)
+
+        show()
+        for level in levels:
+            samples = list()
+            for _ in range(rounds):
+                # Start from the level below, so each transition grows the grid by one.
+                if (state.level != level - 1):
+                    state.level = level - 1
+                    state.new_puzzle()
+                    show()
+
+                start = time.perf_counter_ns()
+                state.click(state.puzzle.row, state.puzzle.col)
+                show()
+                samples.append(time.perf_counter_ns() - start)
+            results[f"transition/d{int(difficulty * 10)}/L{level}"] = summarise(
+                samples)
+        backend.destroy(canvas)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Compare results against a baseline.
+
+    Args:
+        results (dict): The new results.
+        baseline (dict): The baseline results (from an earlier run).
+        tolerance (float): How much slower a result can be before it counts as a regression (0.25 = 25%).
+
+    Returns:
+        list: The regressions, as (name, baseline value, new value) tuples.
+    """
+    regressions = list()
+    for name, result in results.items():
+        if (name not in baseline):
+            continue
+        old = baseline[name]["value"]
+        if (result["value"] > old * (1 + tolerance)):
+            regressions.append((name, old, result["value"]))
+    return regressions
+
+
+def parse_levels(text):
+    """Parse a level range, e.g. "3-100" or "3-100:5" (every 5th level).
+    """
+    text, _, step = text.partition(":")
+    first, _, last = text.partition("-")
+    return list(range(int(first), int(last or first) + 1, int(step or 1)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark Visage's puzzle generation and grid building.")
+    parser.add_argument("--levels", default="3-100", type=parse_levels,
+                        help="levels to benchmark, as FIRST-LAST[:STEP] (default 3-100)")
+    parser.add_argument("--repeat", default=200, type=int,
+                        help="puzzles to generate per level (default 200)")
+    parser.add_argument("--rounds", default=3, type=int,
+                        help="grids to build per level (default 3)")
+    parser.add_argument("--output", default="benchmark.json",
+                        help="file to write the results to (default benchmark.json)")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help=f"results file to compare against (default {BASELINE}; \"\" to not compare)")
+    parser.add_argument("--tolerance", default=0.25, type=float,
+                        help="allowed slowdown against the baseline (default 0.25 = 25%%)")
+    parser.add_argument("--stub", action="store_true",
+                        help="use the stub canvas even if a display is available")
+    args = parser.parse_args(argv)
+
+    backend = Backend(args.stub)
+
+    # Read the baseline first, in case the new results are being written over it.
+    baseline = None
+    if (args.baseline and os.path.exists(args.baseline)):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    elif (args.baseline):
+        print(f"No baseline at {args.baseline}, so nothing to compare against.")
+
+    results = dict()
+    results.update(bench_colors(args.levels, args.repeat))
+    results.update(bench_perceptual(args.levels, args.repeat))
+    results.update(bench_build(args.levels, args.rounds, backend))
+    results.update(bench_transition(args.levels, args.rounds, backend))
+
+    report = {
+        "meta": {
+            "backend": backend.name,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": perceptual.numpy.__version__ if perceptual.numpy is not None else None,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=1)
+    print(f"Wrote {len(results)} results to {args.output} ({backend.name} backend).")
+
+    if (baseline is not None and baseline["meta"]["backend"] != backend.name):
+        print(f"{args.baseline} is from the {baseline['meta']['backend']} backend, so it isn't compared.")
+    elif (baseline is not None):
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.1f} us -> {new:.1f} us")
+        if (regressions):
+            return 1
+        print(f"No regressions against {args.baseline}.")
+    return 0
+
+
+# RUNNING
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# Visage
+# a color game by Conor Eager
+# The bridge between asyncio and Tk: runs coroutines on the same thread as the window, a step at a time
+# from Tk's own event loop, so background work (e.g. file I/O, handed to worker threads with run_in_executor())
+# can be awaited without ever blocking the window.
+# This module doesn't use Tk directly (it is given a widget to schedule its steps with), so it can be used without a display.
+
+# IMPORTS
+# Import asyncio for the event loop
+import asyncio
+
+# CLASSES
+
+
+class Bridge:
+    """This class runs an asyncio event loop inside Tk's.
+    Each step runs everything the asyncio loop has ready, without waiting, then hands back to Tk.
+    Steps are only scheduled while there are coroutines running, so the bridge costs nothing when idle.
+    Coroutines run on the Tk thread, so they can update widgets directly between awaits.
+    """
+
+    # The time between steps while there are coroutines running, in milliseconds.
+    # Work finished by a worker thread is picked up within this time.
+    POLL_INTERVAL = 5
+
+    def __init__(self, widget, loop=None):
+        """Create a bridge.
+
+        Args:
+            widget (tk.Widget): Any widget, used to schedule the steps (with after()).
+            loop (asyncio.AbstractEventLoop, optional): The event loop to run. Defaults to a new one.
+        """
+        self.widget = widget
+        self.loop = loop if loop is not None else asyncio.new_event_loop()
+        # The coroutines still running, as asyncio.Tasks.
+        self.tasks = set()
+        # The scheduled step, if there is one.
+        self.pending = None
+
+    def run(self, coroutine):
+        """Start running a coroutine. It runs a step at a time from Tk's event loop, starting straight away.
+
+        Args:
+            coroutine (coroutine): The coroutine to run.
+
+        Returns:
+            asyncio.Task: The coroutine's task, which can be cancelled or awaited by other coroutines.
+        """
+        task = self.loop.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.finished)
+        if (self.pending is None):
+            self.pending = self.widget.after_idle(self.step)
+        return task
+
+    def finished(self, task):
+        """Forget a task once it has finished, reporting it if it failed (as nothing else may be waiting on it).
+
+        Args:
+            task (asyncio.Task): The finished task.
+        """
+        self.tasks.discard(task)
+        if (not task.cancelled() and task.exception() is not None):
+            self.loop.call_exception_handler({"message": "Background task failed",
+                                              "exception": task.exception(), "task": task})
+
+    def busy(self):
+        """Check whether any coroutines are still running.
+
+        Returns:
+            bool: True if there are coroutines still running.
+        """
+        return bool(self.tasks)
+
+    def step(self):
+        """Run everything the asyncio loop has ready, then schedule the next step if there's more to do.
+        """
+        self.pending = None
+        # Stopping straight away makes run_forever() do a single pass: it polls without waiting,
+        # runs the callbacks that are ready, and returns.
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+        if (self.tasks):
+            self.pending = self.widget.after(Bridge.POLL_INTERVAL, self.step)
+
+    def close(self):
+        """Cancel any coroutines still running, and close the event loop.
+        """
+        if (self.pending is not None):
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+        for task in list(self.tasks):
+            task.cancel()
+        if (self.tasks):
+            self.loop.run_until_complete(asyncio.gather(
+                *self.tasks, return_exceptions=True))
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
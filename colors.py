@@ -0,0 +1,136 @@
+# Visage
+# a color game by Conor Eager
+# Color generation: choosing the "correct" and "incorrect" colors (and the incorrect cell) for each level.
+# This module doesn't use Tk, so it can be used without a display.
+
+# IMPORTS
+# Import namedtuple for the immutable Puzzle class
+import collections
+
+# Import random for random generation of colors
+import random
+
+# CONSTANTS
+
+# Lookup table of two-digit hex strings for every 8-bit value, used to build color strings for Tk
+# without formatting each number every time.
+HEX = tuple(f"{value:02X}" for value in range(0x100))
+
+# FUNCTIONS
+
+
+def to_hex(color):
+    """Convert an RGB color to a string for use with Tk.
+
+    Args:
+        color (tuple): The color, as three integers from 0 to 255 (red, green, blue).
+
+    Returns:
+        str: The color as a Tk color string, e.g. "#2B2B2B".
+    """
+    return "#" + HEX[color[0]] + HEX[color[1]] + HEX[color[2]]
+
+
+def color_step(level, difficulty):
+    """Work out how far the incorrect color is from the correct color at a level.
+    This is 255 divided by the level times the difficulty, but never less than 1,
+    so that the two colors are always different.
+
+    Args:
+        level (int): The current game level.
+        difficulty (float): The difficulty setting.
+
+    Returns:
+        int: The difference in one color component (1 to 255).
+    """
+    return max(1, round(0xFF / max(1, round(level * difficulty))))
+
+# CLASSES
+
+
+class Puzzle(collections.namedtuple("Puzzle", ["level", "color", "different_color", "row", "col"])):
+    """This class describes a single level: the size of the grid, the two colors, and where the different cell is.
+    It is immutable, so it can be shared and stored safely.
+
+    Attributes:
+        level (int): The number of rows and columns in the grid.
+        color (tuple): The "correct" RGB color, used for every cell but one.
+        different_color (tuple): The "incorrect" RGB color, used for the different cell.
+        row (int): The row of the different cell.
+        col (int): The column of the different cell.
+    """
+    __slots__ = ()
+
+    @property
+    def color_str(self):
+        """str: The "correct" color as a Tk color string."""
+        return to_hex(self.color)
+
+    @property
+    def different_color_str(self):
+        """str: The "incorrect" color as a Tk color string."""
+        return to_hex(self.different_color)
+
+
+class PuzzleGenerator:
+    """This class generates Puzzles.
+    The colors are picked directly from the range of valid colors, so generation takes the same
+    (short) time at every level and difficulty and never has to retry.
+    """
+
+    def __init__(self, rng=None):
+        """Create a new PuzzleGenerator.
+
+        Args:
+            rng (random.Random, optional): The random number generator to use.
+            Pass a seeded random.Random to get the same puzzles every time. Defaults to a new, unseeded generator.
+        """
+        self.rng = rng if rng is not None else random.Random()
+
+    def generate(self, level, difficulty):
+        """Generate the puzzle for a level.
+
+        Args:
+            level (int): The current game level (the number of rows and columns in the grid).
+            difficulty (float): The difficulty setting.
+
+        Returns:
+            Puzzle: The new puzzle.
+        """
+        return self.generate_at(level, color_step(level, difficulty))
+
+    def generate_at(self, level, step):
+        """Generate a puzzle with a given difference between the colors (used by adaptive.AdaptiveGenerator).
+
+        Args:
+            level (int): The current game level (the number of rows and columns in the grid).
+            step (int): The difference in one color component (1 to 255).
+
+        Returns:
+            Puzzle: The new puzzle.
+        """
+        rng = self.rng
+
+        # Only some values of the changed component can be moved by the step without leaving 0-255:
+        # 0 to (255 - step) when adding, or step to 255 when subtracting. Both ranges are the same size.
+        span = 0x100 - step
+
+        # Pick the component to change, whether to add or subtract, and the component's value,
+        # all from one random number. Every valid combination is equally likely.
+        component, choice = divmod(rng.randrange(6 * span), 2 * span)
+        subtract, value = divmod(choice, span)
+        if (subtract):
+            value += step
+
+        # Pick the other two components freely.
+        bits = rng.getrandbits(24)
+        color = [bits >> 16, (bits >> 8) & 0xFF, bits & 0xFF]
+        color[component] = value
+        different_color = list(color)
+        different_color[component] = value - step if subtract else value + step
+
+        # Choose which cell will be different.
+        row = rng.randrange(level)
+        col = rng.randrange(level)
+
+        return Puzzle(level, tuple(color), tuple(different_color), row, col)
@@ -0,0 +1,383 @@
+# Visage
+# a color game by Conor Eager
+# Puzzle decks: files of pre-generated puzzles, so a set of levels can be shipped, shared and replayed exactly,
+# and the game doesn't have to generate puzzles while it's being played.
+# This module doesn't use Tk, so decks can be built without a display.
+#
+# Usage:
+#   python deck.py build FILE [--levels 3-1000] [--per-level 8] [--difficulty 1.0] [--model classic]
+#                             [--seed 0] [--workers N]
+#   python deck.py info FILE
+#
+# A deck is a fixed-size header followed by fixed-size records, one per puzzle:
+#   header:  "VDCK", version, record size, difficulty, first level, level count, puzzles per level, seed, color model
+#   record:  color (3 bytes), different color (3 bytes), row, column, level (2 bytes each, little-endian)
+# The puzzles for each level are stored together, so the record for any puzzle is found with one multiplication,
+# and the file is memory-mapped rather than read, so opening even a huge deck is instant.
+
+# IMPORTS
+# Import argparse for the command-line interface
+import argparse
+
+# Import concurrent.futures for filling decks across several processes
+import concurrent.futures
+
+# Import mmap for reading decks without loading them
+import mmap
+
+# Import os and tempfile for writing decks safely (temporary file, then rename)
+import os
+import tempfile
+
+# Import random for seeding each level's puzzles
+import random
+
+# Import struct for packing headers & records
+import struct
+
+# Import sys for the exit status
+import sys
+
+# Import the colors module for the Puzzle class, the engine for the puzzle generators,
+# and the storage module for the list of color models
+import colors
+import engine
+import storage
+
+# CONSTANTS
+
+# The first bytes of every deck file.
+MAGIC = b"VDCK"
+
+# The current version of the deck format.
+VERSION = 1
+
+# The header: magic, version, record size, difficulty, first level, level count, puzzles per level, seed, color model.
+# It is padded to HEADER_SIZE bytes, so records start on a round offset.
+HEADER = struct.Struct("<4sHHdIIIQ16s")
+HEADER_SIZE = 64
+
+# A record: color (r, g, b), different color (r, g, b), row, column, level.
+RECORD = struct.Struct("<6BHHH")
+
+# The largest seed a deck can store (the header holds it as an unsigned 64-bit number).
+MAX_SEED = 2 ** 64 - 1
+
+# How many levels each worker process generates at a time.
+CHUNK_LEVELS = 256
+
+# CLASSES
+
+
+class DeckFormatError(ValueError):
+    """Raised when a file isn't a valid deck (wrong magic, unknown version, the wrong size, or invalid values).
+    """
+    pass
+
+
+class Deck:
+    """This class reads a deck file. The file is memory-mapped, so only the pages holding the puzzles
+    actually played are ever read from disk, and any puzzle can be found straight away.
+
+    Attributes:
+        difficulty (float): The difficulty the puzzles were generated for.
+        first_level (int): The first level in the deck.
+        level_count (int): The number of levels in the deck.
+        per_level (int): The number of puzzles for each level.
+        seed (int): The seed the deck was generated from.
+        color_model (str): The color model the puzzles were generated with ("classic" or "perceptual").
+    """
+
+    def __init__(self, location):
+        """Open a deck file.
+
+        Args:
+            location (str): The path of the deck file.
+
+        Raises:
+            DeckFormatError: If the file isn't a valid deck.
+        """
+        self.location = location
+        with open(location, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if (size < HEADER_SIZE):
+                raise DeckFormatError("File is too small to be a Visage deck.")
+            # The map stays valid after the file is closed.
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, record_size, self.difficulty, self.first_level, self.level_count, self.per_level, \
+                self.seed, color_model = HEADER.unpack_from(self.map, 0)
+            self.color_model = color_model.rstrip(b"\0").decode("ascii", "replace")
+            if (magic != MAGIC):
+                raise DeckFormatError("File is not a Visage deck.")
+            if (version != VERSION):
+                raise DeckFormatError(
+                    f"Deck is format {version}, but this version of Visage reads format {VERSION}.")
+            if (record_size != RECORD.size):
+                raise DeckFormatError("Deck has the wrong record size.")
+            if (self.per_level < 1 or size != HEADER_SIZE + len(self) * RECORD.size):
+                raise DeckFormatError(
+                    "Deck is the wrong size for the number of puzzles it says it holds (it may be incomplete).")
+            if (not 0.2 <= self.difficulty <= 5.0):
+                raise DeckFormatError("Deck's difficulty must be between 0.2 and 5.0.")
+            if (self.color_model not in storage.COLOR_MODELS):
+                raise DeckFormatError(f"Deck uses an unknown color model ('{self.color_model}').")
+            if (self.first_level < 1 or self.first_level + self.level_count - 1 > 0xFFFF):
+                raise DeckFormatError("Deck's levels must be from 1 to 65535.")
+        except BaseException:
+            # Don't leave the file mapped if it can't be used.
+            self.map.close()
+            raise
+
+    def __len__(self):
+        """int: The number of puzzles in the deck."""
+        return self.level_count * self.per_level
+
+    def __getitem__(self, index):
+        """Get a puzzle by its position in the deck.
+
+        Args:
+            index (int): The position of the puzzle.
+
+        Raises:
+            DeckFormatError: If the puzzle isn't valid for its level.
+
+        Returns:
+            colors.Puzzle: The puzzle.
+        """
+        if (index < 0):
+            index += len(self)
+        if (not 0 <= index < len(self)):
+            raise IndexError("Deck index out of range.")
+        r, g, b, dr, dg, db, row, col, level = RECORD.unpack_from(
+            self.map, HEADER_SIZE + index * RECORD.size)
+        # Records are checked as they're read, so opening a deck stays instant however big it is.
+        if (level != self.first_level + index // self.per_level or row >= level or col >= level):
+            raise DeckFormatError(f"Deck has an invalid puzzle (number {index}).")
+        return colors.Puzzle(level, (r, g, b), (dr, dg, db), row, col)
+
+    def has_level(self, level):
+        """Check whether the deck has puzzles for a level.
+
+        Args:
+            level (int): The level.
+
+        Returns:
+            bool: True if it does.
+        """
+        return self.first_level <= level < self.first_level + self.level_count
+
+    def puzzle(self, level, attempt=0):
+        """Get a puzzle for a level.
+
+        Args:
+            level (int): The level.
+            attempt (int, optional): Which of the level's puzzles to get. If it's more than the deck has for the level,
+            they're used again from the first one. Defaults to 0.
+
+        Raises:
+            DeckFormatError: If the puzzle isn't valid for its level.
+
+        Returns:
+            colors.Puzzle: The puzzle.
+        """
+        if (not self.has_level(level)):
+            raise IndexError(f"Deck has no puzzles for level {level}.")
+        return self[(level - self.first_level) * self.per_level + attempt % self.per_level]
+
+    def close(self):
+        """Close the deck."""
+        self.map.close()
+
+
+class DeckGenerator:
+    """This class gives out puzzles from a deck. It can be used anywhere a colors.PuzzleGenerator can.
+    Each level's puzzles are given out in order (the first try at a level gets its first puzzle, the second try its
+    second, and so on), so every game played from the same deck sees the same puzzles for the same moves.
+    Past the end of the deck, puzzles are generated the same way the deck was, from its seed.
+    """
+
+    def __init__(self, deck):
+        """Create a DeckGenerator.
+
+        Args:
+            deck (Deck): The deck to give out puzzles from.
+        """
+        self.deck = deck
+        # How many puzzles have been given out for each level.
+        self.attempts = dict()
+        self.generators = dict()
+
+    def generate(self, level, difficulty):
+        """Get the next puzzle for a level.
+
+        Args:
+            level (int): The current game level.
+            difficulty (float): The difficulty setting. The deck's own difficulty is used for puzzles from the deck.
+
+        Returns:
+            colors.Puzzle: The puzzle.
+        """
+        attempt = self.attempts.get(level, 0)
+        self.attempts[level] = attempt + 1
+        if (self.deck.has_level(level)):
+            return self.deck.puzzle(level, attempt)
+
+        # Past the end of the deck.
+        if (level not in self.generators):
+            self.generators[level] = level_generator(
+                self.deck.color_model, self.deck.seed, level)
+        return self.generators[level].generate(level, self.deck.difficulty)
+
+# FUNCTIONS
+
+
+def level_generator(color_model, seed, level):
+    """Create the puzzle generator for one level of a deck. Each level has its own seed, so levels can be
+    generated in any order, in any process, and still come out the same.
+
+    Args:
+        color_model (str): The color model ("classic" or "perceptual").
+        seed (int): The deck's seed.
+        level (int): The level.
+
+    Returns:
+        colors.PuzzleGenerator or perceptual.PerceptualGenerator: The generator.
+    """
+    return engine.puzzle_generator(color_model, random.Random(f"visage-deck:{seed}:{level}"))
+
+
+def generate_levels(color_model, seed, difficulty, first_level, last_level, per_level):
+    """Generate the records for a range of levels. This runs in the worker processes.
+
+    Args:
+        color_model (str): The color model ("classic" or "perceptual").
+        seed (int): The deck's seed.
+        difficulty (float): The difficulty setting.
+        first_level (int): The first level to generate.
+        last_level (int): The level after the last one to generate.
+        per_level (int): The number of puzzles for each level.
+
+    Returns:
+        bytes: The packed records, in order.
+    """
+    records = bytearray(RECORD.size * per_level * (last_level - first_level))
+    offset = 0
+    for level in range(first_level, last_level):
+        generator = level_generator(color_model, seed, level)
+        for _ in range(per_level):
+            puzzle = generator.generate(level, difficulty)
+            RECORD.pack_into(records, offset, *puzzle.color, *puzzle.different_color,
+                             puzzle.row, puzzle.col, puzzle.level)
+            offset += RECORD.size
+    return bytes(records)
+
+
+def build(location, first_level, level_count, per_level=8, difficulty=1.0, color_model="classic", seed=0, workers=None):
+    """Build a deck file, generating its puzzles across a pool of processes.
+    The deck is written to a temporary file and renamed into place, so a deck is never left half-written.
+
+    Args:
+        location (str): The path of the deck file.
+        first_level (int): The first level in the deck.
+        level_count (int): The number of levels in the deck.
+        per_level (int, optional): The number of puzzles for each level. Defaults to 8.
+        difficulty (float, optional): The difficulty setting. Defaults to 1.0.
+        color_model (str, optional): The color model ("classic" or "perceptual"). Defaults to "classic".
+        seed (int, optional): The seed. The same settings and seed always give the same deck. Defaults to 0.
+        workers (int, optional): The number of processes to use. Defaults to one per CPU.
+    """
+    if (first_level < 1 or level_count < 1 or first_level + level_count - 1 > 0xFFFF or per_level < 1):
+        raise ValueError("Levels must be from 1 to 65535, with at least one puzzle per level.")
+    if (not 0.2 <= difficulty <= 5.0):
+        raise ValueError("Difficulty must be between 0.2 and 5.0.")
+    if (color_model not in storage.COLOR_MODELS):
+        raise ValueError("Color model must be 'classic' or 'perceptual'.")
+    if (not 0 <= seed <= MAX_SEED):
+        raise ValueError(f"Seed must be from 0 to {MAX_SEED}.")
+    header = HEADER.pack(MAGIC, VERSION, RECORD.size, difficulty, first_level, level_count, per_level, seed,
+                         color_model.encode("ascii")).ljust(HEADER_SIZE, b"\0")
+
+    last_level = first_level + level_count
+    chunks = [(start, min(start + CHUNK_LEVELS, last_level))
+              for start in range(first_level, last_level, CHUNK_LEVELS)]
+
+    directory = os.path.dirname(os.path.abspath(location))
+    handle, temp_location = tempfile.mkstemp(
+        dir=directory, prefix=".visage_", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file, concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            file.write(header)
+            # map() gives the results back in order, while the chunks are generated in parallel.
+            for records in pool.map(generate_levels, *zip(*[(color_model, seed, difficulty, start, end, per_level)
+                                                           for start, end in chunks])):
+                file.write(records)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_location, location)
+    except BaseException:
+        try:
+            os.remove(temp_location)
+        except OSError:
+            pass
+        raise
+
+
+def parse_levels(text):
+    """Parse a level range, e.g. "3-1000".
+    """
+    first, _, last = text.partition("-")
+    return int(first), int(last or first)
+
+
+def parse_seed(text):
+    """Parse a seed, which must fit in the deck's header.
+    """
+    seed = int(text)
+    if (not 0 <= seed <= MAX_SEED):
+        raise argparse.ArgumentTypeError(f"seed must be from 0 to {MAX_SEED}")
+    return seed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build or inspect Visage puzzle decks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="build a deck")
+    build_parser.add_argument("file", help="the deck file to write")
+    build_parser.add_argument("--levels", default="3-1000", type=parse_levels,
+                              help="levels to include, as FIRST-LAST (default 3-1000)")
+    build_parser.add_argument("--per-level", default=8, type=int,
+                              help="puzzles for each level, used in turn for each try (default 8)")
+    build_parser.add_argument("--difficulty", default=1.0, type=float,
+                              help="difficulty setting, from 0.2 to 5.0 (default 1.0)")
+    build_parser.add_argument("--model", default="classic", choices=("classic", "perceptual"),
+                              help="color model (default classic)")
+    build_parser.add_argument("--seed", default=0, type=parse_seed,
+                              help="seed; the same options and seed always give the same deck (default 0)")
+    build_parser.add_argument("--workers", type=int,
+                              help="processes to generate with (default: one per CPU)")
+
+    info_parser = commands.add_parser("info", help="describe a deck")
+    info_parser.add_argument("file", help="the deck file to read")
+
+    args = parser.parse_args(argv)
+
+    if (args.command == "build"):
+        first, last = args.levels
+        build(args.file, first, last - first + 1, args.per_level,
+              args.difficulty, args.model, args.seed, args.workers)
+
+    deck = Deck(args.file)
+    print(f"{args.file}: {len(deck)} puzzles, levels {deck.first_level}-{deck.first_level + deck.level_count - 1} "
+          f"({deck.per_level} per level), {engine.difficulty_label(deck.difficulty)} difficulty, "
+          f"{deck.color_model} colors, seed {deck.seed}")
+    deck.close()
+    return 0
+
+
+# RUNNING
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# Visage
+# a color game by Conor Eager
+# The game engine: lives, levels, scoring and checking clicks.
+# This module doesn't use Tk, so games can be played (and tested, and profiled) without a display.
+
+# IMPORTS
+# Import array for the compact grid description
+from array import array
+
+# Import time for timing each level
+import time
+
+# Import the color generator, which picks the colors for each level
+import colors
+
+# CONSTANTS
+
+# The level every game starts on (a 3x3 grid).
+START_LEVEL = 3
+
+# FUNCTIONS
+
+
+def starting_lives(difficulty):
+    """Work out how many lives a game starts with. Harder games get fewer lives.
+
+    Args:
+        difficulty (float): The difficulty setting.
+
+    Returns:
+        int: The number of lives, from 1 to 10.
+    """
+    lives = round(3 / difficulty)
+
+    if (lives > 10):
+        lives = 10
+    elif (lives < 1):
+        lives = 1
+
+    return lives
+
+
+def difficulty_label(difficulty):
+    """Generate a difficulty description for use in the UI, e.g. "Normal (10)".
+
+    Args:
+        difficulty (float): The difficulty setting.
+
+    Returns:
+        str: The description of the difficulty.
+    """
+    if (difficulty <= 0.75):
+        label = "Easy"
+    elif (difficulty <= 1.25):
+        label = "Normal"
+    elif (difficulty <= 3.0):
+        label = "Hard"
+    elif (difficulty <= 4.0):
+        label = "Very Hard"
+    else:
+        label = "Insane"
+
+    return f"{label} ({int(difficulty * 10)})"
+
+
+def puzzle_generator(color_model, rng=None, adaptive=False):
+    """Create the puzzle generator for a color model setting.
+
+    Args:
+        color_model (str): "classic" (a step in one RGB component) or "perceptual" (a set CIEDE2000 difference).
+        rng (random.Random, optional): The random number generator to use. Defaults to a new, unseeded generator.
+        adaptive (bool, optional): Whether to choose each puzzle's difference adaptively, to find the player's
+        threshold (see adaptive.py), instead of from the level & difficulty. Defaults to False.
+
+    Returns:
+        colors.PuzzleGenerator, perceptual.PerceptualGenerator or adaptive.AdaptiveGenerator: The generator.
+    """
+    if (color_model == "perceptual"):
+        # Only imported when it's used, as it brings in NumPy (if installed), which is slow to import.
+        import perceptual
+        generator = perceptual.PerceptualGenerator(rng)
+        low, high, whole = perceptual.MIN_DIFFERENCE, perceptual.TARGET_SCALE, False
+    else:
+        generator = colors.PuzzleGenerator(rng)
+        low, high, whole = 1, 0xFF, True
+    if (adaptive):
+        # Also only imported when it's used, for the same reason.
+        import adaptive as adaptive_module
+        return adaptive_module.AdaptiveGenerator(generator, low, high, whole)
+    return generator
+
+# CLASSES
+
+
+class GameState:
+    """This class contains the state of a single game: the level, lives, and current puzzle.
+    It contains the rules of the game, and nothing to do with drawing it - GameWindow drives it and
+    draws the result, but it can just as easily be driven by a script, at full speed.
+    """
+    __slots__ = ("difficulty", "difficulty_str", "level", "lives", "starting_lives", "over",
+                 "puzzle", "generator", "observe", "clock", "started", "finished", "level_started", "level_times", "_cells")
+
+    def __init__(self, difficulty, generator=None, level=START_LEVEL, clock=time.perf_counter):
+        """Start a new game.
+
+        Args:
+            difficulty (float): The difficulty setting.
+            generator (colors.PuzzleGenerator, optional): The generator to get puzzles from.
+            Pass one with a seeded random.Random to get the same game every time. Defaults to a new, unseeded generator.
+            level (int, optional): The level to start on. Defaults to START_LEVEL.
+            clock (function, optional): The clock used to time the game, in seconds. Defaults to time.perf_counter.
+        """
+        self.difficulty = difficulty
+        self.difficulty_str = difficulty_label(difficulty)
+        self.level = level
+        self.lives = starting_lives(difficulty)
+        self.starting_lives = self.lives
+        self.over = False
+        self.generator = generator if generator is not None else colors.PuzzleGenerator()
+        # Adaptive generators are told the result of each click, to choose the next puzzle.
+        self.observe = getattr(self.generator, "observe", None)
+
+        # Time the game, and each level in it.
+        self.clock = clock
+        self.started = clock()
+        self.finished = None
+        self.level_started = self.started
+        self.level_times = list()
+
+        # Generate the first puzzle.
+        self.new_puzzle()
+
+    @property
+    def score(self):
+        """float: The score for the game so far (the level times the difficulty)."""
+        return self.level * self.difficulty
+
+    @property
+    def lives_lost(self):
+        """int: The number of lives lost so far."""
+        return self.starting_lives - self.lives
+
+    @property
+    def duration(self):
+        """float: How long the game has lasted (or lasted, if it's over), in seconds."""
+        return (self.finished if self.finished is not None else self.clock()) - self.started
+
+    @property
+    def cells(self):
+        """array: The color of every cell in the grid, row by row, as 0xRRGGBB integers.
+        This is only built when asked for, so playing through levels doesn't pay for it.
+        """
+        if (self._cells is None):
+            puzzle = self.puzzle
+            red, green, blue = puzzle.color
+            self._cells = array("I", [(red << 16) | (green << 8) | blue]) * (puzzle.level ** 2)
+            red, green, blue = puzzle.different_color
+            self._cells[puzzle.row * puzzle.level + puzzle.col] = (red << 16) | (green << 8) | blue
+        return self._cells
+
+    def finish(self):
+        """End the game early, e.g. when the player quits part way through.
+        """
+        if (not self.over):
+            self.over = True
+            self.finished = self.clock()
+
+    def new_puzzle(self):
+        """Generate a new puzzle at the current level.
+        """
+        self.puzzle = self.generator.generate(self.level, self.difficulty)
+        self._cells = None
+
+    def click(self, row, col):
+        """Process a click on a cell.
+        If it's the different cell, move up a level. Otherwise, lose a life (and end the game if that was the last one).
+        Either way, a new puzzle is generated unless the game is over.
+
+        Args:
+            row (int): The row of the clicked cell.
+            col (int): The column of the clicked cell.
+
+        Returns:
+            bool: True if the click was correct, False if not.
+        """
+        if (self.over):
+            return False
+
+        puzzle = self.puzzle
+        correct = row == puzzle.row and col == puzzle.col
+        if (self.observe is not None):
+            self.observe(puzzle, correct)
+        if (correct):
+            # Different color: correct choice!
+            # Note how long the level took (including any wrong guesses on it).
+            now = self.clock()
+            self.level_times.append(now - self.level_started)
+            self.level_started = now
+            self.level += 1
+            self.new_puzzle()
+            return True
+
+        # Original color: incorrect.
+        self.lives -= 1
+        if (self.lives == 0):
+            # That was the last life.
+            self.over = True
+            self.finished = self.clock()
+        else:
+            # Try again, at the SAME level.
+            self.new_puzzle()
+        return False
@@ -3,20 +3,67 @@
 # Developed for 91906 Complex Programming Techniques, for Level 3 Computer Science.
 
 # IMPORTS
+# Import time for measuring startup, and how long the grid has spent building each frame
+import time
+
+# Note when the game started loading, for the startup report.
+STARTED = time.perf_counter()
+
+# Import argparse for reading command-line options
+import argparse
+
+# Import asyncio, and the bridge module that runs it inside Tk, for background work the window doesn't wait on
+import asyncio
+import bridge
+
 # Import Tk for graphical user interfaces
 import pathlib
 import tkinter as tk
 
-# Import random for random generation of colors
+# Import the game engine, which contains the rules of the game
+import engine
+
+# Import the storage module for saving and loading of user data & game state
+import storage
+
+# Import the history module for keeping a record of every game
+import history
+
+# Import the analytics module for running statistics across every game
+import analytics
+
+# Import the profiles module for keeping each player's settings & highscore separately
+import profiles
+
+# Import the metrics module for timing the game's hot paths
+import metrics
+
+# Import the deck module for playing pre-generated puzzles
+import deck
+
+# Import random for picking each game's seed, and the replay module for recording & replaying games
 import random
+import replay
+
+# Import the timeline module for timed events & animations
+import timeline
+
+# Import the theme module for the colors & fonts shared by every screen
+import theme
 
-# Import pickle for saving and loading of user data & game state
-import pickle
+# Import the view module for updating only the widget options that have changed
+import view
+
+# Import types for the display settings the game grid is drawn with
+import types
 
 # Import one function from os for finding the data file
 # From https://stackoverflow.com/a/4028943/7311875
 import os.path
 
+# Note when all the imports were finished, for the startup report.
+IMPORTED = time.perf_counter()
+
 # CLASSES
 
 
@@ -24,14 +71,284 @@ class Application:
     """This class contains the entire application. It calls the main menu, and handles initial loading of data.
     """
 
-    def __init__(self):
+    # How often to check on saves being written in the background, in milliseconds.
+    SAVE_CHECK_INTERVAL = 100
+
+    # How often to refresh the timings overlay while it is shown, in milliseconds.
+    OVERLAY_INTERVAL = 500
+
+    def __init__(self, startup_report=False, deck_location=None, replay_location=None):
         """Initialise game state, including loading data.
+
+        Args:
+            startup_report (bool, optional): Print how long each part of starting up took,
+            once the main menu is on screen. Defaults to False.
+            deck_location (str, optional): The path of a puzzle deck to play from, instead of generating puzzles.
+            Defaults to None.
+            replay_location (str, optional): The path of a session log to replay once the game has started.
+            Defaults to None.
         """
+        # Keep track of how long each part of starting up takes.
+        self.startup_report = startup_report
+        self.deck_location = deck_location
+        self.replay_location = replay_location
+        Application.deck = None
+        self.startup_times = [("Imports", IMPORTED - STARTED)]
+        phase_start = time.perf_counter()
+
+        # Create the one Tk window that every screen is shown in.
+        # This is only done once, so moving between screens doesn't have to start up Tk again.
+        Application.root = tk.Tk()
+        # Set the visual aspects of the window:
+        Application.root.configure(bg=theme.BACKGROUND)
+        # Fonts are shared by every widget from here on.
+        theme.setup(Application.root)
+        # Set the window to non-resizable.
+        Application.root.resizable(False, False)
+        Application.root.rowconfigure(0, weight=1)
+        Application.root.columnconfigure(0, weight=1)
+
+        # The timeline runs the current screen's timed events & animations, which are all cancelled when the screen changes.
+        Application.timeline = timeline.Timeline(Application.root)
+        # The bridge runs background work (as coroutines) alongside the window, without blocking it.
+        Application.bridge = bridge.Bridge(Application.root)
+
+        # The timings overlay, shown over every screen with F3.
+        self.overlay = None
+        Application.root.bind("<F3>", self.toggle_overlay)
+
+        self.startup_times.append(("Tk", time.perf_counter() - phase_start))
+        phase_start = time.perf_counter()
+
+        # Start with the default data. The saved data is loaded once the main menu is on screen,
+        # so that any messages about it are shown over the menu instead of holding it up.
+        # The game history & statistics are opened then too.
         Application.data = Data()
-        Application.data.load()
+        Application.history = None
+        Application.analytics = None
+
+        # Screens are built the first time they're shown, and kept for next time.
+        self.screens = dict()
+        self.current = None
+        # How long the last change of screen took, in seconds.
+        self.transition_time = None
 
         # Open the main menu.
-        self.main_menu = MainMenuWindow(self)
+        self.show(MainMenuWindow)
+        self.startup_times.append(
+            ("Main menu built", time.perf_counter() - phase_start))
+        self.phase_start = time.perf_counter()
+        Application.root.bind("<Map>", self.finish_startup)
+
+        # Start checking for saves that failed in the background.
+        self.exiting = False
+        self.check_saves()
+
+        # Keep the window open, waiting for something to happen.
+        # This is the only main loop: screens are swapped in and out of the same window.
+        Application.root.mainloop()
+
+    def open_history(self):
+        """Open the game history database. If it can't be opened, the history is kept in memory
+        for this session instead, and the user is told.
+        """
+        location = Application.data.resolve_history_location()
+        try:
+            Application.history = history.HistoryStore(location)
+        except Exception as e:
+            Application.history = history.HistoryStore()
+            msg = MessageWindow(
+                "Error", f"The Visage game history at\n'{location}'\ncould not be opened.\nGames played now will be shown on the leaderboard, but won't be kept after Visage is closed.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, "Continue")
+
+    def open_analytics(self):
+        """Open the analytics file. If it can't be read, the statistics are kept in memory
+        for this session instead, and the user is told.
+        """
+        location = Application.data.resolve_analytics_location()
+        try:
+            Application.analytics = analytics.AnalyticsStore(location)
+        except Exception as e:
+            Application.analytics = analytics.AnalyticsStore()
+            msg = MessageWindow(
+                "Error", f"The Visage statistics at\n'{location}'\ncould not be read.\nGames played now will be counted in the statistics, but won't be kept after Visage is closed.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, "Continue")
+
+    def report_analytics_errors(self, exiting=False):
+        """Show a message for a statistics save that failed in the background, if there was one.
+        This is checked regularly, along with the save file (see check_saves()).
+
+        Args:
+            exiting (bool, optional): Whether the game is closing, which changes the options offered. Defaults to False.
+
+        Returns:
+            bool: True if there was an error to show.
+        """
+        error = Application.analytics.take_error() if Application.analytics is not None else None
+        if (error is None):
+            return False
+
+        location, e = error
+        leave_text = "Exit Without Saving" if exiting else "Continue Without Saving"
+        # The statistics that weren't saved are kept, so trying again (or the next save) still adds them.
+        msg = MessageWindow(
+            "Error", f"Could not save the Visage statistics at\n'{location}'.\nGames played now are still counted, but haven't been saved. Please check that you have permission to write to this directory/file.\nIf you would like to try to save again, press 'Try Again'. To {leave_text.lower()}, press '{leave_text}'.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, leave_text, second_button={'text': 'Try Again', 'command': Application.analytics.save})
+        return True
+
+    def open_deck(self):
+        """Open the puzzle deck given on the command line, if there was one.
+        If it can't be opened, puzzles are generated as usual, and the user is told.
+        """
+        if (self.deck_location is None):
+            return
+        try:
+            Application.deck = deck.Deck(self.deck_location)
+        except Exception as e:
+            msg = MessageWindow(
+                "Error", f"The puzzle deck at\n'{self.deck_location}'\ncould not be opened.\nPuzzles will be generated as usual instead.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, "Continue")
+
+    def start_replay(self):
+        """Replay the session log given on the command line, if there was one, at the pace it was played.
+        """
+        if (self.replay_location is None):
+            return
+        try:
+            session = replay.Session.load(self.replay_location)
+        except Exception as e:
+            msg = MessageWindow(
+                "Error", f"The session log at\n'{self.replay_location}'\ncould not be read.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, "Continue")
+            return
+        self.show(GameWindow).replay(session)
+
+    def check_saves(self):
+        """Check on saves being written in the background, every SAVE_CHECK_INTERVAL milliseconds.
+        Any that failed are reported to the user. If the game is exiting, the window is closed once they're all written.
+        """
+        if (self.exiting):
+            # Close once everything has been written (including background work), and the user has seen any errors.
+            if ((Data.writer is None or Data.writer.idle()) and not Application.bridge.busy()
+                    and (Application.analytics is None or Application.analytics.idle())
+                    and not Application.data.report_save_errors(True) and not self.report_analytics_errors(True)):
+                Application.bridge.close()
+                # Finish writing the game history & statistics, and close them.
+                if (Application.history is not None):
+                    Application.history.close()
+                if (Application.analytics is not None):
+                    Application.analytics.close()
+                Application.root.destroy()
+                return
+        else:
+            Application.data.report_save_errors()
+            self.report_analytics_errors()
+
+        Application.root.after(
+            Application.SAVE_CHECK_INTERVAL, self.check_saves)
+
+    def toggle_overlay(self, event=None):
+        """Show or hide the timings overlay, which shows the p50/p95/p99 of every span in metrics.METRICS.
+        """
+        if (self.overlay is None):
+            self.overlay = tk.Label(Application.root, font=theme.font(10, family=theme.MONO_FAMILY), justify="left",
+                                    bg=theme.OVERLAY, fg=theme.GOOD, anchor="nw")
+            self.overlay.place(x=0, y=0)
+            self.update_overlay()
+        else:
+            self.overlay.destroy()
+            self.overlay = None
+
+    def update_overlay(self):
+        """Refresh the timings overlay every OVERLAY_INTERVAL milliseconds, while it is shown.
+        """
+        if (self.overlay is None):
+            return
+        self.overlay.configure(text=metrics.METRICS.report())
+        # Screens built after the overlay would otherwise cover it.
+        self.overlay.lift()
+        Application.root.after(Application.OVERLAY_INTERVAL,
+                               self.update_overlay)
+
+    def exit(self):
+        """Exit the game, once any saves have been written.
+        The window is hidden straight away, and closed when the data is safely on disk.
+        """
+        self.exiting = True
+        Application.root.withdraw()
+
+    def finish_startup(self, event):
+        """Finish starting up, once the main menu is on screen: load the saved data, and print the startup report if asked to.
+        """
+        # Every widget in the window passes its <Map> events on to the window's bindings,
+        # so wait for the window itself to appear. Only do this the first time.
+        if (event.widget is not Application.root):
+            return
+        Application.root.unbind("<Map>")
+        self.startup_times.append(
+            ("Main menu mapped", time.perf_counter() - self.phase_start))
+
+        phase_start = time.perf_counter()
+        Application.data.load()
+        # Show the player that was picked.
+        self.current.show()
+        self.startup_times.append(
+            ("Data loaded", time.perf_counter() - phase_start))
+
+        phase_start = time.perf_counter()
+        self.open_history()
+        self.startup_times.append(
+            ("History opened", time.perf_counter() - phase_start))
+
+        phase_start = time.perf_counter()
+        self.open_analytics()
+        self.startup_times.append(
+            ("Analytics opened", time.perf_counter() - phase_start))
+
+        phase_start = time.perf_counter()
+        self.open_deck()
+        self.startup_times.append(
+            ("Deck opened", time.perf_counter() - phase_start))
+
+        self.start_replay()
+
+        if (self.startup_report):
+            print("Visage startup report:")
+            for phase, duration in self.startup_times:
+                print(f"  {phase:<20}{duration * 1000:8.1f} ms")
+            print(
+                f"  {'Total':<20}{(time.perf_counter() - STARTED) * 1000:8.1f} ms")
+
+    def show(self, screen_class):
+        """Switch the window to a different screen, building it first if it hasn't been shown before.
+
+        Args:
+            screen_class (class): The Window subclass of the screen to show (e.g. MainMenuWindow).
+
+        Returns:
+            Window: The screen that is now shown.
+        """
+        start = time.perf_counter_ns()
+
+        if (screen_class not in self.screens):
+            self.screens[screen_class] = screen_class(self)
+        screen = self.screens[screen_class]
+
+        # Stop anything the old screen was still waiting to do, and hide it, showing the new one in its place.
+        Application.timeline.cancel_all()
+        if (self.current is not None):
+            self.current.root.grid_remove()
+        self.current = screen
+        Application.root.title(f"Visage / {screen.title}")
+        if (screen.width or screen.height):
+            Application.root.geometry(f"{screen.width}x{screen.height}")
+        Application.root.protocol("WM_DELETE_WINDOW", screen.close)
+        screen.root.grid(row=0, column=0, sticky="NESW")
+
+        # Let the screen bring itself up to date, e.g. with new settings.
+        screen.show()
+
+        with metrics.METRICS.span("tk update"):
+            Application.root.update_idletasks()
+        elapsed = time.perf_counter_ns() - start
+        metrics.METRICS.record("screen change", elapsed)
+        self.transition_time = elapsed / 1e9
+        return screen
 
 
 class Data:
@@ -40,96 +357,1041 @@ class Data:
     and for modifying and reading data (e.g. settings, highscores).
     """
 
+    # The background save writer, shared by every save. See save().
+    writer = None
+
+    # The player profiles, once they've been opened. See profile_store().
+    profiles = None
+
     def __init__(self):
         # Set the defaults.
-        self.button_outlines = False
-        self.button_gaps = True
-        self.highlight = "dot"
-        self.difficulty = 1.0
-        self.highscore = 3
+        self.apply(storage.DEFAULTS)
+        # The current player's profile ID. Until a player is picked (or if the profiles can't be opened),
+        # the data is saved in a single save file instead.
+        self.profile = None
 
     def resolve_save_location(self):
-        """Resolve the location of the user's save file.
-        This is their home directory plus the name of the save file ("visage_save.data").
+        """Resolve the location of the current player's save file, in the profile directory.
+        If there's no player yet, this is the single save file (see resolve_single_save_location()).
 
         Returns:
             String: The absolute path to the save file.
         """
+        if (self.profile is not None):
+            return Data.profiles.location(self.profile)
+        return self.resolve_single_save_location()
+
+    def resolve_single_save_location(self):
+        """Resolve the location of the save file from before there were player profiles.
+        This is the user's home directory plus the name of the save file ("visage_save.json").
+
+        Returns:
+            String: The absolute path to the save file.
+        """
+        return os.path.join(os.path.expanduser("~"), "visage_save.json")
+
+    def resolve_legacy_save_location(self):
+        """Resolve the location of a save file from an older version of Visage ("visage_save.data"),
+        which is read if there is no save file in the current format yet.
+
+        Returns:
+            String: The absolute path to the old save file.
+        """
         return os.path.join(os.path.expanduser("~"), "visage_save.data")
 
+    def resolve_history_location(self):
+        """Resolve the location of the user's game history database.
+        This is their home directory plus the name of the database ("visage_history.sqlite3").
+
+        Returns:
+            String: The absolute path to the game history database.
+        """
+        return os.path.join(os.path.expanduser("~"), "visage_history.sqlite3")
+
+    def resolve_analytics_location(self):
+        """Resolve the location of the statistics file, which is kept for every game played (like the history).
+        This is their home directory plus the name of the file ("visage_analytics.json").
+
+        Returns:
+            String: The absolute path to the statistics file.
+        """
+        return os.path.join(os.path.expanduser("~"), "visage_analytics.json")
+
+    def resolve_profile_directory(self):
+        """Resolve the location of the directory the player profiles are kept in.
+        This is the user's home directory plus the name of the directory ("visage_profiles").
+
+        Returns:
+            String: The absolute path to the profile directory.
+        """
+        return os.path.join(os.path.expanduser("~"), "visage_profiles")
+
+    def profile_store(self):
+        """Get the player profiles, opening them the first time.
+
+        Returns:
+            profiles.ProfileStore: The profiles.
+        """
+        if (Data.profiles is None):
+            Data.profiles = profiles.ProfileStore(
+                self.resolve_profile_directory())
+        return Data.profiles
+
+    def resolve_session_directory(self):
+        """Resolve the location of the directory the user's session logs are kept in.
+        This is their home directory plus the name of the directory ("visage_sessions").
+
+        Returns:
+            String: The absolute path to the session log directory.
+        """
+        return os.path.join(os.path.expanduser("~"), "visage_sessions")
+
+    def fields(self):
+        """Get the data to save.
+
+        Returns:
+            dict: The settings & highscore, by name.
+        """
+        return {key: getattr(self, key) for key in storage.DEFAULTS}
+
+    def apply(self, fields):
+        """Replace the current data with loaded data.
+
+        Args:
+            fields (dict): The settings & highscore, by name (already checked by the storage module).
+        """
+        for key, value in fields.items():
+            setattr(self, key, value)
+
     def save(self):
         """Save the game state to persistent storage.
+        The data is written in the background, so this returns straight away.
+        If the save fails, the error is shown by report_save_errors().
+
+        Returns:
+            concurrent.futures.Future: Completes once the data has been written.
         """
 
         # First, get the location to save to. This is the user's home directory.
         # From https://stackoverflow.com/a/4028943/7311875
         location = self.resolve_save_location()
 
-        # Open the file to save to.
+        # Start the save writer the first time something is saved.
+        # It is shared, so saves made in quick succession are merged into one write.
+        if (Data.writer is None):
+            Data.writer = storage.SaveWriter()
+
+        # Hand a copy of the data to the writer. It's written to a temporary file first,
+        # so a crash part way through can't leave a half-written save file behind.
+        # Players' save files are written under the profiles' lock, as other copies of the game may share them.
+        write = Data.profiles.save if self.profile is not None else None
+        with metrics.METRICS.span("save submit"):
+            return Data.writer.submit(location, self.fields(), write)
+
+    async def save_async(self):
+        """Save the game state to persistent storage, finishing once the data has been written.
+        See save().
+
+        Raises:
+            Exception: If the save failed.
+
+        Returns:
+            str: The location the data was saved to.
+        """
+        return await asyncio.wrap_future(self.save())
+
+    def report_save_errors(self, exiting=False):
+        """Show a message for a save that failed in the background, if there was one.
+        This is checked regularly by the Application.
+
+        Args:
+            exiting (bool, optional): Whether the game is closing, which changes the options offered. Defaults to False.
+
+        Returns:
+            bool: True if there was an error to show.
+        """
+        error = Data.writer.take_error() if Data.writer is not None else None
+        if (error is None):
+            return False
+
+        location, e = error
+        leave_text = "Exit Without Saving" if exiting else "Continue Without Saving"
+        # If there's an error, alert the user.
+        msg = MessageWindow(
+            "Error", f"Could not save Visage data at\n'{location}'.\nYour progress and settings have not been saved. Please check that you have permission to write to this directory/file.\nIf you would like to try to save again, press 'Try Again'. To {leave_text.lower()}, press '{leave_text}'.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, leave_text, second_button={'text': 'Try Again', 'command': self.save})
+        return True
+
+    def read(self):
+        """Read the saved data for the player picked last, without applying it (but picking the player).
+        The first time, a player is created to take over the single save file from before there were profiles.
+
+        Raises:
+            FileNotFoundError: If there was no save file to take over (the new player is still created).
+            Exception: If the save file couldn't be read.
+
+        Returns:
+            dict: The settings & highscore, by name (checked by the storage module).
+        """
+        store = self.profile_store()
+        profile = store.current()
+        if (profile is not None):
+            fields = store.load(profile)
+            self.profile = profile
+            return fields
+
+        try:
+            fields = self.read_single()
+        except FileNotFoundError:
+            fields = None
+        profile = store.create("Player 1", fields)
+        store.select(profile)
+        self.profile = profile
+        if (fields is None):
+            raise FileNotFoundError(self.resolve_save_location())
+        return fields
+
+    def read_single(self):
+        """Read the single save file from before there were player profiles.
+
+        Raises:
+            FileNotFoundError: If there is no save file.
+            Exception: If the save file couldn't be read.
+
+        Returns:
+            dict: The settings & highscore, by name (checked by the storage module).
+        """
+        # First, get the location to load from. This is the user's home directory.
+        # From https://stackoverflow.com/a/4028943/7311875
+        try:
+            return storage.load(self.resolve_single_save_location())
+        except FileNotFoundError:
+            # No savefile in the current format. Try one from an older version instead.
+            return storage.load(self.resolve_legacy_save_location())
+
+    async def select_profile(self, profile):
+        """Switch to another player. The current player's data is saved, then the new player's is loaded in its place.
+        The files are written & read in the background, so the window carries on in the meantime.
+
+        Args:
+            profile (str): The new player's profile ID.
+
+        Raises:
+            profiles.ProfileError: If the player has been deleted.
+            Exception: If the current player's data couldn't be saved, or the new player's couldn't be read.
+        """
+        if (self.profile is not None):
+            # Their save must be written before it can be read back (e.g. when switching back to them).
+            await self.save_async()
+        store = self.profile_store()
+
+        def read():
+            # This runs on a worker thread, so it only touches the files; the data is changed once it's back.
+            fields = store.load(profile)
+            store.select(profile)
+            return fields
+
+        fields = await asyncio.get_running_loop().run_in_executor(None, read)
+        self.profile = profile
+        self.apply(storage.DEFAULTS)
+        self.apply(fields)
+
+    def load(self):
+        """Load the game state from persistent storage.
+        """
         try:
-            with open(location, "wb") as file:
-                # Now save the entire contents of the Data class to a Pickle file in that location.
-                pickle.dump(self, file)
+            # Copy the checked data into this Data object.
+            self.apply(self.read())
         except Exception as e:
+            self.report_load_error(e)
+
+    def report_load_error(self, e):
+        """Tell the user why their data couldn't be loaded.
+
+        Args:
+            e (Exception): The error from read().
+        """
+        location = self.resolve_save_location()
+        if (isinstance(e, FileNotFoundError)):
+            # No savefile exists.
+            msg = MessageWindow(
+                "Information", f"No Visage savefile was found. A new save file will be created at\n'{location}'.\nGame data, including scores & settings, is saved automatically.\nPlease ensure you have access to this location and that your\naccount has the necessary permissions to read/write data there.", 1000, 600, "Continue")
+        else:
             # If there's an error, alert the user.
             msg = MessageWindow(
-                "Error", f"Could not save Visage data at\n'{location}'.\nYour progress and settings have not been saved. Please check that you have permission to write to this directory/file.\nIf you would like to try to save again, press 'Try Again'. To exit without saving your data, press 'Exit Without Saving'.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, "Exit Without Saving", second_button={'text': 'Try Again', 'command': self.save})
+                "Error", f"A Visage save file was found at\n'{location}',\nbut it could not be read.\nPlease check you have permission to access this file and that it has not been edited.\nIf you would like to try to load again, press 'Try Again'. To continue without loading your data, press 'Continue Without Loading'.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, "Continue Without Loading", second_button={'text': 'Try Again', 'command': self.load})
 
-    def load(self):
-        """Load the game state from persistent storage.
+
+class Window:
+    """This class contains code for a basic screen.
+    All screens are shown in the same Tk window, one at a time (see Application.show()).
+    Any elements or configuration that should be applied across all screens is done here.
+    """
+
+    # The logo image, once it has been loaded. See Window.logo().
+    logo_image = None
+
+    def __init__(self, title, width, height):
+        # Keep the title & size, to set on the window when this screen is shown.
+        self.title = title
+        self.width = width
+        self.height = height
+        # Create the frame that holds everything on this screen.
+        # Widgets are created inside this rather than in the window itself, so screens can be swapped.
+        self.root = tk.Frame(Application.root, bg=theme.BACKGROUND)
+        # Set up the font.
+        self.font = theme.font(20)
+
+    def show(self):
+        """Called each time the screen is shown. Screens override this to bring themselves up to date.
+        """
+        pass
+
+    def close(self):
+        """Called when the window's close button is pressed while this screen is shown.
+        Screens override this to go back or quit.
+        """
+        pass
+
+    def logo():
+        """Get the Visage logo image. It is only loaded from disk (and decoded) the first time,
+        and the same image is shared for the rest of the time the game is open.
+
+        Returns:
+            tk.PhotoImage: The logo.
+        """
+        if (Window.logo_image is None):
+            # Resolve the file path of the logo, based on the current working directory.
+            # Without this, the game would not run with the wrong working directory (i.e. not the same as the script).
+            # This special function is needed to ensure that the directory separators are correct
+            # ('/' on Mac and Unix systems, and '\' on Windows)
+            #          Join...      the current location of the script...    with the filename.
+            img_path = os.path.join(pathlib.Path(
+                __file__).parent.resolve(), "logo.png")
+
+            # Keeping the image here also stops Python throwing it away while it's still shown.
+            Window.logo_image = tk.PhotoImage(file=img_path)
+        return Window.logo_image
+
+    def Button(parent, fontsize=20, **kwargs):
+        """Generate a new tk.Button with some sensible defaults set. This ensures that all buttons are consistent
+        across the game UI, and eliminates the need to copy/paste arguments all over the place.
+
+        Args:
+            parent (tk.<container>): The container that the new button will be created as a child of.
+            fontsize (int, optional): The font size of the text on the button. Defaults to 20.
+
+        Returns:
+            tk.Button: The newly generated button.
+        """
+        return tk.Button(parent, font=theme.font(fontsize), **theme.NORMAL, relief="flat", **kwargs)
+
+
+class CanvasGrid:
+    """This class draws the grid of colored cells for the game onto a single tk.Canvas.
+    Each cell is a canvas rectangle rather than a separate tk.Button, so a grid costs one widget
+    no matter how large the level gets. Clicks are mapped back to a cell using the event coordinates.
+    """
+
+    # The longest time, in seconds, to spend building cells before letting Tk redraw (8 ms, half a 60 Hz frame).
+    FRAME_BUDGET = 0.008
+
+    def __init__(self, parent, size, data, command, canvas=None):
+        """Create a new CanvasGrid.
+
+        Args:
+            parent (tk.<container>): The container that the canvas will be created as a child of.
+            size (int): The width and height of the grid, in pixels.
+            data (Data): Where to get the outline, gap & highlight settings: the global Data object, or a game's own
+            settings (see GameWindow.use_settings()).
+            command (function): The function to call when a cell is clicked. It is passed the row and column.
+            canvas (tk.Canvas, optional): An existing canvas to draw on, instead of creating one in parent
+            (used by the benchmarks to draw without a display). Defaults to None.
+        """
+        self.size = size
+        self.data = data
+        self.command = command
+
+        # The grid starts empty; draw() fills it in.
+        # The cells are kept in a 2D array of canvas item IDs, which is grown and shrunk as needed.
+        self.level = 0
+        self.pitch = size
+        self.cells = list()
+        # The gap & outline settings the cells were made with.
+        self.style = None
+
+        # The build in progress, if any. See draw() and build().
+        self.steps = None
+        self.pending = None
+        self.progress = None
+        self.callback = None
+        # When the build started, from time.perf_counter_ns(), for timing it.
+        self.started = None
+
+        # The cell currently under the mouse, if any, and its fill before it was highlighted.
+        self.hover = None
+        self.hover_fill = None
+
+        if (canvas is None):
+            canvas = tk.Canvas(parent, width=size, height=size,
+                               bg=theme.BACKGROUND, highlightthickness=0)
+        self.canvas = canvas
+
+        # The dot shown on the hovered cell, and the dot used to mark the different cell.
+        # These are moved around the grid instead of giving every cell its own dot.
+        self.hover_dot = self.canvas.create_text(
+            0, 0, text="●", fill=theme.FOREGROUND, state="hidden")
+        self.marker_dot = self.canvas.create_text(
+            0, 0, text="●", fill=theme.FOREGROUND, state="hidden")
+
+        # One binding for the whole grid, instead of one command per button.
+        self.canvas.bind("<Button-1>", self.click)
+        self.canvas.bind("<Motion>", self.motion)
+        self.canvas.bind("<Leave>", lambda event: self.set_hover(None))
+
+    def grid(self, **kwargs):
+        """Place the grid's canvas in its parent, using the grid geometry manager.
+        """
+        self.canvas.grid(**kwargs)
+
+    def grid_remove(self):
+        """Hide the grid's canvas, remembering its grid options.
+        """
+        self.canvas.grid_remove()
+
+    def cell_at(self, x, y):
+        """Find the cell at a point on the canvas.
+
+        Args:
+            x (int): The x coordinate, in pixels.
+            y (int): The y coordinate, in pixels.
+
+        Returns:
+            tuple: The (row, column) of the cell, or None if the point is outside the grid
+            (or the grid is still being built).
+        """
+        if (self.steps is not None or self.level == 0 or x < 0 or y < 0):
+            return None
+        row = int(y // self.pitch)
+        col = int(x // self.pitch)
+        if (row >= self.level or col >= self.level):
+            return None
+        return (row, col)
+
+    def centre(self, row, col):
+        """Get the centre point of a cell.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            tuple: The (x, y) coordinates of the centre of the cell.
+        """
+        return ((col + 0.5) * self.pitch, (row + 0.5) * self.pitch)
+
+    def draw(self, level, color, different_color, diff_row, diff_col, progress=None, callback=None):
+        """Show a new grid of cells.
+        The existing cells are kept and recolored; only the rows and columns that
+        changed are added or removed, so moving up a level only creates 2N+1 new cells.
+
+        The cells are built a chunk at a time, with each chunk limited to FRAME_BUDGET seconds,
+        so the window keeps redrawing and responding while a large grid is built.
+
+        Args:
+            level (int): The number of rows and columns in the grid.
+            color (str): The "correct" color, used for every cell but one.
+            different_color (str): The "incorrect" color, used for the different cell.
+            diff_row (int): The row of the different cell.
+            diff_col (int): The column of the different cell.
+            progress (function, optional): Called at most once per chunk with the number of cells built so far
+            and the total number to build. Defaults to None.
+            callback (function, optional): Called once the grid is finished. Defaults to None.
+        """
+        # Stop any build that is still in progress.
+        self.cancel()
+
+        self.set_hover(None)
+        self.canvas.itemconfigure(self.marker_dot, state="hidden")
+
+        # If the gap or outline settings have changed since the cells were made, start again from scratch.
+        style = (self.data.button_gaps, self.data.button_outlines)
+        if (style != self.style):
+            self.clear()
+            self.style = style
+
+        self.progress = progress
+        self.callback = callback
+        self.colors = (color, different_color, diff_row, diff_col)
+        self.steps = self.resize(level)
+        self.started = time.perf_counter_ns()
+        self.built = 0
+        if (level > self.level):
+            self.total = level**2 - self.level**2
+        else:
+            self.total = self.level - level
+
+        # Start building once Tk is idle.
+        self.pending = self.canvas.after_idle(self.build)
+
+    def build(self):
+        """Build the next chunk of the grid, then schedule the chunk after it (or finish).
+        """
+        self.pending = None
+        start = time.perf_counter_ns()
+        deadline = time.perf_counter() + CanvasGrid.FRAME_BUDGET
+
+        for _ in self.steps:
+            self.built += 1
+            # Checking the clock is cheap, but not free, so only check it every few cells.
+            if (self.built % 16 == 0 and time.perf_counter() >= deadline):
+                # Out of time for this frame. Report progress, and carry on in the next one.
+                # Using after() rather than after_idle() lets Tk redraw and handle input in between.
+                if (self.progress):
+                    self.progress(self.built, self.total)
+                self.pending = self.canvas.after(1, self.build)
+                metrics.METRICS.record(
+                    "build chunk", time.perf_counter_ns() - start)
+                return
+
+        # Finished! Recolor every cell with a single call, then pick out the different one.
+        color, different_color, diff_row, diff_col = self.colors
+        self.canvas.itemconfigure("cell", fill=color)
+        self.canvas.itemconfigure(
+            self.cells[diff_row][diff_col], fill=different_color)
+
+        now = time.perf_counter_ns()
+        metrics.METRICS.record("build chunk", now - start)
+        # The whole build, including the time Tk spent redrawing between chunks.
+        metrics.METRICS.record("grid build", now - self.started)
+
+        self.steps = None
+        if (self.callback):
+            self.callback()
+
+    def clear(self):
+        """Remove every cell from the grid.
+        """
+        self.cancel()
+        self.set_hover(None)
+        self.canvas.delete("cell", "gap")
+        self.cells = list()
+        self.level = 0
+        self.pitch = self.size
+
+    def cancel(self):
+        """Cancel any build that is in progress. Cells built so far are kept.
+        """
+        if (self.pending is not None):
+            self.canvas.after_cancel(self.pending)
+            self.pending = None
+        if (self.steps is not None):
+            # Finish the resize without pausing, so the grid is left in a consistent state.
+            for _ in self.steps:
+                pass
+            self.steps = None
+
+    def resize(self, level):
+        """Change the number of rows and columns in the grid, keeping the existing cells.
+        This is a generator, which yields after each cell is created or removed so the work can be split up.
+
+        Args:
+            level (int): The new number of rows and columns.
+        """
+        old_level = self.level
+        if (level == old_level):
+            return
+        pitch = self.size / level
+
+        if (old_level > 0):
+            # Move and resize the existing cells in one go.
+            # Outline widths aren't scaled, so the gaps & outlines stay the same size.
+            scale = pitch / self.pitch
+            self.canvas.scale("cell", 0, 0, scale, scale)
+
+        self.level = level
+        self.pitch = pitch
+
+        # Remove the rows and columns that are no longer needed.
+        # Every cell is tagged with its row and column, so each one is a single call.
+        del self.cells[level:]
+        for row in self.cells:
+            del row[level:]
+        for i in range(level, old_level):
+            self.canvas.delete(f"row{i}", f"col{i}")
+            yield
+
+        # The gaps are drawn as lines over the cell borders, so they are redrawn to fit the new size.
+        self.canvas.delete("gap")
+        if (self.data.button_gaps is True):
+            for i in range(0, level + 1):
+                self.canvas.create_line(
+                    i * pitch, 0, i * pitch, self.size, fill=theme.BACKGROUND, width=2, tags="gap")
+                self.canvas.create_line(
+                    0, i * pitch, self.size, i * pitch, fill=theme.BACKGROUND, width=2, tags="gap")
+
+        # Size the dots to match the cells, and keep them above them.
+        font = theme.cell_font(level)
+        self.canvas.itemconfigure(self.hover_dot, font=font)
+        self.canvas.itemconfigure(self.marker_dot, font=font)
+        self.canvas.tag_raise(self.hover_dot)
+        self.canvas.tag_raise(self.marker_dot)
+
+        # Add the new rows and columns: the new column on the existing rows, then the new rows.
+        # New cells go below the gaps and dots.
+        for row in range(0, min(old_level, level)):
+            for col in range(old_level, level):
+                cell = self.create_cell(row, col)
+                self.canvas.tag_lower(cell)
+                self.cells[row].append(cell)
+                yield
+        for row in range(old_level, level):
+            self.cells.append([])
+            for col in range(0, level):
+                cell = self.create_cell(row, col)
+                self.canvas.tag_lower(cell)
+                self.cells[row].append(cell)
+                yield
+
+    def create_cell(self, row, col):
+        """Create the rectangle for a single cell.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+
+        Returns:
+            int: The canvas item ID of the new cell.
+        """
+        # Outlines are drawn wide enough to still show either side of a gap.
+        if (self.data.button_outlines is True):
+            outline = theme.OUTLINE
+            width = 4 if self.data.button_gaps is True else 1
+        else:
+            outline = ""
+            width = 0
+
+        x = col * self.pitch
+        y = row * self.pitch
+        cell = self.canvas.create_rectangle(
+            x, y, x + self.pitch, y + self.pitch, outline=outline, width=width,
+            tags=("cell", f"row{row}", f"col{col}"))
+        return cell
+
+    def set_marker(self, row, col, visible):
+        """Show or hide the dot marking a cell (used to point out the different cell).
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+            visible (bool): Whether the dot should be shown.
+        """
+        self.canvas.coords(self.marker_dot, *self.centre(row, col))
+        self.canvas.itemconfigure(
+            self.marker_dot, state="normal" if visible else "hidden")
+
+    def set_hover(self, cell):
+        """Move the hover highlight to a new cell, according to the highlight setting.
+
+        Args:
+            cell (tuple): The (row, column) of the cell under the mouse, or None.
+        """
+        if (cell == self.hover):
+            return
+
+        # Remove the highlight from the old cell.
+        if (self.hover is not None and self.data.highlight == "color"):
+            row, col = self.hover
+            self.canvas.itemconfigure(
+                self.cells[row][col], fill=self.hover_fill)
+        self.canvas.itemconfigure(self.hover_dot, state="hidden")
+
+        self.hover = cell
+        if (cell is None):
+            return
+
+        # Highlight the new cell.
+        row, col = cell
+        if (self.data.highlight == "color"):
+            self.hover_fill = self.canvas.itemcget(
+                self.cells[row][col], "fill")
+            self.canvas.itemconfigure(self.cells[row][col], fill=theme.FOREGROUND)
+        elif (self.data.highlight == "dot"):
+            self.canvas.coords(self.hover_dot, *self.centre(row, col))
+            self.canvas.itemconfigure(self.hover_dot, state="normal")
+
+    def motion(self, event):
+        """Process the mouse moving over the grid.
+        """
+        self.set_hover(self.cell_at(event.x, event.y))
+
+    def click(self, event):
+        """Process a click on the grid, passing the clicked cell on to the command.
+        """
+        cell = self.cell_at(event.x, event.y)
+        if (cell is not None):
+            self.command(*cell)
+
+
+class RasterGrid:
+    """This class draws the grid of colored cells for the game into a single tk.PhotoImage, for very large levels
+    (where even a canvas item per cell gets slow). Every row of pixels in a grid is one of only a few patterns,
+    so each pattern is worked out once and put() across a whole band of rows at a time.
+    The view can be zoomed (with the mouse wheel) and panned (by dragging with the right mouse button),
+    and clicks are mapped back to a cell with a lookup of the pixel's row and column.
+    It has the same methods as CanvasGrid, so GameWindow can use either.
+    """
+
+    # The furthest the view can be zoomed in, as a multiple of the whole grid fitting the image.
+    # (It can't be zoomed out past 1, or past the cells being a pixel across for levels wider than the image.)
+    MAX_ZOOM = 8
+    # How much each step of the mouse wheel zooms in or out.
+    ZOOM_STEP = 1.25
+    # Gaps & outlines are only drawn when the cells are at least this many pixels across,
+    # so they don't swallow small cells. (Zooming in brings them back.)
+    BORDER_PITCH = 6
+
+    # The kinds of pixel in a row or column of the grid.
+    GAP, OUTLINE, CELL = range(3)
+
+    def __init__(self, parent, size, data, command, canvas=None, image=None):
+        """Create a new RasterGrid.
+
+        Args:
+            parent (tk.<container>): The container that the canvas will be created as a child of.
+            size (int): The width and height of the grid, in pixels.
+            data (Data): Where to get the outline, gap & highlight settings: the global Data object, or a game's own
+            settings (see GameWindow.use_settings()).
+            command (function): The function to call when a cell is clicked. It is passed the row and column.
+            canvas (tk.Canvas, optional): An existing canvas to draw on, instead of creating one in parent.
+            Defaults to None.
+            image (tk.PhotoImage, optional): An existing image to draw into, instead of creating one
+            (used by the tests to draw without a display). Defaults to None.
+        """
+        self.size = size
+        self.data = data
+        self.command = command
+
+        self.level = 0
+        # The colors of the grid being shown: (color, different color, row, column) of the different cell.
+        self.colors = None
+        # The view: how far it's zoomed in, and the (x, y) of its top-left corner in the zoomed grid, in pixels.
+        self.zoom = 1.0
+        self.offset = [0.0, 0.0]
+        # For each column (x) and row (y) of pixels in the image: the (cell index, kind of pixel) it shows.
+        # See layout().
+        self.pixels = (list(), list())
+        # For each cell index shown, along each axis: the first & last+1 pixels of its inside (not gaps or outlines).
+        self.spans = (dict(), dict())
+
+        # The render waiting to happen, if any. See draw() and build().
+        self.pending = None
+        self.callback = None
+        # When the draw started, from time.perf_counter_ns(), for timing it.
+        self.started = None
+
+        # The cell under the mouse, the cell marked with a dot, and where the last pan drag was, if any.
+        self.hover = None
+        self.marker = None
+        self.drag = None
+
+        if (canvas is None):
+            canvas = tk.Canvas(parent, width=size, height=size,
+                               bg=theme.BACKGROUND, highlightthickness=0)
+        self.canvas = canvas
+        if (image is None):
+            image = tk.PhotoImage(width=size, height=size)
+        self.image = image
+        self.canvas.create_image(0, 0, image=self.image, anchor="nw")
+
+        self.canvas.bind("<Button-1>", self.click)
+        self.canvas.bind("<Motion>", self.motion)
+        self.canvas.bind("<Leave>", lambda event: self.set_hover(None))
+        # The mouse wheel is <MouseWheel> on Windows & macOS, and buttons 4 & 5 on Linux.
+        self.canvas.bind("<MouseWheel>", self.wheel)
+        self.canvas.bind("<Button-4>", self.wheel)
+        self.canvas.bind("<Button-5>", self.wheel)
+        self.canvas.bind("<ButtonPress-3>", self.start_pan)
+        self.canvas.bind("<B3-Motion>", self.pan)
+
+    def grid(self, **kwargs):
+        """Place the grid's canvas in its parent, using the grid geometry manager.
+        """
+        self.canvas.grid(**kwargs)
+
+    def grid_remove(self):
+        """Hide the grid's canvas, remembering its grid options.
+        """
+        self.canvas.grid_remove()
+
+    def cell_at(self, x, y):
+        """Find the cell at a point on the canvas.
+
+        Args:
+            x (int): The x coordinate, in pixels.
+            y (int): The y coordinate, in pixels.
+
+        Returns:
+            tuple: The (row, column) of the cell, or None if the point is outside the grid
+            (or the grid is still being drawn).
+        """
+        if (self.pending is not None or self.level == 0 or not (0 <= x < self.size and 0 <= y < self.size)):
+            return None
+        return (self.pixels[1][int(y)][0], self.pixels[0][int(x)][0])
+
+    def draw(self, level, color, different_color, diff_row, diff_col, progress=None, callback=None):
+        """Show a new grid of cells. The image is drawn once Tk is idle, in one go.
+        The view keeps its zoom & position, so a player zoomed in on part of the grid stays there.
+
+        Args:
+            level (int): The number of rows and columns in the grid.
+            color (str): The "correct" color, used for every cell but one.
+            different_color (str): The "incorrect" color, used for the different cell.
+            diff_row (int): The row of the different cell.
+            diff_col (int): The column of the different cell.
+            progress (function, optional): Not used, as the image is drawn in one go
+            (accepted so it can be used in place of a CanvasGrid). Defaults to None.
+            callback (function, optional): Called once the grid is finished. Defaults to None.
+        """
+        self.cancel()
+        self.hover = None
+        self.marker = None
+        self.level = level
+        self.colors = (color, different_color, diff_row, diff_col)
+        self.callback = callback
+        self.started = time.perf_counter_ns()
+        self.pending = self.canvas.after_idle(self.build)
+        # Past a level as wide as the image, zoom in far enough for every cell to be at least a pixel across,
+        # or some cells (maybe the different one) wouldn't be drawn at all.
+        self.zoom_at(self.size / 2, self.size / 2, 1.0)
+
+    def build(self):
+        """Draw the grid that draw() was given, then call its callback.
+        """
+        self.pending = None
+        self.render()
+        metrics.METRICS.record(
+            "grid build", time.perf_counter_ns() - self.started)
+        if (self.callback):
+            self.callback()
+
+    def layout(self):
+        """Work out which cell, and which part of it, every row & column of pixels in the image shows,
+        for the current level and view.
+        """
+        pitch = self.size * self.zoom / self.level
+        if (pitch >= RasterGrid.BORDER_PITCH):
+            # Gaps are 2 pixels wide (1 either side of the border), with outlines 1 pixel inside them.
+            gap = 1 if self.data.button_gaps is True else 0
+            outline = gap + (1 if self.data.button_outlines is True else 0)
+        else:
+            gap = outline = 0
+
+        for axis in (0, 1):
+            pixels = list()
+            spans = dict()
+            for p in range(0, self.size):
+                v = self.offset[axis] + p + 0.5
+                index = min(int(v // pitch), self.level - 1)
+                edge = min(v - index * pitch, (index + 1) * pitch - v)
+                if (edge < gap):
+                    kind = RasterGrid.GAP
+                elif (edge < outline):
+                    kind = RasterGrid.OUTLINE
+                else:
+                    kind = RasterGrid.CELL
+                    first, last = spans.get(index, (p, p))
+                    spans[index] = (first, p + 1)
+                pixels.append((index, kind))
+            self.pixels[axis][:] = pixels
+            self.spans[axis].clear()
+            self.spans[axis].update(spans)
+
+    def render(self):
+        """Draw the whole view into the image.
+        """
+        if (self.level == 0):
+            return
+        self.layout()
+        color, different_color, diff_row, diff_col = self.colors
+        columns, rows = self.pixels
+
+        # Work out each pattern of pixels a row can have, as image data (one Tk color per pixel).
+        gap_row = [theme.BACKGROUND] * self.size
+        outline_row = [theme.BACKGROUND if kind == RasterGrid.GAP else theme.OUTLINE for index, kind in columns]
+        cell_row = [color if kind == RasterGrid.CELL else pixel
+                    for (index, kind), pixel in zip(columns, outline_row)]
+        diff_cell_row = [different_color if kind == RasterGrid.CELL and index == diff_col else pixel
+                         for (index, kind), pixel in zip(columns, cell_row)]
+        data = {name: "{" + " ".join(pixels) + "}"
+                for name, pixels in (("gap", gap_row), ("outline", outline_row), ("cell", cell_row), ("diff", diff_cell_row))}
+
+        # Put each pattern across the whole band of rows that shows it. (Tk repeats data to fill the area it's put in.)
+        def pattern(row):
+            index, kind = row
+            if (kind == RasterGrid.GAP):
+                return data["gap"]
+            if (kind == RasterGrid.OUTLINE):
+                return data["outline"]
+            return data["diff"] if index == diff_row else data["cell"]
+
+        start = 0
+        for y in range(1, self.size + 1):
+            if (y == self.size or pattern(rows[y]) is not pattern(rows[start])):
+                self.image.put(pattern(rows[start]), to=(
+                    0, start, self.size, y))
+                start = y
+
+        # Put the hover highlight & marker back.
+        for cell in (self.hover, self.marker):
+            if (cell is not None):
+                self.paint_cell(*cell)
+
+    def paint_cell(self, row, col):
+        """Redraw just the inside of one cell, with the hover highlight & marker dot if it has them.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+        """
+        if (self.pending is not None or self.colors is None):
+            # The whole grid is about to be drawn anyway.
+            return
+        xs = self.spans[0].get(col)
+        ys = self.spans[1].get(row)
+        if (xs is None or ys is None):
+            # The cell is outside the view.
+            return
+
+        color, different_color, diff_row, diff_col = self.colors
+        fill = different_color if (row, col) == (diff_row, diff_col) else color
+        if (self.hover == (row, col) and self.data.highlight == "color"):
+            fill = theme.FOREGROUND
+        self.image.put(fill, to=(xs[0], ys[0], xs[1], ys[1]))
+
+        if (self.marker == (row, col) or (self.hover == (row, col) and self.data.highlight == "dot")):
+            # A square dot, a third of the cell across.
+            pitch = self.size * self.zoom / self.level
+            radius = max(1, round(pitch / 6))
+            x = round((col + 0.5) * pitch - self.offset[0])
+            y = round((row + 0.5) * pitch - self.offset[1])
+            self.image.put(theme.FOREGROUND, to=(max(xs[0], x - radius), max(ys[0], y - radius),
+                                          min(xs[1], x + radius), min(ys[1], y + radius)))
+
+    def clear(self):
+        """Remove every cell from the grid.
+        """
+        self.cancel()
+        self.level = 0
+        self.colors = None
+        self.hover = None
+        self.marker = None
+        self.image.blank()
+
+    def cancel(self):
+        """Cancel any draw that hasn't happened yet.
+        """
+        if (self.pending is not None):
+            self.canvas.after_cancel(self.pending)
+            self.pending = None
+
+    def set_marker(self, row, col, visible):
+        """Show or hide the dot marking a cell (used to point out the different cell).
+        Only that cell is redrawn.
+
+        Args:
+            row (int): The row of the cell.
+            col (int): The column of the cell.
+            visible (bool): Whether the dot should be shown.
+        """
+        old = self.marker
+        self.marker = (row, col) if visible else None
+        if (old is not None and old != self.marker):
+            self.paint_cell(*old)
+        self.paint_cell(row, col)
+
+    def set_hover(self, cell):
+        """Move the hover highlight to a new cell, according to the highlight setting.
+        Only the old & new cells are redrawn.
+
+        Args:
+            cell (tuple): The (row, column) of the cell under the mouse, or None.
         """
+        if (cell == self.hover):
+            return
+        old = self.hover
+        self.hover = cell
+        if (self.data.highlight == "none"):
+            return
+        if (old is not None):
+            self.paint_cell(*old)
+        if (cell is not None):
+            self.paint_cell(*cell)
 
-        # First, get the location to load from. This is the user's home directory.
-        # From https://stackoverflow.com/a/4028943/7311875
-        location = self.resolve_save_location()
+    def zoom_at(self, x, y, factor):
+        """Zoom the view in or out, keeping the point under the mouse where it is.
+        The view can't be zoomed out so far that the cells are less than a pixel across.
 
-        # Open the file to read from.
-        try:
-            with open(location, "rb") as file:
-                # Now load the entire contents of the Pickle file into the Data class.
-                Application.data = pickle.load(file)
-        except FileNotFoundError:
-            # No savefile exists.
-            msg = MessageWindow(
-                "Information", f"No Visage savefile was found. A new save file will be created at\n'{location}'.\nGame data, including scores & settings, is saved automatically.\nPlease ensure you have access to this location and that your\naccount has the necessary permissions to read/write data there.", 1000, 600, "Continue")
-        except Exception as e:
-            # If there's an error, alert the user.
-            msg = MessageWindow(
-                "Error", f"A Visage save file was found at\n'{location}',\nbut it could not be read.\nPlease check you have permission to access this file and that it has not been edited.\nIf you would like to try to load again, press 'Try Again'. To continue without loading your data, press 'Continue Without Loading'.\n\nMore details on the error can be seen below:\n{e}", 1000, 600, "Continue Without Loading", second_button={'text': 'Try Again', 'command': self.load})
+        Args:
+            x (int): The x coordinate to zoom around, in pixels.
+            y (int): The y coordinate to zoom around, in pixels.
+            factor (float): How much to zoom in by (less than 1 zooms out).
+        """
+        smallest = max(1.0, self.level / self.size)
+        zoom = min(max(self.zoom * factor, smallest), max(RasterGrid.MAX_ZOOM, smallest))
+        if (zoom == self.zoom):
+            return
+        for axis, p in ((0, x), (1, y)):
+            self.offset[axis] = (self.offset[axis] + p) * zoom / self.zoom - p
+        self.zoom = zoom
+        self.move(0, 0)
 
+    def move(self, dx, dy):
+        """Pan the view, keeping it inside the grid, and redraw it.
 
-class Window:
-    """This class contains code for a basic window.
-    Any elements or configuration that should be applied across all windows is done here.
-    """
+        Args:
+            dx (float): How far to move the view right, in pixels.
+            dy (float): How far to move the view down, in pixels.
+        """
+        furthest = self.size * self.zoom - self.size
+        for axis, change in ((0, dx), (1, dy)):
+            self.offset[axis] = min(
+                max(self.offset[axis] + change, 0.0), furthest)
+        if (self.pending is None):
+            self.render()
+
+    def wheel(self, event):
+        """Process the mouse wheel, zooming in or out around the mouse.
+        """
+        if (event.num == 4 or (event.num != 5 and event.delta > 0)):
+            self.zoom_at(event.x, event.y, RasterGrid.ZOOM_STEP)
+        else:
+            self.zoom_at(event.x, event.y, 1 / RasterGrid.ZOOM_STEP)
 
-    def __init__(self, title, width, height):
-        # Create the window.
-        self.root = tk.Tk()
-        # Set the window title.
-        self.root.title(f"Visage / {title}")
-        # Configure the geometry of the window.
-        if (width or height):
-            self.root.geometry(f"{width}x{height}")
-        # Set the visual aspects of the window:
-        self.root.configure(bg="#2b2b2b")
-        # Set the window to non-resizable.
-        self.root.resizable(False, False)
-        # Set up the font.
-        self.font = ("IBM Plex Sans", 20)
+    def start_pan(self, event):
+        """Start panning the view, when the right mouse button is pressed.
+        """
+        self.drag = (event.x, event.y)
 
-    def Button(parent, fontsize=20, **kwargs):
-        """Generate a new tk.Button with some sensible defaults set. This ensures that all buttons are consistent
-        across the game UI, and eliminates the need to copy/paste arguments all over the place.
+    def pan(self, event):
+        """Pan the view as the mouse is dragged, so the grid follows the mouse.
+        """
+        if (self.drag is None):
+            return
+        self.move(self.drag[0] - event.x, self.drag[1] - event.y)
+        self.drag = (event.x, event.y)
+        self.set_hover(self.cell_at(event.x, event.y))
 
-        Args:
-            parent (tk.<container>): The container that the new button will be created as a child of.
-            fontsize (int, optional): The font size of the text on the button. Defaults to 20.
+    def motion(self, event):
+        """Process the mouse moving over the grid.
+        """
+        self.set_hover(self.cell_at(event.x, event.y))
 
-        Returns:
-            tk.Button: The newly generated button.
+    def click(self, event):
+        """Process a click on the grid, passing the clicked cell on to the command.
         """
-        return tk.Button(parent, font=("IBM Plex Sans", fontsize), bg="#2b2b2b", fg="#ffffff", relief="flat", **kwargs)
+        cell = self.cell_at(event.x, event.y)
+        if (cell is not None):
+            self.command(*cell)
 
 
 class MessageWindow(Window):
@@ -151,10 +1413,19 @@ class MessageWindow(Window):
             second_button (dict, optional): An optional second button to show, used for cases where a
             second button is required (e.g. "Try Again"). Defaults to {} (no button).
         """
-        Window.__init__(self, title, width, height)
+        # Message windows pop up over the main window, rather than replacing the current screen,
+        # so they get a Toplevel of their own instead of using Window.__init__().
+        self.title = title
+        self.width = width
+        self.height = height
+        self.root = tk.Toplevel(Application.root, bg=theme.BACKGROUND)
+        self.root.title(f"Visage / {title}")
+        self.root.geometry(f"{width}x{height}")
+        self.root.resizable(False, False)
+        self.root.protocol("WM_DELETE_WINDOW", lambda: self.run(None))
 
         label = tk.Label(self.root, text=text,
-                         bg="#2b2b2b", fg="#ffffff", font=("IBM Plex Sans", ))
+                         **theme.NORMAL, font=theme.font())
         label.grid(row=0, column=0)
 
         button = Window.Button(
@@ -169,9 +1440,18 @@ class MessageWindow(Window):
         self.root.rowconfigure(0, weight=1)
         self.root.columnconfigure(0, weight=1)
 
-        self.root.mainloop()
+        # Wait for the user to respond, ignoring clicks on the rest of the game until then.
+        self.root.wait_visibility()
+        self.root.grab_set()
+        self.root.wait_window()
 
     def run(self, command):
+        """Close the message, then run the command for the button that was pressed.
+
+        Args:
+            command (function): The command to run, or None.
+        """
+        self.root.grab_release()
         self.root.destroy()
         if (command):
             command()
@@ -191,35 +1471,30 @@ class MainMenuWindow(Window):
             application (Application): The global application instance, containing references to Data.
         """
         # Perform initialisation using the Window parent class.
-        Window.__init__(self, "Main Menu", 500, 600)
+        Window.__init__(self, "Main Menu", 500, 660)
 
         self.application = application
-
-        # Alias the close button to quit()
-        self.root.protocol("WM_DELETE_WINDOW", self.quit)
+        self.data = application.data
 
         # Create the frame to keep everything in the centre.
-        frame = tk.Frame(self.root, bg="#2b2b2b")
+        frame = tk.Frame(self.root, bg=theme.BACKGROUND)
         frame.grid(row=0, column=0)
 
         # Create the logo image.
-
-        # Resolve the file path of the logo, based on the current working directory.
-        # Without this, the game would not run with the wrong working directory (i.e. not the same as the script).
-        # This special function is needed to ensure that the directory separators are correct
-        # ('/' on Mac and Unix systems, and '\' on Windows)
-        #          Join...      the current location of the script...    with the filename.
-        img_path = os.path.join(pathlib.Path(
-            __file__).parent.resolve(), "logo.png")
-
-        logo = tk.PhotoImage(file=img_path)
-        logo_label = tk.Label(frame, image=logo, bg="#2b2b2b")
+        logo_label = tk.Label(frame, image=Window.logo(), bg=theme.BACKGROUND)
         # Place it in the grid.
         logo_label.grid(row=0, column=0, padx=20, pady=20)
 
+        # Show who's playing.
+        self.player_label = tk.Label(
+            frame, font=theme.font(16), **theme.NORMAL)
+        self.player_label.grid(row=1, column=0)
+
         # Create the main menu buttons.
         btn_play = Window.Button(
             frame, text="Play", command=self.play, width=25)
+        btn_players = Window.Button(
+            frame, text="Change Player", command=self.players, width=25)
         btn_highscores = Window.Button(
             frame, text="Highscores", command=self.highscores, width=25)
         btn_settings = Window.Button(
@@ -227,116 +1502,345 @@ class MainMenuWindow(Window):
         btn_quit = Window.Button(
             frame, text="Quit", command=self.quit, width=25)
         # Place them in the grid.
-        btn_play.grid(row=1, column=0, padx=10, pady=10)
-        btn_highscores.grid(row=2, column=0, padx=10, pady=10)
-        btn_settings.grid(row=3, column=0, padx=10, pady=10)
-        btn_quit.grid(row=4, column=0, padx=10, pady=10)
+        btn_play.grid(row=2, column=0, padx=10, pady=10)
+        btn_players.grid(row=3, column=0, padx=10, pady=10)
+        btn_highscores.grid(row=4, column=0, padx=10, pady=10)
+        btn_settings.grid(row=5, column=0, padx=10, pady=10)
+        btn_quit.grid(row=6, column=0, padx=10, pady=10)
 
         # Configure row/column weights to centre content
         self.root.rowconfigure(0, weight=1)
         self.root.columnconfigure(0, weight=1)
-        for row in range(0, 5):
+        for row in range(0, 7):
             frame.rowconfigure(row, weight=1)
         frame.columnconfigure(0, weight=1)
 
-        # Keep the window open, waiting for something to happen.
-        # This is blocking because we don't need to do anything else.
-        self.root.mainloop()
+    def show(self):
+        """Show the current player's name, each time the menu is shown.
+        """
+        name = None
+        if (self.data.profile is not None):
+            name = Data.profiles.name(self.data.profile)
+        self.player_label.configure(
+            text=f"Playing as {name}" if name is not None else "")
+
+    def close(self):
+        """Alias the close button to quit().
+        """
+        self.quit()
 
     def play(self):
         """Start the game.
+        Once the game closes, it switches back to the main menu.
         """
-        self.root.destroy()
-        game = GameWindow(self.application.data)
+        self.application.show(GameWindow)
 
-        # Once the game closes, reopen the main menu.
-        self.__init__(self.application)
+    def players(self):
+        """Open the player selection screen.
+        """
+        self.application.show(PlayerWindow)
 
     def highscores(self):
-        """Open the highscores window.
+        """Open the highscores screen.
         """
-        self.root.destroy()
-        scorewindow = ScoreWindow(self.application.data)
-
-        # Once the score window closes, reopen the main menu.
-        self.__init__(self.application)
+        self.application.show(ScoreWindow)
 
     def settings(self):
-        """Open the settings window.
+        """Open the settings screen.
         """
-        self.root.destroy()
-        settings = SettingsWindow(self.application.data)
-
-        # Once settings closes, reopen the main menu.
-        self.__init__(self.application)
+        self.application.show(SettingsWindow)
 
     def quit(self):
         """Quit the game, saving data in the process.
         """
-        self.root.destroy()
         self.application.data.save()
+        self.application.exit()
 
 
-class GameWindow(Window):
-    """This class contains the game window itself.
+class PlayerWindow(Window):
+    """This class contains the player selection screen, for computers shared by several players.
+    Players can be added, renamed, deleted and picked; each has their own settings & highscore.
 
     Inherits Window.
     """
 
-    def __init__(self, data):
-        """Open the game window.
+    def __init__(self, application):
+        """Create the player selection screen.
 
         Args:
-            data (Data): A reference to the global Data object, to get settings & highscores.
+            application (Application): The global application instance, containing references to Data.
         """
         # Perform initialisation using the Window parent class.
-        Window.__init__(self, "Play", 500, 500)
+        Window.__init__(self, "Players", 500, 660)
 
-        self.data = data
+        self.application = application
+        self.data = application.data
+        # The (profile ID, name) of each player in the list, in the order shown.
+        self.players = list()
+        # Whether the delete button has been clicked once, and is waiting for the second click.
+        self.delete_armed = False
+        # The switch to another player in progress, if any (see choose()).
+        self.switching = None
 
-        # Alias the close button to quit()
-        self.root.protocol("WM_DELETE_WINDOW", self.quit)
-
-        # Lives counter.
-        self.lives = round(3 / self.data.difficulty)
-
-        if (self.lives > 10):
-            self.lives = 10
-        elif (self.lives < 1):
-            self.lives = 1
-
-        # Generate a difficulty description for use in the UI.
-        if (self.data.difficulty <= 0.75):
-            self.difficulty_str = "Easy"
-        elif (self.data.difficulty <= 1.25):
-            self.difficulty_str = "Normal"
-        elif (self.data.difficulty <= 3.0):
-            self.difficulty_str = "Hard"
-        elif (self.data.difficulty <= 4.0):
-            self.difficulty_str = "Very Hard"
-        else:
-            self.difficulty_str = "Insane"
+        # Create the title.
+        title = tk.Label(self.root, text="Players",
+                         font=theme.font(30), **theme.NORMAL, justify="center")
+        title.grid(row=0, column=0, pady=(20, 10))
+
+        # Create the list of players. A single Listbox shows hundreds of players without slowing down.
+        list_frame = tk.Frame(self.root, bg=theme.BACKGROUND)
+        list_frame.grid(row=1, column=0)
+        self.listbox = tk.Listbox(list_frame, font=theme.font(16), **theme.NORMAL, height=8, width=24,
+                                  selectbackground=theme.FOREGROUND, selectforeground=theme.BACKGROUND,
+                                  relief="flat", highlightthickness=0, activestyle="none", exportselection=False)
+        scrollbar = tk.Scrollbar(
+            list_frame, command=self.listbox.yview, bg=theme.BACKGROUND, troughcolor=theme.BACKGROUND)
+        self.listbox.configure(yscrollcommand=scrollbar.set)
+        self.listbox.grid(row=0, column=0)
+        scrollbar.grid(row=0, column=1, sticky="NS")
+        # Picking a player puts their name in the box below (for renaming); double-clicking plays as them.
+        self.listbox.bind("<<ListboxSelect>>", self.pick)
+        self.listbox.bind("<Double-Button-1>", lambda event: self.choose())
+
+        # Create the name box.
+        self.name_entry = tk.Entry(self.root, font=theme.font(16), **theme.NORMAL, width=24,
+                                   insertbackground=theme.FOREGROUND, relief="flat",
+                                   highlightbackground=theme.FOREGROUND, highlightthickness=1)
+        self.name_entry.grid(row=2, column=0, pady=10)
+
+        # Create the buttons for changing the list.
+        edit_frame = tk.Frame(self.root, bg=theme.BACKGROUND)
+        edit_frame.grid(row=3, column=0)
+        btn_add = Window.Button(
+            edit_frame, 16, text="Add", command=self.add, width=7)
+        btn_rename = Window.Button(
+            edit_frame, 16, text="Rename", command=self.rename, width=7)
+        self.delete_btn = Window.Button(
+            edit_frame, 16, text="Delete", command=self.delete, width=12)
+        btn_add.grid(row=0, column=0)
+        btn_rename.grid(row=0, column=1)
+        self.delete_btn.grid(row=0, column=2)
+
+        # Create the message label, for anything that went wrong.
+        self.message = tk.Label(self.root, font=theme.font(12), bg=theme.BACKGROUND, fg=theme.BAD,
+                                wraplength=440)
+        self.message.grid(row=4, column=0)
+
+        # Create the play & back buttons.
+        btn_choose = Window.Button(
+            self.root, text="Play as Selected", command=self.choose, width=20)
+        btn_choose.grid(row=5, column=0)
+        btn_back = Window.Button(self.root, text="Back", command=self.back)
+        btn_back.grid(row=6, column=0, pady=(0, 20))
+
+        # Configure row/column weights to centre content
+        self.root.columnconfigure(0, weight=1)
+        for row in range(0, 7):
+            self.root.rowconfigure(row, weight=1)
+
+    def show(self):
+        """Show the latest list of players each time the screen is shown (other copies of the game may have changed it).
+        """
+        self.message.configure(text="")
+        self.name_entry.delete(0, "end")
+        self.disarm()
+        self.refresh(self.data.profile)
+
+    def refresh(self, selected=None):
+        """Fill in the list of players.
+
+        Args:
+            selected (str, optional): The profile ID of the player to select. Defaults to None.
+        """
+        try:
+            self.players = self.data.profile_store().profiles()
+        except (OSError, profiles.ProfileError) as e:
+            self.players = list()
+            self.message.configure(text=f"The players couldn't be read: {e}")
+        self.listbox.delete(0, "end")
+        self.listbox.insert("end", *(name for profile, name in self.players))
+        for i, (profile, name) in enumerate(self.players):
+            if (profile == selected):
+                self.listbox.selection_set(i)
+                self.listbox.see(i)
+                break
+
+    def selected(self):
+        """Get the player selected in the list.
+
+        Returns:
+            tuple: The (profile ID, name) of the player, or None if no player is selected.
+        """
+        selection = self.listbox.curselection()
+        if (not selection):
+            self.message.configure(text="Pick a player first.")
+            return None
+        return self.players[selection[0]]
+
+    def pick(self, event):
+        """Put the selected player's name in the name box, so it can be changed.
+        """
+        selection = self.listbox.curselection()
+        if (selection):
+            self.name_entry.delete(0, "end")
+            self.name_entry.insert(0, self.players[selection[0]][1])
+        self.disarm()
+
+    def add(self):
+        """Add a player, with the name in the name box.
+        """
+        try:
+            profile = self.data.profile_store().create(self.name_entry.get())
+        except (OSError, profiles.ProfileError) as e:
+            self.message.configure(text=str(e))
+            return
+        self.message.configure(text="")
+        self.refresh(profile)
+
+    def rename(self):
+        """Rename the selected player to the name in the name box.
+        """
+        player = self.selected()
+        if (player is None):
+            return
+        try:
+            self.data.profile_store().rename(player[0], self.name_entry.get())
+        except (OSError, profiles.ProfileError) as e:
+            self.message.configure(text=str(e))
+            return
+        self.message.configure(text="")
+        self.refresh(player[0])
+
+    def delete(self):
+        """Process a click on the delete button.
+        If this is the first click, "arm" the button, but don't delete.
+        If this is the second click (the button is already "armed"), delete the selected player.
+        """
+        player = self.selected()
+        if (player is None):
+            return
+        if (player[0] == self.data.profile):
+            self.message.configure(
+                text="Change to another player before deleting this one.")
+            return
+        if (not self.delete_armed):
+            # First click. Change button to "armed" state.
+            self.delete_btn.configure(
+                text="Are you sure?", bg=theme.BAD, fg=theme.BACKGROUND)
+            self.delete_armed = True
+            return
+
+        # Second click. Actually delete!
+        self.disarm()
+        try:
+            self.data.profile_store().delete(player[0])
+        except (OSError, profiles.ProfileError) as e:
+            self.message.configure(text=str(e))
+        self.refresh(self.data.profile)
+
+    def disarm(self):
+        """Put the delete button back to normal.
+        """
+        self.delete_armed = False
+        self.delete_btn.configure(text="Delete", **theme.NORMAL)
+
+    def choose(self):
+        """Play as the selected player, and go back to the main menu once their data has been loaded.
+        """
+        player = self.selected()
+        if (player is None or self.switching is not None):
+            return
+        self.message.configure(text="")
+        self.switching = self.application.bridge.run(self.switch(player))
+
+    async def switch(self, player):
+        """Switch to a player, then go back to the main menu. Run by choose().
+
+        Args:
+            player (tuple): The (profile ID, name) of the player.
+        """
+        try:
+            await self.data.select_profile(player[0])
+        except Exception as e:
+            self.message.configure(
+                text=f"{player[1]}'s data couldn't be loaded: {e}")
+            return
+        finally:
+            self.switching = None
+        self.application.show(MainMenuWindow)
+
+    def close(self):
+        """Alias the close button to back().
+        """
+        self.back()
+
+    def back(self):
+        """Go back to the main menu, without changing player. (If a player is being switched to,
+        the main menu is shown once they have been.)
+        """
+        if (self.switching is None):
+            self.application.show(MainMenuWindow)
+
+
+class GameWindow(Window):
+    """This class contains the game window itself.
+
+    Inherits Window.
+    """
+
+    # Levels with at least this many rows & columns are drawn as one image (RasterGrid)
+    # rather than a canvas item per cell (CanvasGrid).
+    RASTER_LEVEL = 30
 
-        self.difficulty_str += f" ({int(self.data.difficulty * 10)})"
+    # Where the grid goes in the window.
+    GRID_OPTIONS = {"row": 0, "column": 0, "columnspan": 3,
+                    "padx": 20, "pady": (20, 0)}
+
+    def __init__(self, application):
+        """Create the game screen.
 
-        # Initialise level counter.
-        self.level = 3
+        Args:
+            application (Application): The global application instance, containing references to Data.
+        """
+        # Perform initialisation using the Window parent class.
+        Window.__init__(self, "Play", 500, 560)
 
-        # Create the frame for the buttons.
-        self.frame = tk.Frame(self.root, bg="#2b2b2b",
-                              width=400, height=400)
-        self.frame.grid(row=0, column=0, columnspan=3, sticky="NESW")
+        self.application = application
+        self.data = application.data
+
+        # The settings the game is played with (see use_settings()), and the display settings the grid is drawn with:
+        # the player's own while playing, and the logged ones while replaying a game.
+        self.settings = None
+        self.display = types.SimpleNamespace(button_gaps=self.data.button_gaps,
+                                             button_outlines=self.data.button_outlines,
+                                             highlight=self.data.highlight)
+
+        # Create the grid of cells. Very large levels are drawn by a RasterGrid instead, which is created
+        # the first time one is reached. self.grid is whichever one is showing; see use_grid().
+        self.canvas_grid = CanvasGrid(
+            self.root, 400, self.display, self.check_color)
+        self.raster_grid = None
+        self.grid = self.canvas_grid
+        self.grid.grid(**GameWindow.GRID_OPTIONS)
+
+        # The frame for the game over message, once there is one.
+        self.frame = None
 
         # Score label
-        self.score_label = tk.Label(self.root, bg="#2b2b2b", fg="#ffffff",
-                                    text=f"Level {self.level}", font=("IBM Plex Sans", 20), padx=10, pady=10, width=10)
+        self.score_label = tk.Label(self.root, **theme.NORMAL,
+                                    font=theme.font(20), padx=10, pady=10, width=10)
         self.score_label.grid(row=2, column=1, padx=20, pady=20)
 
         # Help label
-        self.help_label = tk.Label(self.root, bg="#2b2b2b", fg="#ffffff",
-                                   text=f"{'❤'*self.lives}\nDifficulty: {self.difficulty_str}", font=("IBM Plex Sans", 10), width=20, padx=10, pady=10)
+        self.help_label = tk.Label(self.root, **theme.NORMAL,
+                                   font=theme.font(10), width=20, padx=10, pady=10)
         self.help_label.grid(row=2, column=2, padx=20, pady=20)
 
+        # The options last set on the labels, so they're only changed when what they show changes.
+        self.view = view.View()
+        self.view.track(self.score_label, text="", **theme.NORMAL)
+        self.view.track(self.help_label, text="", **theme.NORMAL)
+
         # Create the main menu buttons.
         btn_quit = Window.Button(
             self.root, 16, text="Quit", command=self.quit)
@@ -353,185 +1857,288 @@ class GameWindow(Window):
         # while false - preventing the user from clicking while buttons are being generated.
         self.busy = False
 
-        # Generate colors.
-        self.generate_buttons(self.level, self.data)
+        # Timed events (e.g. the blinking after a wrong click) are run by the application's timeline,
+        # which cancels them when the game is left.
+        self.timeline = application.timeline
 
-        # Keep the window open, waiting for something to happen.
-        # This is blocking because we don't need to do anything else.
-        self.root.mainloop()
+        # When the last correct click landed, from time.perf_counter_ns(), until the next grid is ready.
+        self.clicked = None
+
+        # When the current grid was ready to be clicked, from time.perf_counter_ns(), for the reaction time statistics.
+        self.ready = None
 
-    def generate_buttons(self, level, data):
-        """Generate a new set of buttons according to the current level,
-        difficulty, and settings.
+        # The deck opened for a replay, if the session was played from a deck the game doesn't have open.
+        # It's closed when the game is left (see close_replay_deck()).
+        self.replay_deck = None
+
+    def show(self):
+        """Start a new game each time the game screen is shown.
+        """
+        # Clear away the last game's game over message.
+        if (self.frame is not None):
+            self.frame.destroy()
+            self.frame = None
+        self.grid.grid()
+        self.close_replay_deck()
+
+        # Start a new game, with its own random seed. The game state keeps track of the level, lives & score,
+        # and the session log keeps everything needed to play the game again exactly: the seed, the settings & the clicks.
+        settings = {"difficulty": self.data.difficulty, "color_model": self.data.color_model, "deck": None,
+                    "button_gaps": self.data.button_gaps, "button_outlines": self.data.button_outlines,
+                    "highlight": self.data.highlight, "feedback_time": self.data.feedback_time,
+                    "adaptive": self.data.adaptive}
+        if (self.application.deck is not None):
+            # Play the deck's puzzles, at the difficulty they were made for. (They can't be chosen adaptively.)
+            settings["deck"] = os.path.abspath(self.application.deck.location)
+            settings["difficulty"] = self.application.deck.difficulty
+            settings["adaptive"] = False
+        self.session = replay.Session(random.getrandbits(64), settings)
+        self.use_settings(self.session.settings)
+        self.state = self.session.new_game(self.application.deck)
+        self.recorded = False
+        # The session being replayed, if any (see replay()).
+        self.replaying = None
+
+        self.view.set(self.score_label, text=f"Level {self.state.level}", **theme.NORMAL)
+
+        # Show the first puzzle.
+        self.show_puzzle()
+
+    def close(self):
+        """Alias the close button to quit().
+        """
+        self.quit()
+
+    def replay(self, session):
+        """Replay a session log, at the pace it was played. Games that are replayed aren't recorded.
 
         Args:
-            level (int): The current game level.
-            data (Data): A reference to the global Data object, containing settings & highscores.
+            session (replay.Session): The session to replay.
         """
-        self.busy = True
+        self.grid.cancel()
+        self.session = None
+        self.replaying = session
+        self.use_settings(session.settings)
+        self.replay_next = 0
+        self.replay_mismatches = 0
+        # Play from the deck the game already has open, if the session was played from it.
+        self.close_replay_deck()
+        puzzle_deck = self.application.deck
+        location = session.settings.get("deck")
+        if (location and (puzzle_deck is None or os.path.abspath(puzzle_deck.location) != os.path.abspath(location))):
+            puzzle_deck = self.replay_deck = deck.Deck(location)
+        self.state = session.new_game(puzzle_deck)
+
+        self.replay_started = time.perf_counter()
+        self.show_puzzle()
+        self.timeline.at(1, self.replay_click)
+
+    def close_replay_deck(self):
+        """Close the deck opened for a replay, if there is one.
+        """
+        if (self.replay_deck is not None):
+            self.replay_deck.close()
+            self.replay_deck = None
 
-        original_color_ok = False
-        different_color_ok = False
+    def use_settings(self, settings):
+        """Play with a game's settings: the feedback time, and the outlines, gaps & highlight the grid is drawn with.
+        Settings that older session logs don't have are taken from the player's own.
 
-        # Create a 2D array to store the buttons.
-        self.buttons = list()
+        Args:
+            settings (dict): The game's settings, as kept in its session log.
+        """
+        self.settings = settings
+        for key in ("button_gaps", "button_outlines", "highlight"):
+            setattr(self.display, key, settings.get(key, getattr(self.data, key)))
 
-        while original_color_ok is False:
-            # Set loading message.
-            self.help_label.configure(
-                text=f"Loading...\nColors (1/2)", bg="#ffffff", fg="#2b2b2b")
+    def replay_click(self):
+        """Make the next click from the session being replayed, once it's due.
+        If the grid is still being built (or the game is showing the last click's result), wait until it's ready.
+        """
+        if (self.replaying is None or self.replay_next is None):
+            return
+        clicks = self.replaying.clicks
+        if (self.state.over or self.replay_next >= len(clicks)):
+            self.finish_replay()
+            return
+        if (self.busy):
+            self.timeline.at(10, self.replay_click)
+            return
 
-            # Reset the frame, clearing the existing buttons.
-            # First, destroy the old frame (and all the buttons in it):
-            self.frame.destroy()
-            # Then, create a new frame to replace it:
-            self.frame = tk.Frame(self.root, bg="#2b2b2b")
-            self.frame.grid(row=0, column=0, columnspan=3)
-            self.root.update()
+        click = clicks[self.replay_next]
+        wait = self.replay_started + click.time / 1000 - time.perf_counter()
+        if (wait > 0):
+            self.timeline.at(max(1, round(wait * 1000)), self.replay_click)
+            return
 
-            # Generate the "correct" color.
-            original_color = [
-                random.randint(0x00, 0xff), random.randint(0x00, 0xff), random.randint(0x00, 0xff)]
-            # Convert it to a string for use with Tk.
-            original_color_str = f"#{original_color[0]:02X}{original_color[1]:02X}{original_color[2]:02X}"
-
-            self.help_label.configure(
-                text=f"Loading...\nColors (2/2)")
-
-            # Generate a color.
-            while different_color_ok is False:
-                # Generate the "incorrect" color.
-                # Choose which part to change:
-                component_to_change = random.randint(0, 2)
-                # How much to change it by:
-                change_it_by = round(0xFF / round(level * data.difficulty))
-                # Change by pos or neg?
-                add_or_subtract = random.choice([-1, 1])
-
-                different_color = original_color
-                # Generate the new color, using the correct color as a base.
-                different_color[component_to_change] = round(
-                    original_color[component_to_change] + (change_it_by * add_or_subtract))
-
-                # If the result is over 255 or under 0, generate a new base color.
-                if (different_color[component_to_change] > 0xFF) or (different_color[component_to_change] < 0x00):
-                    original_color_ok = False
-                    different_color_ok = False
-                    break
-
-                # Convert it to a string for use with Tk.
-                different_color_str = f"#{different_color[0]:02X}{different_color[1]:02X}{different_color[2]:02X}"
-
-                if (different_color_str == original_color_str):
-                    # Identical color, start again.
-                    original_color_ok = True
-                    different_color_ok = False
-                    continue
-
-                if len(different_color_str) != 7:
-                    # Invalid color, start again.
-                    original_color_ok = True
-                    different_color_ok = False
-                    continue
-
-                # Valid color! Break.
-                original_color_ok = True
-                different_color_ok = True
-                break
+        # Check the puzzle is the same one that was clicked when the game was played.
+        if (replay.fingerprint(self.puzzle) != click.fingerprint):
+            self.replay_mismatches += 1
+        self.replay_next += 1
+        self.check_color(click.row, click.col)
+        self.timeline.at(1, self.replay_click)
 
-        self.help_label.configure(
-            text=f"Loading...(2/4)\nSetting up")
+    def finish_replay(self):
+        """Report how the replay went, once every click has been made.
+        """
+        clicks = self.replay_next
+        self.replay_next = None
+        if (self.replay_mismatches):
+            result = f"{self.replay_mismatches} of the puzzles came out differently."
+        else:
+            result = "Every puzzle came out the same."
+        msg = MessageWindow(
+            "Replay Finished", f"Replayed {clicks} clicks, reaching level {self.state.level}.\n{result}", 600, 300)
 
-        # Choose which button will be incorrect.
-        self.diff_btn_row = random.randint(0, level-1)
-        self.diff_btn_col = random.randint(0, level-1)
+    def show_puzzle(self):
+        """Show the current puzzle from the game state, according to the current settings.
+        """
+        self.busy = True
 
-        # Configure row/column weights for the inner frame:
-        for i in range(0, level):
-            self.frame.rowconfigure(i, weight=1)
-            self.frame.columnconfigure(i, weight=1)
+        # Keep the puzzle being shown, so the different cell can still be pointed out after the game state moves on.
+        self.puzzle = self.state.puzzle
+        level = self.puzzle.level
 
-        # Check settings for creating buttons.
-        padding = 1 if data.button_gaps is True else 0
-        outlines = 1 if data.button_outlines is True else 0
+        # Set loading message.
+        self.view.set(self.help_label, text=f"Loading...\nCells (000/{level**2:03})", **theme.SELECTED)
 
-        self.help_label.configure(
-            text=f"Loading...\nButtons (000/{level**2:03})")
+        # Draw the cells. This finishes in the background; finish_generating() is called once it's done,
+        # and until then the "busy" flag stays set.
+        self.use_grid(level)
+        self.grid.draw(level, self.puzzle.color_str, self.puzzle.different_color_str,
+                       self.puzzle.row, self.puzzle.col, self.show_progress, self.finish_generating)
 
-        # Generate the buttons:
-        for row in range(0, level):
-            # Add a new array row.
-            self.buttons.append([])
+    def use_grid(self, level):
+        """Switch to the right kind of grid for a level: a CanvasGrid, or a RasterGrid for very large levels.
 
-            for col in range(0, level):
-                # Choose the color for this button.
-                # Is this the wrong button?
-                if (row == self.diff_btn_row and col == self.diff_btn_col):
-                    color = different_color_str
-                else:
-                    color = original_color_str
+        Args:
+            level (int): The number of rows and columns in the grid.
+        """
+        if (level >= GameWindow.RASTER_LEVEL):
+            if (self.raster_grid is None):
+                self.raster_grid = RasterGrid(
+                    self.root, 400, self.display, self.check_color)
+            grid = self.raster_grid
+        else:
+            grid = self.canvas_grid
+        if (grid is self.grid):
+            return
 
-                # Check what the highlight settings are.
-                if (data.highlight == "color"):
-                    highlight_bg = "#ffffff"
-                    highlight_fg = "#ffffff"
-                elif (data.highlight == "dot"):
-                    highlight_bg = color
-                    highlight_fg = "#ffffff"
-                elif (data.highlight == "none"):
-                    highlight_bg = color
-                    highlight_fg = color
+        # Swap the grids over. The old one is emptied, so a large grid doesn't keep its cells (or image) around.
+        self.grid.clear()
+        self.grid.grid_remove()
+        self.grid = grid
+        self.grid.grid(**GameWindow.GRID_OPTIONS)
 
-                # Create the button.
-                button = tk.Button(self.frame, bg=color, fg=color, highlightthickness=outlines, activebackground=highlight_bg, activeforeground=highlight_fg,
-                                   relief="flat", text="●", font=("IBM Plex Sans", round(100/level)), command=lambda x=row, y=col: self.check_color(x, y), width=100, height=100)
+    def show_progress(self, built, total):
+        """Show how far through building the grid we are. Called at most once per frame by the grid.
 
-                button.grid(row=row, column=col, padx=padding, pady=padding)
+        Args:
+            built (int): The number of cells built so far.
+            total (int): The total number of cells to build.
+        """
+        self.view.set(self.help_label, text=f"Loading...\nCells ({built:03}/{total:03})", **theme.SELECTED)
 
-                # Save the button to the list.
-                self.buttons[row].append(button)
+    def finish_generating(self):
+        """Finish generating a level, once the grid has been built. Clicks are allowed again from here.
+        """
+        self.busy = False
+        self.ready = time.perf_counter_ns()
 
-                # Update the progress indicator.
-                self.help_label.configure(
-                    text=f"Loading...\nButtons ({(row*level)+col:03}/{level**2:03})", bg="#ffffff", fg="#2b2b2b")
-                self.help_label.update()
+        # Time from the correct click to the next grid being ready.
+        if (self.clicked is not None):
+            metrics.METRICS.record(
+                "click to ready", time.perf_counter_ns() - self.clicked)
+            self.clicked = None
 
-        self.help_label.configure(
-            text=f"Loading...\nFinishing")
+        self.view.set(self.score_label, text=f"Level {self.state.level}", **theme.NORMAL)
+        help_text = f"{'❤'*self.state.lives}\nDifficulty: {self.state.difficulty_str}"
+        if (self.settings.get("adaptive")):
+            help_text += f"\nYour limit: {self.describe_limit()}"
+        if (self.grid is self.raster_grid):
+            help_text += "\nScroll: zoom\nRight-drag: pan"
+        self.view.set(self.help_label, text=help_text, **theme.NORMAL)
 
-        self.busy = False
+    def describe_limit(self):
+        """Describe the adaptive generator's estimate of the smallest difference the player can see.
 
-        self.help_label.configure(
-            text=f"{'❤'*self.lives}\nDifficulty: {self.difficulty_str}", bg="#2b2b2b", fg="#ffffff")
+        Returns:
+            str: The estimate, e.g. "ΔE 1.2" (perceptual colors) or "4.5/255" (classic colors).
+        """
+        limit = self.state.generator.threshold()
+        if (self.settings["color_model"] == "perceptual"):
+            return f"ΔE {limit:.1f}"
+        return f"{limit:.1f}/255"
 
     def quit(self):
         """Quit the game, saving the highscore if necessary.
         """
-        # Is this a new highscore?
-        if ((self.level * self.data.difficulty) >= self.data.highscore):
-            self.data.highscore = self.level * self.data.difficulty
-        self.root.destroy()
+        # Is this a new highscore? (Replayed games don't count.)
+        if (self.replaying is None and self.state.score >= self.data.highscore):
+            self.data.highscore = self.state.score
+        self.record_game()
+        # Stop building the grid. (Anything else still waiting to happen is cancelled by the change of screen.)
+        self.grid.cancel()
+        self.close_replay_deck()
+
+        self.application.show(MainMenuWindow)
         self.data.save()
 
+    def record_game(self):
+        """Record the game in the game history, if it hasn't been already.
+        Games that are quit before the first click aren't recorded.
+        """
+        if (self.recorded or self.replaying is not None or (not self.state.level_times and self.state.lives_lost == 0)):
+            return
+        self.recorded = True
+        self.state.finish()
+        self.application.history.record(self.state.difficulty, self.state.level, self.state.lives_lost,
+                                        self.state.duration, self.state.level_times)
+        self.application.analytics.game_over(
+            self.state.difficulty, self.state.level)
+        self.application.analytics.save()
+        self.application.bridge.run(self.save_session(self.session))
+
+    async def save_session(self, session):
+        """Save a game's session log, so it can be replayed later, and delete the oldest logs.
+        The files are written on a worker thread, so the window carries on straight away.
+
+        Args:
+            session (replay.Session): The session to save.
+        """
+        directory = self.data.resolve_session_directory()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, replay.store, session, directory)
+        except OSError:
+            # Session logs are only for reproducing problems, so the player isn't bothered if one can't be saved.
+            pass
+
     def game_over(self):
         """Game over!
         Show the game over screen.
         """
         # Game over! Show the user's score, and save it.
-        self.frame = tk.Frame(self.root, bg="#2b2b2b")
+        self.record_game()
+        # Hide the grid, and show the score in its place.
+        self.grid.grid_remove()
+        self.frame = tk.Frame(self.root, bg=theme.BACKGROUND)
         self.frame.grid(row=0, column=0, columnspan=3)
-        self.root.update()
+        with metrics.METRICS.span("tk update"):
+            self.root.update()
 
         game_over_text = tk.Label(
-            self.frame, text=f"Game over!", bg="#2b2b2b", fg="#ffffff", font=("IBM Plex Sans", 30))
+            self.frame, text=f"Game over!", **theme.NORMAL, font=theme.font(30))
         game_over_text.grid(row=0, column=0)
 
+        score_text = f"Level {self.state.level}\n on {self.state.difficulty_str} difficulty\n= Score: {self.state.score}"
+        if (self.settings.get("adaptive")):
+            score_text += f"\nYour limit: {self.describe_limit()}"
         score_text = tk.Label(
-            self.frame, text=f"Level {self.level}\n on {self.difficulty_str} difficulty\n= Score: {(self.level * self.data.difficulty)}", bg="#2b2b2b", fg="#ffffff", font=("IBM Plex Sans", 24))
+            self.frame, text=score_text, **theme.NORMAL, font=theme.font(24))
         score_text.grid(row=1, column=0)
 
         next_steps_text = tk.Label(
-            self.frame, text=f"Press Quit to return\nto the main menu.", bg="#2b2b2b", fg="#ffffff", font=("IBM Plex Sans", 18))
+            self.frame, text=f"Press Quit to return\nto the main menu.", **theme.NORMAL, font=theme.font(18))
         next_steps_text.grid(row=2, column=0)
 
     def check_color(self, row, col):
@@ -546,45 +2153,51 @@ class GameWindow(Window):
             # Don't process click.
             return
 
-        if (row == self.diff_btn_row and col == self.diff_btn_col):
+        # Log the click, so the game can be replayed.
+        if (self.session is not None):
+            self.session.record(round((self.state.clock() - self.state.started) * 1000),
+                                row, col, self.puzzle)
+
+        # Check the click against the game state. This also moves the game on to the next puzzle.
+        clicked = time.perf_counter_ns()
+        puzzle = self.puzzle
+        with metrics.METRICS.span("puzzle"):
+            correct = self.state.click(row, col)
+        # Count the click in the statistics (but not replayed ones, which were counted when they were played).
+        if (self.replaying is None):
+            self.application.analytics.click(puzzle.level, self.state.difficulty,
+                                             (clicked - self.ready) / 1e6, correct)
+        if (correct):
             # Different color: correct choice!
-            self.level += 1
-            self.score_label.configure(
-                text="Correct!", fg="#33d17a")
-            self.generate_buttons(self.level, self.data)
-            self.score_label.configure(
-                text=f"Level {self.level}", fg="#ffffff", bg="#2b2b2b")
+            self.clicked = clicked
+            self.view.set(self.score_label, text="Correct!", fg=theme.GOOD)
+            # The label is reset to the level once the new grid is ready.
+            self.show_puzzle()
         else:
             # Original color: incorrect.
             # Set busy to disallow clicks
             self.busy = True
-            self.score_label.configure(
-                text="Incorrect...",  fg="#e01b24")
-
-            self.lives -= 1
-
-            # Indicate where the incorrect button is by flashing a dot on it.
-            self.buttons[self.diff_btn_row][self.diff_btn_col].configure(
-                fg="#ffffff", text="●")
-            self.root.after(
-                500, lambda: self.buttons[self.diff_btn_row][self.diff_btn_col].configure(text=""))
-            self.root.after(
-                1000, lambda: self.buttons[self.diff_btn_row][self.diff_btn_col].configure(text="●"))
-            self.root.after(
-                1500, lambda: self.buttons[self.diff_btn_row][self.diff_btn_col].configure(text=""))
-            self.root.after(
-                2000, lambda: self.buttons[self.diff_btn_row][self.diff_btn_col].configure(text="●"))
+            self.view.set(self.score_label, text="Incorrect...", fg=theme.BAD)
 
             # Was that the last life?
             # If so, exit and show the user's score (the level).
-            if (self.lives == 0):
-                self.root.after(2500, lambda: self.game_over())
+            # Otherwise, show the new puzzle, at the SAME difficulty.
+            if (self.state.over):
+                done = self.game_over
             else:
-                # Generate a new set of buttons at the SAME difficulty.
-                self.root.after(2500, lambda: self.generate_buttons(
-                    self.level, self.data))
-                self.root.after(2500, lambda: self.score_label.configure(
-                    text=f"Level {self.level}", fg="#ffffff", bg="#2b2b2b"))
+                done = self.show_puzzle
+
+            # Indicate where the incorrect button is by flashing a dot on it three times (on, off, on, off, on),
+            # over the feedback time set in the settings, then move on.
+            shown = [None]
+
+            def blink(progress):
+                visible = int(progress * 5) % 2 == 0
+                if (visible != shown[0]):
+                    shown[0] = visible
+                    self.grid.set_marker(puzzle.row, puzzle.col, visible)
+
+            self.timeline.tween(self.settings.get("feedback_time", self.data.feedback_time), blink, done)
 
 
 class SettingsWindow(Window):
@@ -593,36 +2206,44 @@ class SettingsWindow(Window):
     Inherits Window.
     """
 
-    def __init__(self, data):
-        """Open the Settings window.
+    # The choices for how long to pause after a wrong click: (milliseconds, button text).
+    FEEDBACK_TIMES = ((2500, "2.5s"), (1000, "1s"), (500, "0.5s"))
+
+    def __init__(self, application):
+        """Create the Settings screen.
 
         Args:
-            data (Data): A reference to the global Data object, which contains settings & highscores.
+            application (Application): The global application instance, containing references to Data.
         """
         # Perform initialisation using the Window parent class.
-        Window.__init__(self, "Options", 700, 500)
+        Window.__init__(self, "Options", 700, 680)
 
-        self.data = data
+        self.application = application
+        self.data = application.data
 
-        # Alias the close button to save_and_exit()
-        self.root.protocol("WM_DELETE_WINDOW", self.save_and_exit)
+        # The options last set on each widget, so render() only changes what it needs to.
+        self.view = view.View()
+
+        # Whether the difficulty entered is valid (see validate_difficulty()).
+        self.valid = True
 
         # Create the title.
-        self.title = tk.Label(self.root, text="Options",
-                              font=("IBM Plex Sans", 30), bg="#2b2b2b", fg="#ffffff", justify="center")
-        self.title.grid(row=0, column=0, columnspan=6)
+        self.title_label = tk.Label(self.root, text="Options",
+                                    font=theme.font(30), **theme.NORMAL, justify="center")
+        self.title_label.grid(row=0, column=0, columnspan=6)
 
         # Create the save & exit button.
         self.exit = Window.Button(self.root, text="Save & Exit",
                                   command=self.save_and_exit)
-        self.exit.grid(row=6, column=0, columnspan=6)
+        self.exit.grid(row=9, column=0, columnspan=6)
 
         # Create the setting labels.
         label_text = ["Button outlines:", "Gaps between buttons:",
-                      "Hover highlight type:", "Game difficulty preset:", "...or set a custom value (2-50):"]
+                      "Hover highlight type:", "Game difficulty preset:", "...or set a custom value (2-50):",
+                      "Color differences:", "Pause after a miss:", "Adaptive difficulty:"]
         for t in range(len(label_text)):
             label = tk.Label(
-                self.root, text=label_text[t], font=("IBM Plex Sans", 16), bg="#2b2b2b", fg="#ffffff", justify="left")
+                self.root, text=label_text[t], font=theme.font(16), **theme.NORMAL, justify="left")
             label.grid(row=t+1, column=0, columnspan=3)
 
         # Create the option buttons.
@@ -643,57 +2264,135 @@ class SettingsWindow(Window):
             self.root, 16, text="Dot", command=lambda x="dot": self.change_highlight(x), width=5)
         self.highlight_none_btn = Window.Button(
             self.root, 16, text="None", command=lambda x="none": self.change_highlight(x), width=5)
+        self.highlight_btns = {"color": self.highlight_color_btn,
+                               "dot": self.highlight_dot_btn, "none": self.highlight_none_btn}
         self.highlight_color_btn.grid(row=3, column=3)
         self.highlight_dot_btn.grid(row=3, column=4)
         self.highlight_none_btn.grid(row=3, column=5)
 
         # Difficulty presets:
         self.difficulty_easy_btn = tk.Button(
-            self.root, font=("IBM Plex Sans", 16), relief="flat", text="Easy",
-            command=lambda x=5: self.change_difficulty(x, True), width=5, fg="#33d17a", bg="#2b2b2b", highlightbackground="#33d17a")
+            self.root, font=theme.font(16), relief="flat", text="Easy",
+            command=lambda x=5: self.change_difficulty(x, True), width=5, fg=theme.GOOD, bg=theme.BACKGROUND, highlightbackground=theme.GOOD)
         self.difficulty_normal_btn = tk.Button(
-            self.root, font=("IBM Plex Sans", 16), relief="flat", text="Normal",
-            command=lambda x=10: self.change_difficulty(x, True), width=5, fg="#f6d32d", bg="#2b2b2b", highlightbackground="#f6d32d")
+            self.root, font=theme.font(16), relief="flat", text="Normal",
+            command=lambda x=10: self.change_difficulty(x, True), width=5, fg=theme.WARNING, bg=theme.BACKGROUND, highlightbackground=theme.WARNING)
         self.difficulty_hard_btn = tk.Button(
-            self.root, font=("IBM Plex Sans", 16), relief="flat", text="Hard",
-            command=lambda x=20: self.change_difficulty(x, True), width=5, fg="#e01b24", bg="#2b2b2b", highlightbackground="#e01b24")
+            self.root, font=theme.font(16), relief="flat", text="Hard",
+            command=lambda x=20: self.change_difficulty(x, True), width=5, fg=theme.BAD, bg=theme.BACKGROUND, highlightbackground=theme.BAD)
+        # The preset buttons, by difficulty (times 10, as entered in the spinbox), with their colors.
+        self.difficulty_btns = {5: (self.difficulty_easy_btn, theme.GOOD),
+                                10: (self.difficulty_normal_btn, theme.WARNING),
+                                20: (self.difficulty_hard_btn, theme.BAD)}
         self.difficulty_easy_btn.grid(row=4, column=3)
         self.difficulty_normal_btn.grid(row=4, column=4)
         self.difficulty_hard_btn.grid(row=4, column=5)
 
         # Difficulty spinbox:
         self.difficulty_spinbox = tk.Spinbox(
-            self.root, font=("IBM Plex Sans", 16), relief="flat", from_=2, to=50, increment=1, width=5, fg="#ffffff", bg="#2b2b2b", highlightbackground="#ffffff", buttonbackground="#2b2b2b", validate="key")
+            self.root, font=theme.font(16), relief="flat", from_=2, to=50, increment=1, width=5, **theme.NORMAL, highlightbackground=theme.FOREGROUND, buttonbackground=theme.BACKGROUND, validate="key")
         self.difficulty_spinbox["validatecommand"] = (
             self.root.register(self.validate_difficulty), '%P')
         self.difficulty_spinbox.grid(row=5, column=3, columnspan=3)
 
+        # Color model:
+        # "Classic" changes one of red, green or blue by a set amount; "Perceptual" picks a color that looks
+        # a set amount different, so each level is as hard as the last no matter the colors.
+        color_frame = tk.Frame(self.root, bg=theme.BACKGROUND)
+        color_frame.grid(row=6, column=3, columnspan=3)
+        self.color_classic_btn = Window.Button(
+            color_frame, 16, text="Classic", command=lambda x="classic": self.change_color_model(x), width=8)
+        self.color_perceptual_btn = Window.Button(
+            color_frame, 16, text="Perceptual", command=lambda x="perceptual": self.change_color_model(x), width=8)
+        self.color_btns = {"classic": self.color_classic_btn,
+                           "perceptual": self.color_perceptual_btn}
+        self.color_classic_btn.grid(row=0, column=0)
+        self.color_perceptual_btn.grid(row=0, column=1)
+
+        # Feedback time (how long the different cell blinks after a wrong click, in milliseconds):
+        feedback_frame = tk.Frame(self.root, bg=theme.BACKGROUND)
+        feedback_frame.grid(row=7, column=3, columnspan=3)
+        self.feedback_btns = dict()
+        for column, (ms, text) in enumerate(SettingsWindow.FEEDBACK_TIMES):
+            self.feedback_btns[ms] = Window.Button(
+                feedback_frame, 16, text=text, command=lambda x=ms: self.change_feedback_time(x), width=5)
+            self.feedback_btns[ms].grid(row=0, column=column)
+
+        # Adaptive difficulty (each puzzle's difference is chosen to find the player's limit, see adaptive.py):
+        self.adaptive_btn = Window.Button(
+            self.root, 16, text="Off", command=self.toggle_adaptive, width=5)
+        self.adaptive_btn.grid(row=8, column=4)
+
         # Set weights for the grid.
         for c in range(0, 6):
             self.root.columnconfigure(c, weight=1)
-        for r in range(0, 7):
+        for r in range(0, 10):
             self.root.rowconfigure(r, weight=1)
 
         self.root.columnconfigure(0, weight=2, minsize=250)
 
-        # Initialise the buttons with the existing data.
-        self.change_difficulty(int(self.data.difficulty * 10), True)
-        self.change_highlight(self.data.highlight)
-        self.set_gaps(self.data.button_gaps)
-        self.set_outlines(self.data.button_outlines)
+    def show(self):
+        """Initialise the buttons with the existing data, each time the screen is shown.
+        """
+        self.valid = True
+        self.change_difficulty(round(self.data.difficulty * 10), True)
+
+    def render(self):
+        """Bring every widget up to date with the settings. This is called after every change (even on every
+        keystroke in the difficulty box), so it declares how everything should look, and the view only
+        passes on to Tk the options that actually changed.
+        """
+        def choice(selected):
+            return theme.SELECTED if selected else theme.NORMAL
+
+        self.view.set(self.button_outlines_btn, **choice(self.data.button_outlines),
+                      text="On" if self.data.button_outlines else "Off")
+        self.view.set(self.button_gaps_btn, **choice(self.data.button_gaps),
+                      text="On" if self.data.button_gaps else "Off")
+        self.view.set(self.adaptive_btn, **choice(self.data.adaptive),
+                      text="On" if self.data.adaptive else "Off")
+        for mode, button in self.highlight_btns.items():
+            self.view.set(button, **choice(mode == self.data.highlight))
+        for model, button in self.color_btns.items():
+            self.view.set(button, **choice(model == self.data.color_model))
+        for ms, button in self.feedback_btns.items():
+            self.view.set(button, **choice(ms == self.data.feedback_time))
+
+        # If the difficulty matches a preset, highlight that button.
+        difficulty = round(self.data.difficulty * 10)
+        for preset, (button, color) in self.difficulty_btns.items():
+            if (preset == difficulty):
+                self.view.set(button, bg=color, fg=theme.BACKGROUND)
+            else:
+                self.view.set(button, bg=theme.BACKGROUND, fg=color)
+
+        # Point out an invalid difficulty, and don't allow saving it.
+        if (self.valid):
+            self.view.set(self.exit, state="normal", **theme.NORMAL,
+                          highlightbackground=theme.FOREGROUND, text="Save & Exit")
+            self.view.set(self.difficulty_spinbox, **theme.NORMAL,
+                          highlightbackground=theme.FOREGROUND)
+        else:
+            self.view.set(self.exit, state="disabled", fg=theme.DISABLED, bg=theme.BACKGROUND,
+                          highlightbackground=theme.DISABLED, text="Invalid Difficulty")
+            self.view.set(self.difficulty_spinbox, fg=theme.BAD, bg=theme.BACKGROUND,
+                          highlightbackground=theme.BAD)
 
-        self.root.mainloop()
+    def close(self):
+        """Alias the close button to save_and_exit().
+        """
+        self.save_and_exit()
 
     def save_and_exit(self):
         """Save and exit the settings window.
         """
         # Validate, save, and exit the settings window.
-        if (self.exit["state"] == "disabled"):
+        if (not self.valid):
             # An invalid setting. Don't exit.
             pass
         else:
-            # Close the window.
-            self.root.destroy()
+            # Go back to the main menu.
+            self.application.show(MainMenuWindow)
             # Save data.
             self.data.save()
 
@@ -703,24 +2402,13 @@ class SettingsWindow(Window):
         Args:
             value (bool): The value to set the option to.
         """
-        if (value is False):
-            self.button_outlines_btn.configure(
-                bg="#2b2b2b", fg="#ffffff", text="Off")
-        else:
-            self.button_outlines_btn.configure(
-                bg="#ffffff", fg="#2b2b2b", text="On")
         self.data.button_outlines = value
+        self.render()
 
     def toggle_outlines(self):
         """Toggle the button outlines setting.
         """
-        # Toggle the outlines setting.
-        if (self.button_outlines_btn["text"] == "On"):
-            # Currently on, turn it off.
-            self.set_outlines(False)
-        else:
-            # Currently off, turn it on.
-            self.set_outlines(True)
+        self.set_outlines(not self.data.button_outlines)
 
     def set_gaps(self, value):
         """Set the button gaps setting.
@@ -728,24 +2416,27 @@ class SettingsWindow(Window):
         Args:
             value (bool): The value to set the option to.
         """
-        if (value is False):
-            self.button_gaps_btn.configure(
-                bg="#2b2b2b", fg="#ffffff", text="Off")
-        else:
-            self.button_gaps_btn.configure(
-                bg="#ffffff", fg="#2b2b2b", text="On")
         self.data.button_gaps = value
+        self.render()
 
     def toggle_gaps(self):
         """Toggle the button gaps setting.
         """
-        # Toggle the gaps setting.
-        if (self.button_gaps_btn["text"] == "On"):
-            # Currently on, turn it off.
-            self.set_gaps(False)
-        else:
-            # Currently off, turn it on.
-            self.set_gaps(True)
+        self.set_gaps(not self.data.button_gaps)
+
+    def set_adaptive(self, value):
+        """Set the adaptive difficulty setting.
+
+        Args:
+            value (bool): The value to set the option to.
+        """
+        self.data.adaptive = value
+        self.render()
+
+    def toggle_adaptive(self):
+        """Toggle the adaptive difficulty setting.
+        """
+        self.set_adaptive(not self.data.adaptive)
 
     def change_highlight(self, mode):
         """Change the button highlight setting.
@@ -753,21 +2444,26 @@ class SettingsWindow(Window):
         Args:
             mode (str): The mode to set the setting to.
         """
-        # Change the highlights setting.
-        if (mode == "color"):
-            self.highlight_color_btn.configure(bg="#ffffff", fg="#2b2b2b")
-            self.highlight_dot_btn.configure(bg="#2b2b2b", fg="#ffffff")
-            self.highlight_none_btn.configure(bg="#2b2b2b", fg="#ffffff")
-        elif (mode == "dot"):
-            self.highlight_color_btn.configure(bg="#2b2b2b", fg="#ffffff")
-            self.highlight_dot_btn.configure(bg="#ffffff", fg="#2b2b2b")
-            self.highlight_none_btn.configure(bg="#2b2b2b", fg="#ffffff")
-        elif (mode == "none"):
-            self.highlight_color_btn.configure(bg="#2b2b2b", fg="#ffffff")
-            self.highlight_dot_btn.configure(bg="#2b2b2b", fg="#ffffff")
-            self.highlight_none_btn.configure(bg="#ffffff", fg="#2b2b2b")
-
         self.data.highlight = mode
+        self.render()
+
+    def change_color_model(self, model):
+        """Change the color model setting.
+
+        Args:
+            model (str): The model to set the setting to ("classic" or "perceptual").
+        """
+        self.data.color_model = model
+        self.render()
+
+    def change_feedback_time(self, ms):
+        """Change the feedback time setting.
+
+        Args:
+            ms (int): How long to show where the different cell was after a wrong click, in milliseconds.
+        """
+        self.data.feedback_time = ms
+        self.render()
 
     def change_difficulty(self, difficulty, overwrite=False):
         """Change the difficulty setting.
@@ -776,8 +2472,6 @@ class SettingsWindow(Window):
             difficulty (int): The difficulty to set the setting to.
             overwrite (bool, optional): Whether to overwrite the spinbox for the new value. Only set to True if triggered by clicking a preset. Defaults to False.
         """
-        # Change the difficulty setting.
-
         # Convert difficulty to an integer.
         difficulty = int(difficulty)
 
@@ -787,26 +2481,9 @@ class SettingsWindow(Window):
             self.difficulty_spinbox.delete(0, "end")
             self.difficulty_spinbox.insert(0, difficulty)
 
-        # If the current value matches a preset, highlight that button.
-        if (difficulty == 5):
-            self.difficulty_easy_btn.configure(bg="#33d17a", fg="#2b2b2b")
-            self.difficulty_normal_btn.configure(bg="#2b2b2b", fg="#f6d32d")
-            self.difficulty_hard_btn.configure(bg="#2b2b2b", fg="#e01b24")
-        elif (difficulty == 10):
-            self.difficulty_easy_btn.configure(bg="#2b2b2b", fg="#33d17a")
-            self.difficulty_normal_btn.configure(bg="#f6d32d", fg="#2b2b2b")
-            self.difficulty_hard_btn.configure(bg="#2b2b2b", fg="#e01b24")
-        elif (difficulty == 20):
-            self.difficulty_easy_btn.configure(bg="#2b2b2b", fg="#33d17a")
-            self.difficulty_normal_btn.configure(bg="#2b2b2b", fg="#f6d32d")
-            self.difficulty_hard_btn.configure(bg="#e01b24", fg="#2b2b2b")
-        else:
-            self.difficulty_easy_btn.configure(bg="#2b2b2b", fg="#33d17a")
-            self.difficulty_normal_btn.configure(bg="#2b2b2b", fg="#f6d32d")
-            self.difficulty_hard_btn.configure(bg="#2b2b2b", fg="#e01b24")
-
         # Update the setting value.
         self.data.difficulty = float(int(difficulty) / 10)
+        self.render()
 
     def validate_difficulty(self, value):
         """Validate the entered difficulty value.
@@ -824,36 +2501,15 @@ class SettingsWindow(Window):
             True: This will be always True, to allow the input to the box. 
             Returning False will cancel the input, which is confusing to the end user.
         """
+        # Check for float-ness, then for bounds.
+        # (isdecimal() allows only the digits int() can read.)
+        self.valid = value.isdecimal() and 2 <= int(value) <= 50
 
-        # Set our valid state, default to valid.
-        valid = True
-
-        # Check for float-ness
-        if (not value.isdigit()):
-            valid = False
-
-        try:
-            # Check for bounds
-            if (int(value) < 2 or int(value) > 50):
-                valid = False
-
-        except ValueError:
-            valid = False
-
-        # Finally, apply the result.
-        # It's valid:
-        if (valid):
-            self.exit.configure(
-                state="normal", fg="#ffffff", bg="#2b2b2b", highlightbackground="#ffffff", text="Save & Exit")
-            self.difficulty_spinbox.configure(
-                fg="#ffffff", bg="#2b2b2b", highlightbackground="#ffffff")
+        # Finally, apply the result. An invalid value leaves the last valid difficulty in place.
+        if (self.valid):
             self.change_difficulty(value)
-        # It's not valid:
-        elif (not valid):
-            self.exit.configure(
-                state="disabled", fg="#424242", bg="#2b2b2b", highlightbackground="#424242", text="Invalid Difficulty")
-            self.difficulty_spinbox.configure(
-                fg="#e01b24", bg="#2b2b2b", highlightbackground="#e01b24")
+        else:
+            self.render()
 
         return True
 
@@ -864,78 +2520,255 @@ class ScoreWindow(Window):
     Inherits Window.
     """
     # This class contains the highscore window, viewed when clicking "Highscores" on the main menu.
-    # It gathers its' data from the Data class.
+    # It gathers its' data from the Data class, the leaderboards from the game history, and the statistics from the analytics.
+
+    # The number of games shown on each page of the leaderboard.
+    PAGE_SIZE = 10
 
-    def __init__(self, data):
-        """Open the Score window.
+    # The leaderboards that can be shown: (button text, difficulty, color). "All" shows every difficulty.
+    BOARDS = [("All", None, theme.FOREGROUND), ("Easy", 0.5, theme.GOOD),
+              ("Normal", 1.0, theme.WARNING), ("Hard", 2.0, theme.BAD)]
+
+    def __init__(self, application):
+        """Create the Score screen.
 
         Args:
-            data (Data): A reference to the global Data object, containing settings & scores.
+            application (Application): The global application instance, containing references to Data.
         """
-        Window.__init__(self, "High Score", 500, 500)
+        Window.__init__(self, "High Score", 600, 800)
 
-        self.data = data
+        self.application = application
+        self.data = application.data
 
-        # Alias the close button to quit()
-        self.root.protocol("WM_DELETE_WINDOW", self.back)
+        # The options last set on each widget, so paging through the leaderboard only changes the cells that differ.
+        self.view = view.View()
 
         # Create the title.
         title = tk.Label(self.root, text="High Score",
-                         font=("IBM Plex Sans", 30), bg="#2b2b2b", fg="#ffffff", justify="center")
+                         font=theme.font(30), **theme.NORMAL, justify="center")
         title.grid(row=0, column=0)
 
         # Show the highscore.
-        self.score = tk.Label(self.root, text=f"Your highscore:\n{self.data.highscore}",
-                              font=("IBM Plex Sans", 24), bg="#2b2b2b", fg="#ffffff", justify="center")
+        self.score = tk.Label(self.root,
+                              font=theme.font(24), **theme.NORMAL, justify="center")
         self.score.grid(row=1, column=0)
 
+        # Create the leaderboard buttons, one for each difficulty preset.
+        boards_frame = tk.Frame(self.root, bg=theme.BACKGROUND)
+        boards_frame.grid(row=2, column=0)
+        self.board_buttons = list()
+        for i, (text, difficulty, color) in enumerate(ScoreWindow.BOARDS):
+            button = tk.Button(
+                boards_frame, font=theme.font(16), relief="flat", text=text, width=6,
+                command=lambda x=i: self.change_board(x), fg=color, bg=theme.BACKGROUND, highlightbackground=color)
+            button.grid(row=0, column=i, padx=5)
+            self.board_buttons.append(button)
+
+        # Create the leaderboard itself: a fixed set of rows, which are filled in for each page.
+        table = tk.Frame(self.root, bg=theme.BACKGROUND)
+        table.grid(row=3, column=0)
+        headings = ["#", "Level", "Difficulty", "Score", "Date"]
+        for col in range(0, len(headings)):
+            heading = tk.Label(table, text=headings[col], font=theme.font(12, "bold"),
+                               **theme.NORMAL, padx=8)
+            heading.grid(row=0, column=col)
+        self.rows = list()
+        for row in range(0, ScoreWindow.PAGE_SIZE):
+            labels = list()
+            for col in range(0, len(headings)):
+                label = self.view.track(tk.Label(table, font=theme.font(12),
+                                                 **theme.NORMAL, padx=8), text="")
+                label.grid(row=row + 1, column=col)
+                labels.append(label)
+            self.rows.append(labels)
+
+        # Show the statistics for the leaderboard's difficulty.
+        self.stats = tk.Label(self.root, font=theme.font(12),
+                              **theme.NORMAL, justify="center")
+        self.stats.grid(row=4, column=0)
+
+        # Create the page buttons.
+        pages_frame = tk.Frame(self.root, bg=theme.BACKGROUND)
+        pages_frame.grid(row=5, column=0)
+        self.previous_btn = Window.Button(
+            pages_frame, 16, text="< Previous", command=lambda: self.change_page(-1))
+        self.previous_btn.grid(row=0, column=0)
+        self.page_label = tk.Label(pages_frame, font=theme.font(16),
+                                   **theme.NORMAL, width=12)
+        self.page_label.grid(row=0, column=1)
+        self.next_btn = Window.Button(
+            pages_frame, 16, text="Next >", command=lambda: self.change_page(1))
+        self.next_btn.grid(row=0, column=2)
+
         # Create the reset button.
-        self.reset_clicks = 0
         self.reset = tk.Button(
-            self.root, font=("IBM Plex Sans", 20), relief="flat", text="Reset Highscore",
-            command=self.reset, fg="#e01b24", bg="#2b2b2b", highlightbackground="#e01b24")
-        self.reset.grid(row=2, column=0)
+            self.root, font=theme.font(20), relief="flat",
+            command=self.reset)
+        self.reset.grid(row=6, column=0)
 
         # Create the back button.
         exit = Window.Button(self.root, text="Back to Menu",
                              command=self.back)
-        exit.grid(row=3, column=0)
+        exit.grid(row=7, column=0)
 
         # Set weights for the grid.
-        for r in range(0, 4):
+        for r in range(0, 8):
             self.root.rowconfigure(r, weight=1)
 
         self.root.columnconfigure(0, weight=1, minsize=250)
 
-        self.root.mainloop()
+        self.board = 0
+        self.page = 0
+
+    def show(self):
+        """Show the current highscore and the first page of the leaderboard each time the screen is shown.
+        """
+        # Make sure the last game played has been written to the history.
+        self.application.history.flush()
+        self.view.set(self.score, text=f"Your highscore:\n{self.data.highscore}")
+        self.change_board(self.board)
+
+    def change_board(self, board):
+        """Switch to a different leaderboard, starting at the first page.
+
+        Args:
+            board (int): The index of the leaderboard in ScoreWindow.BOARDS.
+        """
+        self.board = board
+        self.page = 0
+        for i, (text, difficulty, color) in enumerate(ScoreWindow.BOARDS):
+            if (i == board):
+                self.view.set(self.board_buttons[i], bg=color, fg=theme.BACKGROUND)
+            else:
+                self.view.set(self.board_buttons[i], bg=theme.BACKGROUND, fg=color)
+
+        # Disarm the reset button, which resets the leaderboard being shown.
+        self.reset_clicks = 0
+        text = "Reset Highscore" if board == 0 else f"Reset {ScoreWindow.BOARDS[board][0]} Scores"
+        self.view.set(self.reset, text=text, fg=theme.BAD, bg=theme.BACKGROUND,
+                      highlightbackground=theme.BAD, state="normal")
+
+        self.show_stats()
+        self.show_page()
+
+    def show_stats(self):
+        """Show the statistics for the leaderboard's difficulty, across every game ever played (resetting the
+        leaderboard doesn't reset them). They're read from the analytics' sketches, so this is instant.
+        """
+        difficulty = ScoreWindow.BOARDS[self.board][1]
+        totals = self.application.analytics.totals
+        hit_rate = totals.hit_rate(difficulty)
+        if (hit_rate is None):
+            self.view.set(self.stats, text="No statistics yet: play a game!")
+            return
+
+        levels = totals.levels_reached(difficulty)
+        # Reaction times are kept by level, so they're shown for every difficulty.
+        reaction = totals.reaction_times()
+        lines = [f"Accuracy: {hit_rate:.0%} of clicks"]
+        if (levels.count):
+            lines.append(f"Level reached: {levels.quantile(0.5):.0f} typically, "
+                         f"{levels.quantile(0.9):.0f} in your best 10% of games")
+        lines.append(f"Reaction time: {reaction.quantile(0.5) / 1000:.2f}s typically, "
+                     f"{reaction.quantile(0.9) / 1000:.2f}s on your slowest 10% of clicks")
+        self.view.set(self.stats, text="\n".join(lines))
+
+    def change_page(self, change):
+        """Move forwards or backwards through the leaderboard.
+
+        Args:
+            change (int): The number of pages to move (negative to move backwards).
+        """
+        self.page += change
+        self.show_page()
+
+    def show_page(self):
+        """Fill in the leaderboard rows with the current page of games.
+        Only one page is read from the game history, using its indexes, so this is quick however many games there are.
+        """
+        difficulty = ScoreWindow.BOARDS[self.board][1]
+        total = self.application.history.count(difficulty)
+        pages = max(1, -(-total // ScoreWindow.PAGE_SIZE))
+        self.page = max(0, min(self.page, pages - 1))
+
+        games = self.application.history.leaderboard(
+            ScoreWindow.PAGE_SIZE, self.page * ScoreWindow.PAGE_SIZE, difficulty)
+        for row in range(0, ScoreWindow.PAGE_SIZE):
+            if (row < len(games)):
+                game = games[row]
+                text = [f"{self.page * ScoreWindow.PAGE_SIZE + row + 1}", f"{game.level}",
+                        engine.difficulty_label(game.difficulty), f"{game.score:g}",
+                        time.strftime("%Y-%m-%d", time.localtime(game.finished_at))]
+            else:
+                text = [""] * len(self.rows[row])
+            for col in range(0, len(text)):
+                self.view.set(self.rows[row][col], text=text[col])
+
+        self.view.set(self.page_label, text=f"Page {self.page + 1} of {pages}")
+        self.view.set(self.previous_btn, state="normal" if self.page > 0 else "disabled")
+        self.view.set(self.next_btn, state="normal" if self.page < pages - 1 else "disabled")
+
+    def close(self):
+        """Alias the close button to back().
+        """
+        self.back()
 
     def back(self):
-        """Close the score window.
+        """Close the score screen, going back to the main menu.
         """
-        # Close this window.
-        self.root.destroy()
+        self.application.show(MainMenuWindow)
 
     def reset(self):
         """Process a click on the reset button.
         If this is the first click, "arm" the button, but don't reset.
-        If this is the second click (the button is already "armed"), reset the highscore.
+        If this is the second click (the button is already "armed"), reset the highscore and leaderboard
+        (or just the leaderboard, if a single difficulty is shown).
         """
         if (self.reset_clicks == 0):
             # First click. Change button to "armed" state.
-            self.reset.configure(
-                text="Are you sure?", bg="#e01b24", fg="#2b2b2b", highlightbackground="#e01b24")
+            self.view.set(self.reset, text="Are you sure?", bg=theme.BAD, fg=theme.BACKGROUND,
+                          highlightbackground=theme.BAD)
             self.reset_clicks = 1
         elif (self.reset_clicks == 1):
             # Second click. Actually reset!
-            self.data.highscore = 3
+            difficulty = ScoreWindow.BOARDS[self.board][1]
+            if (difficulty is None):
+                self.data.highscore = 3
+                # Counted, so the old highscore isn't brought back when the player's save file is written.
+                self.data.resets += 1
+            # Wait for the games to be deleted, so they're gone from the page shown next.
+            self.application.history.reset(difficulty).result()
             # Show the updated score.
-            self.score.configure(
-                text=f"Your highscore:\n{self.data.highscore}")
-            self.reset.configure(
-                text="Highscore Reset", bg="#2b2b2b", fg="#424242", highlightbackground="#424242", state="disabled")
+            self.view.set(self.score, text=f"Your highscore:\n{self.data.highscore}")
+            self.show_page()
+            self.view.set(self.reset, text="Scores Reset" if difficulty is not None else "Highscore Reset",
+                          bg=theme.BACKGROUND, fg=theme.DISABLED, highlightbackground=theme.DISABLED, state="disabled")
 
 
     # RUNNING
 if __name__ == "__main__":
-    # Run the game.
-    application = Application()
+    # Read the command-line options.
+    parser = argparse.ArgumentParser(description="Visage, a color game.")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each part of starting up took")
+    parser.add_argument("--deck", metavar="FILE",
+                        help="play the puzzles from a deck built with deck.py, instead of generating them")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="replay a session log from ~/visage_sessions, at the pace it was played")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="profile the whole session with cProfile, writing the results to FILE")
+    args = parser.parse_args()
+
+    if (args.profile):
+        # Run the game under the profiler, then save the profile and print the timings.
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.runcall(Application, args.startup_report,
+                         args.deck, args.replay)
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile} (view it with: python -m pstats {args.profile})")
+        print(metrics.METRICS.report())
+    else:
+        # Run the game.
+        application = Application(
+            args.startup_report, args.deck, args.replay)
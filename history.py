@@ -0,0 +1,185 @@
+# Visage
+# a color game by Conor Eager
+# The game history: a record of every finished game, kept in a local SQLite database,
+# with indexes so the leaderboards stay fast with hundreds of thousands of games.
+# This module doesn't use Tk, so it can be used without a display.
+
+# IMPORTS
+# Import array for storing per-level timings compactly
+from array import array
+
+# Import namedtuple for the rows returned by queries
+import collections
+
+# Import concurrent.futures and threading so games can be recorded in the background
+import concurrent.futures
+import threading
+
+# Import sqlite3 for the database itself
+import sqlite3
+
+# Import time for recording when each game finished
+import time
+
+# CONSTANTS
+
+# The layout of the database. Scores are stored as well as level & difficulty so they can be indexed.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    difficulty REAL NOT NULL,
+    level INTEGER NOT NULL,
+    score REAL NOT NULL,
+    lives_lost INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    level_times BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_score ON games (score DESC, finished_at);
+CREATE INDEX IF NOT EXISTS games_by_difficulty ON games (difficulty, score DESC, finished_at);
+CREATE INDEX IF NOT EXISTS games_by_date ON games (finished_at);
+"""
+
+# CLASSES
+
+
+class Game(collections.namedtuple("Game", ["id", "finished_at", "difficulty", "level", "score", "lives_lost", "duration", "level_times"])):
+    """A single finished game from the history.
+
+    Attributes:
+        id (int): The game's ID in the database.
+        finished_at (float): When the game finished, as a Unix timestamp.
+        difficulty (float): The difficulty setting the game was played on.
+        level (int): The level reached.
+        score (float): The score (level times difficulty).
+        lives_lost (int): How many lives were lost.
+        duration (float): How long the game lasted, in seconds.
+        level_times (array): How long each level took, in seconds, in the order they were played.
+    """
+    __slots__ = ()
+
+
+class HistoryStore:
+    """This class stores the history of finished games, and answers leaderboard queries.
+    Games are written on a background thread so recording one never holds up the game;
+    queries are answered straight away from the indexes.
+    """
+
+    def __init__(self, location=":memory:"):
+        """Open (or create) a history database.
+
+        Args:
+            location (str, optional): The path of the database file. Defaults to ":memory:" (not saved).
+        """
+        self.location = location
+        # The connection is shared with the writer thread, so only one thread uses it at a time.
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(location, check_same_thread=False)
+        with self.lock:
+            # Write-ahead logging makes each recorded game a single, cheap append.
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+        self.writer = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="Visage history writer")
+
+    def record(self, difficulty, level, lives_lost, duration, level_times, finished_at=None):
+        """Record a finished game. This returns straight away; the game is written in the background.
+
+        Args:
+            difficulty (float): The difficulty setting the game was played on.
+            level (int): The level reached.
+            lives_lost (int): How many lives were lost.
+            duration (float): How long the game lasted, in seconds.
+            level_times (list): How long each level took, in seconds.
+            finished_at (float, optional): When the game finished, as a Unix timestamp. Defaults to now.
+
+        Returns:
+            concurrent.futures.Future: Completes with the new game's ID once it has been written.
+        """
+        if (finished_at is None):
+            finished_at = time.time()
+        row = (finished_at, difficulty, level, level * difficulty, lives_lost, duration,
+               array("f", level_times).tobytes())
+        return self.writer.submit(self.insert, [row])
+
+    def insert(self, rows):
+        """Write games to the database, in one transaction. Used by record(), and for importing many games at once.
+
+        Args:
+            rows (list): The games, as (finished_at, difficulty, level, score, lives_lost, duration, level_times) tuples.
+
+        Returns:
+            int: The ID of the last game written.
+        """
+        with self.lock, self.connection:
+            cursor = self.connection.executemany(
+                "INSERT INTO games (finished_at, difficulty, level, score, lives_lost, duration, level_times) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            return cursor.lastrowid
+
+    def query(self, sql, parameters=()):
+        """Run a query, returning every row as a Game."""
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        return [Game(*row[:7], array("f", row[7])) for row in rows]
+
+    def leaderboard(self, limit=10, offset=0, difficulty=None):
+        """Get a page of the best games, highest score first.
+
+        Args:
+            limit (int, optional): The number of games on the page. Defaults to 10.
+            offset (int, optional): The number of games to skip (the page number times the limit). Defaults to 0.
+            difficulty (float, optional): Only include games on this difficulty. Defaults to None (every difficulty).
+
+        Returns:
+            list: The games on the page, as Game tuples.
+        """
+        if (difficulty is None):
+            return self.query("SELECT * FROM games ORDER BY score DESC, finished_at LIMIT ? OFFSET ?",
+                              (limit, offset))
+        return self.query("SELECT * FROM games WHERE difficulty = ? ORDER BY score DESC, finished_at LIMIT ? OFFSET ?",
+                          (difficulty, limit, offset))
+
+    def count(self, difficulty=None):
+        """Count the games in the history.
+
+        Args:
+            difficulty (float, optional): Only count games on this difficulty. Defaults to None (every difficulty).
+
+        Returns:
+            int: The number of games.
+        """
+        with self.lock:
+            if (difficulty is None):
+                return self.connection.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+            return self.connection.execute("SELECT COUNT(*) FROM games WHERE difficulty = ?", (difficulty,)).fetchone()[0]
+
+    def reset(self, difficulty=None):
+        """Delete games from the history.
+
+        Args:
+            difficulty (float, optional): Only delete games on this difficulty. Defaults to None (delete every game).
+
+        Returns:
+            concurrent.futures.Future: Completes once the games have been deleted.
+        """
+        return self.writer.submit(self.delete, difficulty)
+
+    def delete(self, difficulty=None):
+        """Delete games from the history straight away. Used by reset()."""
+        with self.lock, self.connection:
+            if (difficulty is None):
+                self.connection.execute("DELETE FROM games")
+            else:
+                self.connection.execute(
+                    "DELETE FROM games WHERE difficulty = ?", (difficulty,))
+
+    def flush(self):
+        """Wait for every game recorded so far to be written."""
+        self.writer.submit(lambda: None).result()
+
+    def close(self):
+        """Finish writing, then close the database."""
+        self.writer.shutdown(wait=True)
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,162 @@
+# Visage
+# a color game by Conor Eager
+# Timings for the game's hot paths: how long clicks, puzzles, grid builds, screen changes and saves take.
+# This module doesn't use Tk, so it can be used without a display.
+#
+# Each kind of timing (a "span") keeps its most recent samples in a fixed-size ring buffer of nanoseconds,
+# so recording one never allocates, and a long session can't use more and more memory.
+
+# IMPORTS
+# Import array for the ring buffers
+from array import array
+
+# Import contextlib for timing a block of code with a "with" statement
+import contextlib
+
+# Import threading, as saves are timed on the save writer's thread
+import threading
+
+# Import time for the clock
+import time
+
+# CONSTANTS
+
+# How many of the most recent samples each span keeps.
+RING_SIZE = 1024
+
+# The percentiles reported for each span.
+PERCENTILES = (50, 95, 99)
+
+# FUNCTIONS
+
+
+def percentiles(samples, wanted=PERCENTILES):
+    """Work out percentiles of a set of timings (nearest-rank, so each is one of the samples).
+
+    Args:
+        samples (iterable): The timings.
+        wanted (tuple, optional): The percentiles to work out. Defaults to PERCENTILES.
+
+    Returns:
+        list: The percentiles, or None for each if there are no samples.
+    """
+    samples = sorted(samples)
+    if (not samples):
+        return [None] * len(wanted)
+    return [samples[max(0, -(-len(samples) * p // 100) - 1)] for p in wanted]
+
+# CLASSES
+
+
+class Ring:
+    """This class keeps the most recent timings for one span, in a fixed-size ring buffer.
+    """
+    __slots__ = ("samples", "count")
+
+    def __init__(self, size=RING_SIZE):
+        """Create an empty ring buffer.
+
+        Args:
+            size (int, optional): The number of samples to keep. Defaults to RING_SIZE.
+        """
+        self.samples = array("q", bytes(8 * size))
+        # The number of samples ever added. The next one goes at count % size.
+        self.count = 0
+
+    def add(self, ns):
+        """Add a sample, replacing the oldest one if the buffer is full.
+
+        Args:
+            ns (int): The timing, in nanoseconds.
+        """
+        self.samples[self.count % len(self.samples)] = ns
+        self.count += 1
+
+    def values(self):
+        """Get the samples currently kept, in no particular order.
+
+        Returns:
+            array: The samples, in nanoseconds.
+        """
+        return self.samples[:min(self.count, len(self.samples))]
+
+
+class Metrics:
+    """This class records timings for named spans, e.g. "grid build".
+    Timings are recorded with time.perf_counter_ns, either by timing a block of code with span(),
+    or by passing a timing measured elsewhere (e.g. across several callbacks) to record().
+    """
+
+    def __init__(self, size=RING_SIZE):
+        """Create an empty set of timings.
+
+        Args:
+            size (int, optional): The number of samples each span keeps. Defaults to RING_SIZE.
+        """
+        self.size = size
+        # The ring buffers, by span name, in the order they were first recorded.
+        self.rings = dict()
+        self.lock = threading.Lock()
+
+    def record(self, name, ns):
+        """Record a timing for a span.
+
+        Args:
+            name (str): The name of the span.
+            ns (int): The timing, in nanoseconds.
+        """
+        with self.lock:
+            ring = self.rings.get(name)
+            if (ring is None):
+                ring = self.rings[name] = Ring(self.size)
+            ring.add(ns)
+
+    @contextlib.contextmanager
+    def span(self, name):
+        """Time a block of code, e.g.:
+            with METRICS.span("save"):
+                ...
+
+        Args:
+            name (str): The name of the span.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - start)
+
+    def summary(self):
+        """Summarise every span.
+
+        Returns:
+            dict: (count, p50, p95, p99) for each span, by name. Percentiles are in milliseconds.
+        """
+        with self.lock:
+            rings = [(name, ring.count, ring.values())
+                     for name, ring in self.rings.items()]
+        summary = dict()
+        for name, count, samples in rings:
+            summary[name] = (count, *[ns / 1e6 for ns in percentiles(samples)])
+        return summary
+
+    def report(self):
+        """Describe every span as a table, for the overlay or the terminal.
+
+        Returns:
+            str: The table, one span per line.
+        """
+        lines = [f"{'span':<16}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)"]
+        for name, (count, p50, p95, p99) in self.summary().items():
+            lines.append(
+                f"{name:<16}{count:>7}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}")
+        return "\n".join(lines)
+
+    def clear(self):
+        """Forget every timing recorded so far."""
+        with self.lock:
+            self.rings = dict()
+
+
+# The timings for the whole game.
+METRICS = Metrics()
@@ -0,0 +1,412 @@
+# Visage
+# a color game by Conor Eager
+# Perceptual color generation: choosing the "incorrect" color to be a set distance from the "correct" color
+# as people actually see it (CIEDE2000 in CIELAB), rather than a set step in one RGB component.
+# This module doesn't use Tk, so it can be used without a display.
+#
+# A step of 10 in one RGB component can be obvious (in the blues of a dark color) or almost invisible
+# (in the greens of a bright one), so the classic generator's levels vary a lot in difficulty.
+# Here, the difference wanted for the level is fixed in ΔE2000 units, and a batch of candidate colors
+# around the correct color is scored at once to find the one closest to it.
+#
+# NumPy is used to score hundreds of candidates at a time if it's installed. Without it, a smaller batch
+# is scored in pure Python, which is slower and a little less accurate, but gives the same kind of puzzle.
+
+# IMPORTS
+# Import math for the pure Python version of the color math
+import math
+
+# Import random for random generation of colors
+import random
+
+# Import NumPy for scoring candidates in batches, if it's installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Import the colors module for the Puzzle class
+import colors
+
+# CONSTANTS
+
+# The difference wanted at each level is TARGET_SCALE divided by the level times the difficulty,
+# but never less than MIN_DIFFERENCE (below which the colors are too close to tell apart at all).
+# A ΔE2000 of about 1 is the smallest difference most people can see side by side.
+TARGET_SCALE = 60.0
+MIN_DIFFERENCE = 0.5
+
+# The number of candidate colors scored for each puzzle, with and without NumPy.
+# The candidates are already aimed at the target, so a larger batch only helps with rounding to whole RGB values:
+# 512 lands within about 0.02 ΔE2000 of the target at level 3, and much closer at later levels.
+BATCH = 512
+PYTHON_BATCH = 32
+
+# How far (in RGB units) to step from the correct color to measure how quickly the difference grows.
+PROBE = 8
+
+# Lookup table from an 8-bit sRGB value to linear light (0 to 1), so the gamma curve is never computed per color.
+GAMMA = tuple((value / 255) / 12.92 if value <= 10 else ((value / 255 + 0.055) / 1.055) ** 2.4
+              for value in range(0x100))
+
+# The sRGB (D65) to CIE XYZ matrix, with each row divided by the D65 white point, so white is (1, 1, 1).
+XYZ = ((0.4124564 / 0.95047, 0.3575761 / 0.95047, 0.1804375 / 0.95047),
+       (0.2126729, 0.7151522, 0.0721750),
+       (0.0193339 / 1.08883, 0.1191920 / 1.08883, 0.9503041 / 1.08883))
+
+# 25 to the 7th power, used by CIEDE2000's chroma correction.
+POW25_7 = 25.0 ** 7
+
+# Constants for CIEDE2000's hue weighting, in radians.
+COS_30, SIN_30 = math.cos(math.radians(30)), math.sin(math.radians(30))
+COS_6, SIN_6 = math.cos(math.radians(6)), math.sin(math.radians(6))
+COS_63, SIN_63 = math.cos(math.radians(63)), math.sin(math.radians(63))
+
+if (numpy is not None):
+    GAMMA_ARRAY = numpy.array(GAMMA)
+    XYZ_ARRAY = numpy.array(XYZ).T
+
+# FUNCTIONS
+
+
+def target_difference(level, difficulty):
+    """Work out how far (in ΔE2000) the incorrect color should be from the correct color at a level.
+
+    Args:
+        level (int): The current game level.
+        difficulty (float): The difficulty setting.
+
+    Returns:
+        float: The difference wanted.
+    """
+    return max(MIN_DIFFERENCE, TARGET_SCALE / max(1, round(level * difficulty)))
+
+
+def _f(t):
+    # The CIELAB transfer function.
+    return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+
+def to_lab(color):
+    """Convert an RGB color to CIELAB (D65).
+
+    Args:
+        color (tuple): The color, as three integers from 0 to 255 (red, green, blue).
+
+    Returns:
+        tuple: The color as (L, a, b).
+    """
+    red, green, blue = GAMMA[color[0]], GAMMA[color[1]], GAMMA[color[2]]
+    fx, fy, fz = (_f(row[0] * red + row[1] * green + row[2] * blue)
+                  for row in XYZ)
+    return (116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz))
+
+
+def delta_e(lab1, lab2):
+    """Work out the CIEDE2000 color difference between two CIELAB colors.
+
+    Args:
+        lab1 (tuple): The first color, as (L, a, b).
+        lab2 (tuple): The second color, as (L, a, b).
+
+    Returns:
+        float: The difference (ΔE2000). 0 means the colors are the same.
+    """
+    l1, a1, b1 = lab1
+    l2, a2, b2 = lab2
+
+    # Stretch the a axis for low-chroma colors, where CIELAB underestimates differences.
+    c_mean = (math.hypot(a1, b1) + math.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - math.sqrt(c_mean ** 7 / (c_mean ** 7 + POW25_7)))
+    a1, a2 = a1 * (1 + g), a2 * (1 + g)
+    c1, c2 = math.hypot(a1, b1), math.hypot(a2, b2)
+    h1 = math.degrees(math.atan2(b1, a1)) % 360 if c1 else 0.0
+    h2 = math.degrees(math.atan2(b2, a2)) % 360 if c2 else 0.0
+
+    # Differences in lightness, chroma and hue.
+    delta_l = l2 - l1
+    delta_c = c2 - c1
+    delta_h = h2 - h1
+    if (c1 * c2 == 0):
+        delta_h = 0.0
+    elif (delta_h > 180):
+        delta_h -= 360
+    elif (delta_h < -180):
+        delta_h += 360
+    delta_big_h = 2 * math.sqrt(c1 * c2) * math.sin(math.radians(delta_h) / 2)
+
+    # Means, for the weighting functions.
+    l_mean = (l1 + l2) / 2
+    c_mean = (c1 + c2) / 2
+    h_mean = h1 + h2
+    if (c1 * c2 != 0):
+        if (abs(h1 - h2) > 180):
+            h_mean += 360 if h_mean < 360 else -360
+        h_mean /= 2
+
+    t = (1 - 0.17 * math.cos(math.radians(h_mean - 30)) + 0.24 * math.cos(math.radians(2 * h_mean))
+         + 0.32 * math.cos(math.radians(3 * h_mean + 6)) - 0.20 * math.cos(math.radians(4 * h_mean - 63)))
+    delta_theta = 30 * math.exp(-((h_mean - 275) / 25) ** 2)
+    r_c = 2 * math.sqrt(c_mean ** 7 / (c_mean ** 7 + POW25_7))
+    s_l = 1 + 0.015 * (l_mean - 50) ** 2 / math.sqrt(20 + (l_mean - 50) ** 2)
+    s_c = 1 + 0.045 * c_mean
+    s_h = 1 + 0.015 * c_mean * t
+    r_t = -math.sin(math.radians(2 * delta_theta)) * r_c
+
+    l_term, c_term, h_term = delta_l / s_l, delta_c / s_c, delta_big_h / s_h
+    return math.sqrt(l_term ** 2 + c_term ** 2 + h_term ** 2 + r_t * c_term * h_term)
+
+
+def to_lab_batch(batch):
+    """Convert many RGB colors to CIELAB (D65) at once. Needs NumPy.
+
+    Args:
+        batch (numpy.ndarray): The colors, as an (n, 3) array of integers from 0 to 255.
+
+    Returns:
+        numpy.ndarray: The colors, as an (n, 3) array of (L, a, b).
+    """
+    xyz = GAMMA_ARRAY[batch] @ XYZ_ARRAY
+    f = numpy.where(xyz > 216 / 24389, numpy.cbrt(xyz),
+                    (24389 / 27 * xyz + 16) / 116)
+    lab = numpy.empty_like(f)
+    lab[:, 0] = 116 * f[:, 1] - 16
+    lab[:, 1] = 500 * (f[:, 0] - f[:, 1])
+    lab[:, 2] = 200 * (f[:, 1] - f[:, 2])
+    return lab
+
+
+def delta_e_batch(lab1, lab2):
+    """Work out the CIEDE2000 color difference between one CIELAB color and many others at once. Needs NumPy.
+    This is the same calculation as delta_e(), rearranged to need as few array operations as possible
+    (trigonometry is most of the cost): the hue difference comes from a dot and cross product, and the
+    mean hue from the sum of the two hue directions, so only one arctan2 is needed.
+
+    Args:
+        lab1 (tuple): The color to compare against, as (L, a, b).
+        lab2 (numpy.ndarray): The colors to compare, as an (n, 3) array of (L, a, b).
+
+    Returns:
+        numpy.ndarray: The difference (ΔE2000) for each color.
+    """
+    l1, a1, b1 = lab1
+    l2, a2, b2 = lab2[:, 0], lab2[:, 1], lab2[:, 2]
+
+    # Stretch the a axis for low-chroma colors, where CIELAB underestimates differences.
+    c_mean = (math.hypot(a1, b1) + numpy.sqrt(a2 * a2 + b2 * b2)) / 2
+    c_mean7 = c_mean * c_mean
+    c_mean7 = c_mean7 * c_mean7 * c_mean7 * c_mean
+    g = 1.5 - 0.5 * numpy.sqrt(c_mean7 / (c_mean7 + POW25_7))
+    a1, a2 = a1 * g, a2 * g
+    c1, c2 = numpy.sqrt(a1 * a1 + b1 * b1), numpy.sqrt(a2 * a2 + b2 * b2)
+
+    # Differences in lightness, chroma and hue. ΔH = 2 sqrt(C1 C2) sin(Δh / 2), which is
+    # sqrt(2 (C1 C2 - a1 a2 - b1 b2)), with the sign of the cross product (the direction of the hue change).
+    delta_l = l2 - l1
+    delta_c = c2 - c1
+    c_product = c1 * c2
+    delta_big_h = numpy.copysign(numpy.sqrt(numpy.maximum(0, 2 * (c_product - a1 * a2 - b1 * b2))),
+                                 a1 * b2 - a2 * b1)
+
+    # The mean hue is halfway along the shorter arc between the two hues: the direction of the sum of their
+    # unit vectors. A color with no chroma has no hue, and adds nothing to the sum.
+    c1_safe = numpy.where(c1 == 0, numpy.inf, c1)
+    c2_safe = numpy.where(c2 == 0, numpy.inf, c2)
+    x = a1 / c1_safe + a2 / c2_safe
+    y = b1 / c1_safe + b2 / c2_safe
+    length = numpy.sqrt(x * x + y * y)
+    opposite = (length == 0) & (c1 * c2 != 0)
+    length[length == 0] = numpy.inf
+    cos_h, sin_h = x / length, y / length
+    cos_h[length == numpy.inf] = 1
+    if (opposite.any()):
+        # Hues exactly opposite each other have no shorter arc; delta_e() takes the plain average of the two.
+        h1 = numpy.arctan2(b1, a1) % (2 * math.pi)
+        h2 = numpy.arctan2(b2, a2) % (2 * math.pi)
+        h_opposite = ((h1 + h2) / 2)[opposite]
+        cos_h[opposite], sin_h[opposite] = numpy.cos(h_opposite), numpy.sin(h_opposite)
+    # arctan2 gives -180° to 180°; delta_e() measures from 275° on a 0° to 360° scale, so this does too.
+    h_mean = numpy.degrees(numpy.arctan2(sin_h, cos_h)) % 360
+
+    # T = 1 - 0.17 cos(h - 30°) + 0.24 cos(2h) + 0.32 cos(3h + 6°) - 0.20 cos(4h - 63°)
+    cos_2h, sin_2h = 2 * cos_h * cos_h - 1, 2 * sin_h * cos_h
+    cos_3h, sin_3h = cos_h * (4 * cos_h * cos_h - 3), sin_h * (3 - 4 * sin_h * sin_h)
+    cos_4h, sin_4h = 2 * cos_2h * cos_2h - 1, 2 * sin_2h * cos_2h
+    t = (1 - 0.17 * (cos_h * COS_30 + sin_h * SIN_30) + 0.24 * cos_2h
+         + 0.32 * (cos_3h * COS_6 - sin_3h * SIN_6) - 0.20 * (cos_4h * COS_63 + sin_4h * SIN_63))
+    h_offset = (h_mean - 275) / 25
+    delta_theta = math.radians(30) * numpy.exp(-h_offset * h_offset)
+
+    l_mean = (l1 + l2) / 2
+    c_mean = (c1 + c2) / 2
+    c_mean7 = c_mean * c_mean
+    c_mean7 = c_mean7 * c_mean7 * c_mean7 * c_mean
+    r_c = 2 * numpy.sqrt(c_mean7 / (c_mean7 + POW25_7))
+    l_offset = (l_mean - 50) * (l_mean - 50)
+    s_l = 1 + 0.015 * l_offset / numpy.sqrt(20 + l_offset)
+    s_c = 1 + 0.045 * c_mean
+    s_h = 1 + 0.015 * c_mean * t
+    r_t = -numpy.sin(2 * delta_theta) * r_c
+
+    l_term, c_term, h_term = delta_l / s_l, delta_c / s_c, delta_big_h / s_h
+    return numpy.sqrt(l_term * l_term + c_term * c_term + h_term * h_term + r_t * c_term * h_term)
+
+# CLASSES
+
+
+class PerceptualGenerator:
+    """This class generates Puzzles where the two colors are a set perceptual distance apart.
+    It can be used anywhere a colors.PuzzleGenerator can.
+
+    For each puzzle, the difference is first measured along six short steps from the correct color, which gives
+    how fast it grows in every direction (see local_metric()). A batch of random directions is then each scaled
+    to where the difference should reach the target, the resulting candidates are scored exactly,
+    and the one that comes closest to the target (after rounding to whole RGB values) is used.
+    """
+
+    def __init__(self, rng=None):
+        """Create a new PerceptualGenerator.
+
+        Args:
+            rng (random.Random, optional): The random number generator to use.
+            Pass a seeded random.Random to get the same puzzles every time (given the same NumPy, or lack of it).
+            Defaults to a new, unseeded generator.
+        """
+        self.rng = rng if rng is not None else random.Random()
+        if (numpy is not None):
+            # NumPy's generator is seeded from ours, so a seeded game is still repeatable.
+            self.batch_rng = numpy.random.default_rng(self.rng.getrandbits(64))
+
+    def generate(self, level, difficulty):
+        """Generate the puzzle for a level.
+
+        Args:
+            level (int): The current game level (the number of rows and columns in the grid).
+            difficulty (float): The difficulty setting.
+
+        Returns:
+            colors.Puzzle: The new puzzle.
+        """
+        return self.generate_at(level, target_difference(level, difficulty))
+
+    def generate_at(self, level, target):
+        """Generate a puzzle with a given difference between the colors (used by adaptive.AdaptiveGenerator).
+
+        Args:
+            level (int): The current game level (the number of rows and columns in the grid).
+            target (float): The difference wanted, in ΔE2000.
+
+        Returns:
+            colors.Puzzle: The new puzzle.
+        """
+        rng = self.rng
+
+        bits = rng.getrandbits(24)
+        color = (bits >> 16, (bits >> 8) & 0xFF, bits & 0xFF)
+        lab = to_lab(color)
+        metric = self.local_metric(color, lab)
+        if (numpy is not None):
+            different_color = self.closest_batch(color, lab, metric, target)
+        else:
+            different_color = self.closest(color, lab, metric, target)
+
+        # Choose which cell will be different.
+        row = rng.randrange(level)
+        col = rng.randrange(level)
+
+        return colors.Puzzle(level, color, different_color, row, col)
+
+    def local_metric(self, color, lab):
+        """Measure how quickly the difference grows in each direction from a color.
+        Close to a color, ΔE2000 behaves like a distance with a different scale in each direction:
+        a step of t along a unit RGB direction u gives a difference of about t * sqrt(u · M · u).
+        M is worked out from the differences of three steps along the R, G and B axes, and three along the diagonals
+        between them. Steps go towards the middle of the RGB cube, so they never leave it.
+
+        Args:
+            color (tuple): The color, as three integers from 0 to 255.
+            lab (tuple): The same color in CIELAB.
+
+        Returns:
+            list: M, as a 3x3 list of lists.
+        """
+        signs = [1 if value < 0x80 else -1 for value in color]
+
+        def squared(*components):
+            # The squared difference for a step of PROBE along the given components.
+            step = list(color)
+            for component in components:
+                step[component] += signs[component] * PROBE
+            return delta_e(lab, to_lab(step)) ** 2
+
+        axes = [squared(component) for component in range(3)]
+        metric = [[0.0] * 3 for _ in range(3)]
+        for i in range(3):
+            metric[i][i] = axes[i] / PROBE ** 2
+            for j in range(i + 1, 3):
+                metric[i][j] = metric[j][i] = (signs[i] * signs[j] * (squared(i, j) - axes[i] - axes[j])
+                                               / (2 * PROBE ** 2))
+        return metric
+
+    def closest_batch(self, color, lab, metric, target):
+        """Find a color close to target ΔE2000 away from color, scoring BATCH candidates at once with NumPy.
+
+        Args:
+            color (tuple): The correct color, as three integers from 0 to 255.
+            lab (tuple): The correct color in CIELAB.
+            metric (list): How quickly the difference grows in each direction, from local_metric().
+            target (float): The difference wanted.
+
+        Returns:
+            tuple: The incorrect color, as three integers from 0 to 255.
+        """
+        # Random directions, evenly spread in every direction, each scaled to reach the target.
+        directions = self.batch_rng.standard_normal((BATCH, 3))
+        rates = ((directions @ numpy.array(metric)) * directions).sum(axis=1)
+        # (A direction's length doesn't matter, as the rate is worked out for the same direction.)
+        rates[rates <= 0] = numpy.inf
+        distances = target / numpy.sqrt(rates)
+
+        candidates = numpy.clip(numpy.rint(numpy.array(color) + directions * distances[:, None]),
+                                0, 255).astype(numpy.intp)
+        differences = delta_e_batch(lab, to_lab_batch(candidates))
+        # A candidate that rounded back to the correct color can't be used.
+        errors = numpy.abs(differences - target)
+        errors[differences == 0] = numpy.inf
+        best = int(numpy.argmin(errors))
+        if (errors[best] == numpy.inf):
+            return self.closest(color, lab, metric, target)
+        return tuple(int(value) for value in candidates[best])
+
+    def closest(self, color, lab, metric, target):
+        """Find a color close to target ΔE2000 away from color, scoring PYTHON_BATCH candidates one at a time.
+        Used when NumPy isn't installed.
+
+        Args:
+            color (tuple): The correct color, as three integers from 0 to 255.
+            lab (tuple): The correct color in CIELAB.
+            metric (list): How quickly the difference grows in each direction, from local_metric().
+            target (float): The difference wanted.
+
+        Returns:
+            tuple: The incorrect color, as three integers from 0 to 255.
+        """
+        rng = self.rng
+        best, best_error = None, math.inf
+        for _ in range(PYTHON_BATCH):
+            direction = [rng.gauss(0, 1) for _ in range(3)]
+            rate = sum(direction[i] * metric[i][j] * direction[j]
+                       for i in range(3) for j in range(3))
+            if (rate <= 0):
+                continue
+            distance = target / math.sqrt(rate)
+            candidate = tuple(min(255, max(0, round(value + step * distance)))
+                              for value, step in zip(color, direction))
+            difference = delta_e(lab, to_lab(candidate))
+            if (difference > 0 and abs(difference - target) < best_error):
+                best, best_error = candidate, abs(difference - target)
+
+        if (best is None):
+            # Every candidate rounded back to the correct color (very unlikely). Fall back to the smallest visible step.
+            best = tuple(value + 1 if value < 255 else value - 1 for value in color)
+        return best
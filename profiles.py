@@ -0,0 +1,357 @@
+# Visage
+# a color game by Conor Eager
+# Player profiles: many players' settings & highscores in one directory, for computers shared by several players
+# (e.g. kiosks). A small index lists the players; each player's data is kept in its own save file, and only read
+# when that player is picked. Every change is made under a file lock, so several copies of the game can share
+# the same profiles safely.
+# This module doesn't use Tk, so profiles can be managed without a display.
+#
+# The directory holds:
+#   index.json           {"format": "visage-profiles", "version": 1, "next": 3, "current": "000002",
+#                         "profiles": {"000001": {"name": "Alice", "created": ..., "played": ...}, ...}}
+#   profile-000001.json  a save file, in the usual format (see storage.py)
+#   .lock                locked while anything is being changed
+
+# IMPORTS
+# Import json for the index
+import json
+
+# Import os for finding & deleting files
+import os
+
+# Import threading for locking between threads, as well as processes
+import threading
+
+# Import time for when profiles were created & last played
+import time
+
+# Import fcntl (on Unix) or msvcrt (on Windows) for locking files
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# Import the storage module for reading & writing save files
+import storage
+
+# CONSTANTS
+
+# The name saved in the index, so other JSON files aren't mistaken for it.
+FORMAT_NAME = "visage-profiles"
+
+# The current version of the index format.
+VERSION = 1
+
+# The longest name a player can have.
+MAX_NAME = 24
+
+# CLASSES
+
+
+class ProfileError(ValueError):
+    """Raised when a profile can't be created, renamed or found, or the index can't be understood.
+    """
+    pass
+
+
+class FileLock:
+    """A lock shared by every process (and thread) using the same lock file. Use it with "with".
+    """
+
+    def __init__(self, location):
+        """Create a lock. It isn't taken until the "with" block starts.
+
+        Args:
+            location (str): The path of the lock file. It's created if it doesn't exist.
+        """
+        self.location = location
+        self.file = None
+        # File locks are shared by every thread in a process, so threads take this lock first.
+        self.thread_lock = threading.Lock()
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.file = open(self.location, "a+b")
+        except BaseException:
+            self.thread_lock.release()
+            raise
+        try:
+            if (fcntl is not None):
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                # msvcrt locks a range of bytes, and gives up after 10 tries, so keep trying until it's free.
+                self.file.seek(0)
+                while (True):
+                    try:
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+        except BaseException:
+            self.file.close()
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exception):
+        try:
+            if (fcntl is not None):
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+            self.thread_lock.release()
+
+
+class ProfileStore:
+    """This class manages a directory of player profiles.
+    The index is kept in memory, and only read again when the file changes (e.g. another copy of the game added
+    a player), so listing and switching players doesn't touch the disk beyond checking the index is up to date.
+    """
+
+    def __init__(self, directory):
+        """Open a profile directory, creating it if needed.
+
+        Args:
+            directory (str): The path of the directory.
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.index_location = os.path.join(directory, "index.json")
+        self.lock = FileLock(os.path.join(directory, ".lock"))
+        # The index as last read, and the (modification time, size) of the file it was read from.
+        self.cached = None
+        self.cached_stat = None
+
+    def location(self, profile):
+        """Get the location of a profile's save file.
+
+        Args:
+            profile (str): The profile's ID.
+
+        Returns:
+            str: The path of the save file.
+        """
+        return os.path.join(self.directory, f"profile-{profile}.json")
+
+    def index(self):
+        """Get the index, reading it again only if the file has changed.
+
+        Raises:
+            ProfileError: If the index isn't valid.
+
+        Returns:
+            dict: The index.
+        """
+        try:
+            stat = os.stat(self.index_location)
+        except FileNotFoundError:
+            return {"format": FORMAT_NAME, "version": VERSION, "next": 1, "current": None, "profiles": {}}
+        if ((stat.st_mtime_ns, stat.st_size) != self.cached_stat):
+            with open(self.index_location, "rb") as file:
+                try:
+                    index = json.loads(file.read().decode("utf-8"))
+                except ValueError as e:
+                    raise ProfileError(f"Profile index is not valid JSON: {e}")
+            if (not isinstance(index, dict) or index.get("format") != FORMAT_NAME
+                    or not isinstance(index.get("profiles"), dict)):
+                raise ProfileError("File is not a Visage profile index.")
+            if (index.get("version") != VERSION):
+                raise ProfileError(
+                    f"Profile index is format {index.get('version')}, but this version of Visage reads format {VERSION}.")
+            self.cached = index
+            self.cached_stat = (stat.st_mtime_ns, stat.st_size)
+        return self.cached
+
+    def change(self, function):
+        """Change the index, under the lock, so changes made by other processes at the same time aren't lost.
+
+        Args:
+            function (function): Called with a copy of the latest index, to change it. Its result is returned.
+
+        Returns:
+            The result of the function.
+        """
+        with self.lock:
+            index = json.loads(json.dumps(self.index()))
+            result = function(index)
+            storage.write_atomic(self.index_location, json.dumps(
+                index, separators=(",", ":")).encode("utf-8"))
+            # Keep the new index, so it isn't read straight back.
+            stat = os.stat(self.index_location)
+            self.cached = index
+            self.cached_stat = (stat.st_mtime_ns, stat.st_size)
+        return result
+
+    def profiles(self):
+        """List the players, in alphabetical order.
+
+        Returns:
+            list: The (ID, name) of each profile.
+        """
+        profiles = self.index()["profiles"]
+        return sorted(((profile, details["name"]) for profile, details in profiles.items()),
+                      key=lambda item: item[1].casefold())
+
+    def name(self, profile):
+        """Get a player's name.
+
+        Args:
+            profile (str): The profile's ID.
+
+        Returns:
+            str: The name, or None if there's no such profile.
+        """
+        details = self.index()["profiles"].get(profile)
+        return details["name"] if details is not None else None
+
+    def current(self):
+        """Get the player who was picked most recently (by any copy of the game).
+
+        Returns:
+            str: The profile's ID, or None if there are no profiles.
+        """
+        index = self.index()
+        if (index["current"] in index["profiles"]):
+            return index["current"]
+        return next(iter(index["profiles"]), None)
+
+    def check_name(self, index, name, profile=None):
+        """Check a name is valid, and not already used by another player.
+
+        Raises:
+            ProfileError: If the name isn't allowed.
+
+        Returns:
+            str: The name, without spaces around it.
+        """
+        name = name.strip() if isinstance(name, str) else ""
+        if (not name):
+            raise ProfileError("Enter a name.")
+        if (len(name) > MAX_NAME):
+            raise ProfileError(f"Names can be up to {MAX_NAME} letters long.")
+        for other, details in index["profiles"].items():
+            if (other != profile and details["name"].casefold() == name.casefold()):
+                raise ProfileError(f"There is already a player called {details['name']}.")
+        return name
+
+    def create(self, name, fields=None):
+        """Add a player.
+
+        Args:
+            name (str): The player's name.
+            fields (dict, optional): The player's save data to start with. Defaults to the default settings.
+
+        Raises:
+            ProfileError: If the name isn't allowed.
+
+        Returns:
+            str: The new profile's ID.
+        """
+        def add(index):
+            checked = self.check_name(index, name)
+            profile = f"{index['next']:06d}"
+            index["next"] += 1
+            index["profiles"][profile] = {
+                "name": checked, "created": time.time(), "played": None}
+            if (fields is not None):
+                storage.save(self.location(profile), fields)
+            return profile
+        return self.change(add)
+
+    def rename(self, profile, name):
+        """Rename a player.
+
+        Raises:
+            ProfileError: If the name isn't allowed, or there's no such profile.
+        """
+        def rename(index):
+            self.find(index, profile)["name"] = self.check_name(
+                index, name, profile)
+        self.change(rename)
+
+    def delete(self, profile):
+        """Delete a player, and their save file.
+
+        Raises:
+            ProfileError: If there's no such profile.
+        """
+        def delete(index):
+            self.find(index, profile)
+            del index["profiles"][profile]
+            try:
+                os.remove(self.location(profile))
+            except FileNotFoundError:
+                pass
+        self.change(delete)
+
+    def select(self, profile):
+        """Pick a player, so they're the one picked when the game next starts.
+
+        Raises:
+            ProfileError: If there's no such profile.
+        """
+        def select(index):
+            self.find(index, profile)["played"] = time.time()
+            index["current"] = profile
+        self.change(select)
+
+    def find(self, index, profile):
+        """Find a profile in the index.
+
+        Raises:
+            ProfileError: If there's no such profile.
+
+        Returns:
+            dict: The profile's details.
+        """
+        details = index["profiles"].get(profile)
+        if (details is None):
+            raise ProfileError("That player has been deleted.")
+        return details
+
+    def load(self, profile):
+        """Read a player's save data.
+
+        Args:
+            profile (str): The profile's ID.
+
+        Raises:
+            storage.SaveFormatError: If the save file isn't valid.
+
+        Returns:
+            dict: The save data. Players who haven't saved anything yet get the default settings.
+        """
+        try:
+            return storage.load(self.location(profile))
+        except FileNotFoundError:
+            return storage.validate({})
+
+    def save(self, location, fields):
+        """Write a player's save file, under the lock. If another copy of the game saved a higher score for
+        the same player in the meantime, it's kept rather than overwritten.
+        Resetting the highscore counts up "resets", so a reset isn't undone by the higher score from before it:
+        whichever save has been reset more times keeps its own highscore.
+        This has the same arguments as storage.save(), so it can be given to a storage.SaveWriter.
+
+        Args:
+            location (str): The path of the save file (see location()).
+            fields (dict): The save data.
+        """
+        with self.lock:
+            try:
+                existing = storage.load(location)
+            except (FileNotFoundError, storage.SaveFormatError):
+                existing = None
+            if (existing is not None):
+                if (existing["resets"] > fields["resets"]):
+                    # Reset by another copy of the game since this one loaded the data.
+                    fields = dict(fields, highscore=existing["highscore"], resets=existing["resets"])
+                elif (existing["resets"] == fields["resets"] and existing["highscore"] > fields["highscore"]):
+                    fields = dict(fields, highscore=existing["highscore"])
+            storage.save(location, fields)
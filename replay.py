@@ -0,0 +1,347 @@
+# Visage
+# a color game by Conor Eager
+# Session recording & replay: every game is logged with its random seed, its settings and every click,
+# so it can be played again exactly, e.g. to reproduce a slow level or check a change didn't alter the puzzles.
+# This module doesn't use Tk, so logs can be replayed without a display.
+#
+# Usage:
+#   python replay.py FILE [--no-check]
+#
+# Replays the log as fast as possible, checking that every puzzle comes out the same as when it was played,
+# and reports how long each puzzle took to generate. Exits with status 1 if any puzzle was different.
+# (To replay with the window, at the original pace, use: python game.py --replay FILE)
+#
+# A session log is one line of JSON, followed by a fixed-size record for each click:
+#   {"format": "visage-session", "version": 1, "seed": ..., "settings": {...}, "started": ...}\n
+#   record: time (ms since the game started), row, column (2 bytes each), puzzle fingerprint (4 bytes)
+
+# IMPORTS
+# Import argparse for the command-line interface
+import argparse
+
+# Import collections for the Click & Result classes
+import collections
+
+# Import json for the log header
+import json
+
+# Import os for finding & pruning logs
+import os
+
+# Import random for the seeded random number generator
+import random
+
+# Import struct for packing click records
+import struct
+
+# Import sys for the exit status
+import sys
+
+# Import time for timing the replay
+import time
+
+# Import zlib for puzzle fingerprints
+import zlib
+
+# Import the engine, deck and metrics modules to play the game again
+import deck
+import engine
+import metrics
+
+# CONSTANTS
+
+# The name saved in every log, so other files aren't mistaken for session logs.
+FORMAT_NAME = "visage-session"
+
+# The current version of the log format.
+VERSION = 1
+
+# A click: time (ms since the game started), row, column, fingerprint of the puzzle that was clicked.
+CLICK = struct.Struct("<IHHI")
+
+# The file extension for session logs.
+EXTENSION = ".vsession"
+
+# How many session logs to keep. Older ones are deleted as new ones are saved.
+KEEP = 50
+
+# CLASSES
+
+
+class SessionFormatError(ValueError):
+    """Raised when a file isn't a valid session log.
+    """
+    pass
+
+
+class Click(collections.namedtuple("Click", ["time", "row", "col", "fingerprint"])):
+    """A single click in a session.
+
+    Attributes:
+        time (int): When the click happened, in milliseconds since the game started.
+        row (int): The row of the clicked cell.
+        col (int): The column of the clicked cell.
+        fingerprint (int): The fingerprint of the puzzle that was clicked (see fingerprint()).
+    """
+    __slots__ = ()
+
+
+class Result(collections.namedtuple("Result", ["clicks", "level", "score", "mismatches", "generate_times", "elapsed"])):
+    """The result of replaying a session.
+
+    Attributes:
+        clicks (int): The number of clicks replayed.
+        level (int): The level reached.
+        score (float): The score reached.
+        mismatches (list): The numbers of the clicks whose puzzle came out differently.
+        generate_times (list): How long each click took to process (including generating the next puzzle), in ns.
+        elapsed (int): How long the whole replay took, in nanoseconds.
+    """
+    __slots__ = ()
+
+
+class Session:
+    """This class holds the log for one game: what it needs to be played again, and every click made.
+    """
+
+    def __init__(self, seed, settings, clicks=None, started=None):
+        """Create a session log.
+
+        Args:
+            seed (int): The seed for the game's random number generator.
+            settings (dict): The settings the game was played with. "difficulty", "color_model", "adaptive"
+            and "deck" (the path of the puzzle deck, or None) are needed to replay it; the rest are kept for reference.
+            clicks (list, optional): The clicks so far, as Clicks. Defaults to none.
+            started (float, optional): When the game started, as a Unix timestamp. Defaults to now.
+        """
+        self.seed = seed
+        self.settings = dict(settings)
+        self.clicks = list(clicks) if clicks is not None else list()
+        self.started = started if started is not None else time.time()
+
+    def generator(self, puzzle_deck=None):
+        """Create the puzzle generator for the session, set up exactly as it was when the game started.
+
+        Args:
+            puzzle_deck (deck.Deck, optional): The deck to use, if the game was played from one and it's already open.
+            Defaults to None (open it if needed).
+
+        Returns:
+            The puzzle generator.
+        """
+        if (self.settings.get("deck")):
+            return deck.DeckGenerator(puzzle_deck if puzzle_deck is not None else deck.Deck(self.settings["deck"]))
+        return engine.puzzle_generator(self.settings["color_model"], random.Random(self.seed),
+                                       self.settings.get("adaptive", False))
+
+    def new_game(self, puzzle_deck=None, clock=time.perf_counter):
+        """Start the game the session records, from the beginning.
+
+        Args:
+            puzzle_deck (deck.Deck, optional): The deck to use, if the game was played from one and it's already open.
+            Defaults to None.
+            clock (function, optional): The clock for the game state. Defaults to time.perf_counter.
+
+        Returns:
+            engine.GameState: The new game.
+        """
+        return engine.GameState(self.settings["difficulty"], self.generator(puzzle_deck), clock=clock)
+
+    def record(self, ms, row, col, puzzle):
+        """Record a click.
+
+        Args:
+            ms (int): When the click happened, in milliseconds since the game started.
+            row (int): The row of the clicked cell.
+            col (int): The column of the clicked cell.
+            puzzle (colors.Puzzle): The puzzle that was clicked.
+        """
+        self.clicks.append(Click(ms, row, col, fingerprint(puzzle)))
+
+    def encode(self):
+        """Turn the session into the contents of a log file.
+
+        Returns:
+            bytes: The contents of the log file.
+        """
+        header = {"format": FORMAT_NAME, "version": VERSION, "seed": self.seed,
+                  "settings": self.settings, "started": self.started}
+        records = b"".join(CLICK.pack(*click) for click in self.clicks)
+        return json.dumps(header, separators=(",", ":")).encode("utf-8") + b"\n" + records
+
+    @staticmethod
+    def decode(raw):
+        """Read the contents of a log file.
+
+        Args:
+            raw (bytes): The contents of the log file.
+
+        Raises:
+            SessionFormatError: If the file isn't a valid session log.
+
+        Returns:
+            Session: The session.
+        """
+        line, newline, records = raw.partition(b"\n")
+        try:
+            header = json.loads(line.decode("utf-8"))
+        except ValueError as e:
+            raise SessionFormatError(f"Session log header is not valid JSON: {e}")
+        if (not newline or not isinstance(header, dict) or header.get("format") != FORMAT_NAME):
+            raise SessionFormatError("File is not a Visage session log.")
+        if (header.get("version") != VERSION):
+            raise SessionFormatError(
+                f"Session log is format {header.get('version')}, but this version of Visage reads format {VERSION}.")
+        if (len(records) % CLICK.size != 0):
+            raise SessionFormatError("Session log is incomplete.")
+        try:
+            return Session(header["seed"], header["settings"],
+                           [Click(*click) for click in CLICK.iter_unpack(records)], header["started"])
+        except KeyError as e:
+            raise SessionFormatError(f"Session log is missing {e}.")
+
+    def save(self, location):
+        """Save the session to a log file.
+
+        Args:
+            location (str): The path of the log file.
+        """
+        with open(location, "wb") as file:
+            file.write(self.encode())
+
+    @staticmethod
+    def load(location):
+        """Load a session from a log file.
+
+        Args:
+            location (str): The path of the log file.
+
+        Returns:
+            Session: The session.
+        """
+        with open(location, "rb") as file:
+            return Session.decode(file.read())
+
+# FUNCTIONS
+
+
+def fingerprint(puzzle):
+    """Work out a fingerprint for a puzzle, so puzzles can be checked against a log without storing them whole.
+
+    Args:
+        puzzle (colors.Puzzle): The puzzle.
+
+    Returns:
+        int: The fingerprint (a CRC-32 of the puzzle, packed the same way as in a deck).
+    """
+    return zlib.crc32(deck.RECORD.pack(*puzzle.color, *puzzle.different_color, puzzle.row, puzzle.col, puzzle.level))
+
+
+def log_name(session):
+    """Name a log file for a session, so logs sort in the order they were played.
+
+    Args:
+        session (Session): The session.
+
+    Returns:
+        str: The file name.
+    """
+    return time.strftime("%Y%m%d-%H%M%S", time.localtime(session.started)) + f"-{session.seed:016x}{EXTENSION}"
+
+
+def prune(directory, keep=KEEP):
+    """Delete all but the newest session logs in a directory.
+
+    Args:
+        directory (str): The directory the logs are kept in.
+        keep (int, optional): The number of logs to keep. Defaults to KEEP.
+    """
+    logs = sorted(name for name in os.listdir(directory)
+                  if name.endswith(EXTENSION))
+    for name in logs[:-keep]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def store(session, directory, keep=KEEP):
+    """Save a session log into a directory (creating it if needed), and delete all but the newest logs there.
+
+    Args:
+        session (Session): The session to save.
+        directory (str): The directory the logs are kept in.
+        keep (int, optional): The number of logs to keep. Defaults to KEEP.
+
+    Returns:
+        str: The path of the new log.
+    """
+    os.makedirs(directory, exist_ok=True)
+    location = os.path.join(directory, log_name(session))
+    session.save(location)
+    prune(directory, keep)
+    return location
+
+
+def replay(session, check=True):
+    """Replay a session as fast as possible, without a display.
+    The game's clock is driven by the click times in the log, so the level times come out as they were played.
+
+    Args:
+        session (Session): The session to replay.
+        check (bool, optional): Check that every clicked puzzle comes out the same as in the log. Defaults to True.
+
+    Returns:
+        Result: What happened.
+    """
+    now = [0.0]
+    start = time.perf_counter_ns()
+    state = session.new_game(clock=lambda: now[0])
+    mismatches = list()
+    generate_times = list()
+
+    for number, click in enumerate(session.clicks):
+        if (state.over):
+            break
+        if (check and fingerprint(state.puzzle) != click.fingerprint):
+            mismatches.append(number)
+        now[0] = click.time / 1000
+        click_start = time.perf_counter_ns()
+        state.click(click.row, click.col)
+        generate_times.append(time.perf_counter_ns() - click_start)
+
+    return Result(len(generate_times), state.level, state.score, mismatches, generate_times,
+                  time.perf_counter_ns() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay a Visage session log as fast as possible.")
+    parser.add_argument("file", help="the session log to replay")
+    parser.add_argument("--no-check", action="store_true",
+                        help="don't check that every puzzle comes out the same")
+    args = parser.parse_args(argv)
+
+    session = Session.load(args.file)
+    result = replay(session, not args.no_check)
+
+    played = session.clicks[-1].time / 1000 if session.clicks else 0
+    print(f"Replayed {result.clicks} clicks in {result.elapsed / 1e6:.1f} ms "
+          f"(played in {played:.1f} s): level {result.level}, score {result.score}.")
+    if (result.generate_times):
+        p50, p95, p99 = metrics.percentiles(result.generate_times)
+        print(f"Click & generate: p50 {p50 / 1e3:.1f} us, p95 {p95 / 1e3:.1f} us, p99 {p99 / 1e3:.1f} us, "
+              f"slowest {max(result.generate_times) / 1e3:.1f} us "
+              f"(click {result.generate_times.index(max(result.generate_times))}).")
+    if (result.mismatches):
+        print(f"MISMATCH: {len(result.mismatches)} puzzles came out differently, "
+              f"starting at click {result.mismatches[0]}.")
+        return 1
+    if (not args.no_check):
+        print("Every puzzle came out the same.")
+    return 0
+
+
+# RUNNING
+if __name__ == "__main__":
+    sys.exit(main())
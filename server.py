@@ -0,0 +1,428 @@
+# Visage
+# a color game by Conor Eager
+# A headless game server: hosts many games at once from a single process, using the game engine's rules
+# (levels, lives, scoring and checking clicks), for front ends that don't run the game themselves.
+# This module doesn't use Tk, so it can be run without a display.
+#
+# Usage:
+#   python server.py serve [--host 127.0.0.1] [--port 7750] [--unix PATH] [--model classic]
+#   python server.py load [--host 127.0.0.1] [--port 7750] [--unix PATH] [--sessions 10000]
+#                         [--connections 100] [--rounds 20] [--seed 0]
+#
+# The protocol is JSON lines: each request is one JSON object on a line, and the server answers each one,
+# in order, with one JSON object on a line. Requests can be sent without waiting for the answers.
+# Every request has an "op", and may have an "id", which is copied into the answer.
+#   {"op": "new", "difficulty": 1.0, "model": "classic", "seed": 1}  -> {"ok": true, "session": 1, "puzzle": {...}, ...}
+#   {"op": "click", "session": 1, "row": 0, "col": 2}                -> {"ok": true, "correct": false, ...}
+#   {"op": "state", "session": 1}, {"op": "end", "session": 1}, {"op": "stats"}
+# "difficulty", "model" and "seed" are optional. Puzzles are sent as {"level", "color", "different_color", "row", "col"},
+# which is everything a front end needs to draw the grid: every cell is "color", except the one at "row" & "col".
+# After a miss, the cell that was missed is sent as "answer".
+# Games belong to the connection that started them, and are ended when it closes, or when the game is over.
+# Errors are answered with {"ok": false, "error": "..."}, and the connection carries on.
+
+# IMPORTS
+# Import argparse for the command-line interface
+import argparse
+
+# Import asyncio for serving many connections from one thread
+import asyncio
+
+# Import json for the protocol
+import json
+
+# Import random for each game's random number generator, and the load test's clicks
+import random
+
+# Import sys for the exit status
+import sys
+
+# Import traceback for logging requests that fail unexpectedly
+import traceback
+
+# Import time for timing the load test
+import time
+
+# Import the engine to play the games, storage for the list of color models,
+# and metrics for the load test's percentiles
+import engine
+import metrics
+import storage
+
+# CONSTANTS
+
+# The default port.
+PORT = 7750
+
+# The most games the server will host at once, across every connection.
+MAX_SESSIONS = 100_000
+
+# The longest request line accepted, in bytes.
+MAX_LINE = 4096
+
+# How much can be waiting to be sent on a connection before the server stops reading from it, in bytes.
+# This stops a client that sends requests without reading the answers from filling up the server's memory.
+HIGH_WATER = 256 * 1024
+
+# How often the load test clicks the different cell (the rest of its clicks are on random cells),
+# so its games go up the levels like a player's.
+LOAD_ACCURACY = 0.8
+
+# CLASSES
+
+
+class ProtocolError(ValueError):
+    """Raised when a request can't be carried out. The message is sent back to the client.
+    """
+    pass
+
+
+class Server:
+    """This class hosts the games. Each request is handled straight away, in full, as the rules are quick to
+    apply, so the server never has to wait on anything but the network.
+    """
+
+    def __init__(self, color_model="classic"):
+        """Create a server.
+
+        Args:
+            color_model (str, optional): The color model for games that don't ask for one. Defaults to "classic".
+        """
+        self.color_model = color_model
+        # The number of games being played, across every connection.
+        self.open_sessions = 0
+        self.connections = 0
+        self.requests = 0
+        # The last session number given out. Numbers are never reused while the server runs.
+        self.last_session = 0
+        self.operations = {"new": self.new, "click": self.click, "state": self.state,
+                           "end": self.end, "stats": self.stats}
+
+    async def handle(self, reader, writer):
+        """Serve one connection, until it is closed.
+
+        Args:
+            reader (asyncio.StreamReader): The connection's incoming stream.
+            writer (asyncio.StreamWriter): The connection's outgoing stream.
+        """
+        # The connection's games, by session number.
+        sessions = dict()
+        self.connections += 1
+        try:
+            while (True):
+                try:
+                    line = await reader.readuntil(b"\n")
+                except asyncio.IncompleteReadError:
+                    # The client closed the connection.
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(b'{"ok":false,"error":"Request is too long."}\n')
+                    break
+                writer.write(self.respond(line, sessions))
+                if (writer.transport.get_write_buffer_size() > HIGH_WATER):
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.open_sessions -= len(sessions)
+            self.connections -= 1
+            writer.close()
+
+    def respond(self, line, sessions):
+        """Carry out one request.
+
+        Args:
+            line (bytes): The request, as a line of JSON.
+            sessions (dict): The connection's games, by session number.
+
+        Returns:
+            bytes: The answer, as a line of JSON.
+        """
+        self.requests += 1
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except (ValueError, RecursionError):
+                # (Very deeply nested JSON is too deep to decode.)
+                raise ProtocolError("Request is not valid JSON.")
+            if (not isinstance(request, dict)):
+                raise ProtocolError("Request is not a JSON object.")
+            request_id = request.get("id")
+            op = request.get("op")
+            operation = self.operations.get(op) if isinstance(op, str) else None
+            if (operation is None):
+                raise ProtocolError(
+                    f"Unknown op {request.get('op')!r}; expected one of {', '.join(self.operations)}.")
+            answer = operation(request, sessions)
+            answer["ok"] = True
+        except ProtocolError as e:
+            answer = {"ok": False, "error": str(e)}
+        except Exception:
+            # A bug shouldn't end the connection, and every game on it, so it's answered like any other error.
+            traceback.print_exc()
+            answer = {"ok": False, "error": "The server failed to carry out the request."}
+        if (request_id is not None):
+            answer["id"] = request_id
+        return json.dumps(answer, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    def new(self, request, sessions):
+        """Start a new game.
+        """
+        difficulty = request.get("difficulty", 1.0)
+        if (isinstance(difficulty, bool) or not isinstance(difficulty, (int, float)) or not 0.2 <= difficulty <= 5.0):
+            raise ProtocolError("'difficulty' must be a number between 0.2 and 5.0.")
+        color_model = request.get("model", self.color_model)
+        if (color_model not in storage.COLOR_MODELS):
+            raise ProtocolError(
+                f"'model' must be one of {', '.join(storage.COLOR_MODELS)}.")
+        seed = request.get("seed")
+        if (seed is not None and (isinstance(seed, bool) or not isinstance(seed, int))):
+            raise ProtocolError("'seed' must be a whole number.")
+        if (self.open_sessions >= MAX_SESSIONS):
+            raise ProtocolError("The server is full.")
+
+        state = engine.GameState(float(difficulty), engine.puzzle_generator(
+            color_model, random.Random(seed)))
+        self.last_session += 1
+        number = self.last_session
+        sessions[number] = state
+        self.open_sessions += 1
+        return {"session": number, **describe(state)}
+
+    def click(self, request, sessions):
+        """Click a cell in a game. If that was the last life, the game is over, and ended.
+        """
+        number, state = self.find(request, sessions)
+        row = request.get("row")
+        col = request.get("col")
+        if (isinstance(row, bool) or isinstance(col, bool) or not isinstance(row, int) or not isinstance(col, int)):
+            raise ProtocolError("'row' and 'col' must be whole numbers.")
+        puzzle = state.puzzle
+        if (not (0 <= row < puzzle.level and 0 <= col < puzzle.level)):
+            raise ProtocolError(
+                f"The cell is outside the {puzzle.level}x{puzzle.level} grid.")
+
+        correct = state.click(row, col)
+        answer = {"correct": correct, **describe(state)}
+        if (not correct):
+            # Point out the cell that was missed.
+            answer["answer"] = {"row": puzzle.row, "col": puzzle.col}
+        if (state.over):
+            del sessions[number]
+            self.open_sessions -= 1
+        return answer
+
+    def state(self, request, sessions):
+        """Describe a game.
+        """
+        number, state = self.find(request, sessions)
+        return describe(state)
+
+    def end(self, request, sessions):
+        """End a game early.
+        """
+        number, state = self.find(request, sessions)
+        state.finish()
+        del sessions[number]
+        self.open_sessions -= 1
+        return describe(state)
+
+    def stats(self, request, sessions):
+        """Describe the server.
+        """
+        return {"sessions": self.open_sessions, "connections": self.connections, "requests": self.requests}
+
+    def find(self, request, sessions):
+        """Find the game a request is for.
+
+        Raises:
+            ProtocolError: If the connection has no such game.
+
+        Returns:
+            tuple: The session number, and the game's engine.GameState.
+        """
+        number = request.get("session")
+        if (isinstance(number, bool) or not isinstance(number, int) or number not in sessions):
+            raise ProtocolError(f"No game {number!r} on this connection.")
+        return number, sessions[number]
+
+# FUNCTIONS
+
+
+def describe(state):
+    """Describe a game for a client.
+
+    Args:
+        state (engine.GameState): The game.
+
+    Returns:
+        dict: The level, lives & score, whether the game is over, and the puzzle to draw (unless it is).
+    """
+    description = {"level": state.level, "lives": state.lives,
+                   "score": state.score, "over": state.over}
+    if (state.over):
+        description["duration"] = state.duration
+    else:
+        puzzle = state.puzzle
+        description["puzzle"] = {"level": puzzle.level, "color": puzzle.color_str,
+                                 "different_color": puzzle.different_color_str, "row": puzzle.row, "col": puzzle.col}
+    return description
+
+
+async def serve(host="127.0.0.1", port=PORT, unix=None, color_model="classic"):
+    """Run the server until it's interrupted.
+
+    Args:
+        host (str, optional): The address to listen on. Defaults to "127.0.0.1".
+        port (int, optional): The port to listen on. Defaults to PORT.
+        unix (str, optional): The path of a Unix socket to listen on, instead of TCP. Defaults to None.
+        color_model (str, optional): The color model for games that don't ask for one. Defaults to "classic".
+    """
+    server = Server(color_model)
+    if (unix):
+        listener = await asyncio.start_unix_server(server.handle, unix, limit=MAX_LINE)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port, limit=MAX_LINE)
+    print(f"Serving Visage games on {unix or f'{host}:{port}'}.")
+    async with listener:
+        await listener.serve_forever()
+
+
+async def connect(host, port, unix):
+    """Open a connection to a server.
+
+    Returns:
+        tuple: The connection's (reader, writer).
+    """
+    if (unix):
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+
+async def load_connection(host, port, unix, sessions, rounds, rng, latencies):
+    """Play games on one connection, for the load test. Every game is started, then each round
+    clicks a cell in every game at once (restarting any that end), without waiting for the answers
+    before sending the next request. Most clicks are on the different cell (see LOAD_ACCURACY).
+
+    Args:
+        sessions (int): The number of games to keep open on the connection.
+        rounds (int): The number of clicks to make in each game.
+        rng (random.Random): The random number generator for the clicks.
+        latencies (list): Each request's time from being sent to being answered, in nanoseconds, is added to this.
+
+    Returns:
+        int: The number of errors.
+    """
+    reader, writer = await connect(host, port, unix)
+    errors = 0
+
+    async def exchange(requests):
+        # Send a batch of requests, then read every answer, timing each one.
+        nonlocal errors
+        sent = time.perf_counter_ns()
+        writer.write(b"".join(json.dumps(request).encode(
+            "utf-8") + b"\n" for request in requests))
+        answers = list()
+        for _ in requests:
+            answer = json.loads(await reader.readline())
+            latencies.append(time.perf_counter_ns() - sent)
+            if (not answer["ok"]):
+                errors += 1
+            answers.append(answer)
+        return answers
+
+    def click(number, puzzle):
+        # Click the different cell, or sometimes a random one.
+        if (rng.random() < LOAD_ACCURACY):
+            row, col = puzzle["row"], puzzle["col"]
+        else:
+            row, col = rng.randrange(puzzle["level"]), rng.randrange(puzzle["level"])
+        return {"op": "click", "session": number, "row": row, "col": col}
+
+    # Each game's session number and puzzle. (A game that failed to start clicks on a made-up puzzle, and fails.)
+    unknown = {"level": 3, "row": 0, "col": 0}
+    answers = await exchange([{"op": "new"}] * sessions)
+    games = [answer.get("session") for answer in answers]
+    puzzles = [answer.get("puzzle", unknown) for answer in answers]
+    for _ in range(rounds):
+        answers = await exchange([click(number, puzzle) for number, puzzle in zip(games, puzzles)])
+        over = [i for i, answer in enumerate(answers) if answer.get("over")]
+        puzzles = [answer.get("puzzle", unknown) for answer in answers]
+        if (over):
+            # Start new games in place of the ones that ended, so the number open stays the same.
+            restarted = await exchange([{"op": "new"}] * len(over))
+            for i, answer in zip(over, restarted):
+                games[i] = answer.get("session")
+                puzzles[i] = answer.get("puzzle", unknown)
+
+    await exchange([{"op": "end", "session": number} for number in games])
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+
+async def load_test(host="127.0.0.1", port=PORT, unix=None, sessions=10_000, connections=100, rounds=20, seed=0):
+    """Load test a server: keep a number of games open at once, spread over a number of connections,
+    and click in all of them as fast as the server answers.
+
+    Returns:
+        dict: The number of requests, errors, the time taken (s), requests per second, and the p50/p95/p99
+        time for a request to be answered (ms), including the time spent behind the others in its batch.
+    """
+    latencies = list()
+    start = time.perf_counter()
+    per_connection = [sessions // connections + (1 if i < sessions % connections else 0)
+                      for i in range(connections)]
+    errors = await asyncio.gather(*(load_connection(host, port, unix, count, rounds, random.Random(seed * connections + i), latencies)
+                                    for i, count in enumerate(per_connection) if count))
+    elapsed = time.perf_counter() - start
+    p50, p95, p99 = metrics.percentiles(latencies)
+    return {"requests": len(latencies), "errors": sum(errors), "elapsed": elapsed,
+            "rate": len(latencies) / elapsed, "p50": p50 / 1e6, "p95": p95 / 1e6, "p99": p99 / 1e6}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve Visage games over a JSON lines protocol, or load test a server.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="run the server")
+    load_parser = commands.add_parser("load", help="load test a server")
+    for command_parser in (serve_parser, load_parser):
+        command_parser.add_argument("--host", default="127.0.0.1",
+                                    help="address (default 127.0.0.1)")
+        command_parser.add_argument("--port", default=PORT, type=int,
+                                    help=f"port (default {PORT})")
+        command_parser.add_argument("--unix",
+                                    help="path of a Unix socket, to use instead of TCP")
+    serve_parser.add_argument("--model", default="classic", choices=storage.COLOR_MODELS,
+                              help="color model for games that don't ask for one (default classic)")
+    load_parser.add_argument("--sessions", default=10_000, type=int,
+                             help="games to keep open at once (default 10000)")
+    load_parser.add_argument("--connections", default=100, type=int,
+                             help="connections to spread the games over (default 100)")
+    load_parser.add_argument("--rounds", default=20, type=int,
+                             help="clicks to make in each game (default 20)")
+    load_parser.add_argument("--seed", default=0, type=int,
+                             help="seed for the clicks (default 0)")
+    args = parser.parse_args(argv)
+
+    if (args.command == "serve"):
+        try:
+            asyncio.run(serve(args.host, args.port, args.unix, args.model))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    result = asyncio.run(load_test(args.host, args.port, args.unix, args.sessions,
+                                   args.connections, args.rounds, args.seed))
+    print(f"{result['requests']} requests in {result['elapsed']:.1f} s ({result['rate']:.0f}/s), "
+          f"{result['errors']} errors. Answered in p50 {result['p50']:.1f} ms, "
+          f"p95 {result['p95']:.1f} ms, p99 {result['p99']:.1f} ms.")
+    return 1 if result["errors"] else 0
+
+
+# RUNNING
+if __name__ == "__main__":
+    sys.exit(main())
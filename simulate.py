@@ -0,0 +1,302 @@
+# Visage
+# a color game by Conor Eager
+# A simulator for tuning the difficulty: bot players with set color vision play thousands of full games,
+# and the levels they reach are reported for each difficulty, so the lives & color step formulas can be checked
+# against data instead of by hand.
+# This module doesn't use Tk, so it can be run without a display.
+#
+# Usage:
+#   python simulate.py [--games 1000] [--difficulties 5,10,20] [--thresholds 0.5,1,2] [--slope 0.25]
+#                      [--model classic] [--seed 0] [--workers N] [--output simulation.json]
+#
+# Each bot sees the difference between the two colors (in ΔE2000, see perceptual.py). The chance it spots the
+# different cell rises smoothly from none to certain around its threshold; if it doesn't spot it, it clicks
+# a random cell (and may still get lucky). Every game is seeded, so the same options always give the same results.
+
+# IMPORTS
+# Import argparse for the command-line interface
+import argparse
+
+# Import collections for the Bot class
+import collections
+
+# Import concurrent.futures for playing games across several processes
+import concurrent.futures
+
+# Import json for writing the results
+import json
+
+# Import math for the bots' chance of spotting the difference
+import math
+
+# Import random for the bots' choices and the games' seeds
+import random
+
+# Import statistics for summarising the results
+import statistics
+
+# Import sys for the exit status
+import sys
+
+# Import time for timing the simulation
+import time
+
+# Import the engine to play the games, perceptual for measuring color differences,
+# and metrics for percentiles
+import engine
+import metrics
+import perceptual
+
+# CONSTANTS
+
+# How many games each worker process plays at a time.
+CHUNK_GAMES = 50
+
+# Games are stopped at this level, in case a bot never loses (e.g. with a threshold of 0).
+MAX_LEVEL = 2000
+
+# CLASSES
+
+
+class Bot(collections.namedtuple("Bot", ["threshold", "slope"])):
+    """A simulated player.
+
+    Attributes:
+        threshold (float): The difference (ΔE2000) the bot spots half of the time.
+        slope (float): How gradually the chance of spotting a difference rises around the threshold,
+        as a fraction of the threshold (smaller is sharper).
+    """
+    __slots__ = ()
+
+    def chance(self, difference):
+        """Work out the chance of the bot spotting a difference.
+
+        Args:
+            difference (float): The difference between the colors, in ΔE2000.
+
+        Returns:
+            float: The chance, from 0 to 1.
+        """
+        if (self.threshold <= 0):
+            return 1.0
+        # A logistic curve in the log of the difference, so it's the same shape at every threshold.
+        if (difference <= 0):
+            return 0.0
+        # A very sharp curve would overflow far below the threshold, where the chance is 0 anyway.
+        return 1 / (1 + math.exp(min(700.0, -math.log(difference / self.threshold) / self.slope)))
+
+    def choose(self, puzzle, rng):
+        """Choose a cell to click.
+
+        Args:
+            puzzle (colors.Puzzle): The puzzle shown.
+            rng (random.Random): The random number generator to use.
+
+        Returns:
+            tuple: The (row, column) of the cell.
+        """
+        difference = perceptual.delta_e(perceptual.to_lab(
+            puzzle.color), perceptual.to_lab(puzzle.different_color))
+        if (rng.random() < self.chance(difference)):
+            return (puzzle.row, puzzle.col)
+        return (rng.randrange(puzzle.level), rng.randrange(puzzle.level))
+
+# FUNCTIONS
+
+
+def play(bot, difficulty, color_model, seed):
+    """Play one full game with a bot, using the game's own rules (the same as GameWindow.check_color()).
+
+    Args:
+        bot (Bot): The player.
+        difficulty (float): The difficulty setting.
+        color_model (str): The color model ("classic" or "perceptual").
+        seed (int): The seed for the game (and the bot's choices).
+
+    Returns:
+        int: The level reached.
+    """
+    rng = random.Random(seed)
+    # The game's clock doesn't matter here, so don't spend time reading the real one.
+    state = engine.GameState(difficulty, engine.puzzle_generator(
+        color_model, random.Random(rng.getrandbits(64))), clock=lambda: 0.0)
+    while (not state.over and state.level < MAX_LEVEL):
+        state.click(*bot.choose(state.puzzle, rng))
+    return state.level
+
+
+def play_many(bot, difficulty, color_model, seeds):
+    """Play a set of games. This runs in the worker processes.
+
+    Args:
+        bot (Bot): The player.
+        difficulty (float): The difficulty setting.
+        color_model (str): The color model ("classic" or "perceptual").
+        seeds (range): The seeds of the games to play.
+
+    Returns:
+        list: The level reached in each game.
+    """
+    return [play(bot, difficulty, color_model, seed) for seed in seeds]
+
+
+def simulate(bots, difficulties, games, color_model="classic", seed=0, workers=None):
+    """Play games for every bot at every difficulty, across a pool of processes.
+
+    Args:
+        bots (list): The players, as Bots.
+        difficulties (list): The difficulty settings.
+        games (int): The number of games for each bot at each difficulty.
+        color_model (str, optional): The color model ("classic" or "perceptual"). Defaults to "classic".
+        seed (int, optional): The seed. The same options and seed always give the same results. Defaults to 0.
+        workers (int, optional): The number of processes to use. Defaults to one per CPU.
+
+    Returns:
+        dict: The level reached in each game, by (bot, difficulty).
+    """
+    tasks = list()
+    for bot_number, bot in enumerate(bots):
+        for difficulty in difficulties:
+            # Each bot gets its own seeds, but plays the same ones at every difficulty.
+            first = seed * 1_000_000_007 + bot_number * games
+            for start in range(0, games, CHUNK_GAMES):
+                tasks.append((bot, difficulty, range(first + start, first + min(start + CHUNK_GAMES, games))))
+
+    results = {(bot, difficulty): list()
+               for bot in bots for difficulty in difficulties}
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [(pool.submit(play_many, bot, difficulty, color_model, seeds), (bot, difficulty))
+                   for bot, difficulty, seeds in tasks]
+        # Collect them in the order they were submitted, so the results are always in the same order.
+        for future, key in futures:
+            results[key].extend(future.result())
+    return results
+
+
+def summarise(levels):
+    """Summarise the levels reached in a set of games.
+
+    Args:
+        levels (list): The level reached in each game.
+
+    Returns:
+        dict: The number of games, mean, standard deviation, 10th/50th/90th percentiles, best,
+        and the number of games that reached each level.
+    """
+    p10, p50, p90 = metrics.percentiles(levels, (10, 50, 90))
+    counts = collections.Counter(levels)
+    return {"games": len(levels), "mean": statistics.fmean(levels),
+            "stdev": statistics.pstdev(levels), "p10": p10, "p50": p50, "p90": p90, "max": max(levels),
+            "levels": {str(level): counts[level] for level in sorted(counts)}}
+
+
+def histogram(summary, bins=20, width=40):
+    """Draw the distribution of levels reached as text, grouping levels into at most a set number of bins.
+
+    Args:
+        summary (dict): A summary from summarise().
+        bins (int, optional): The most lines to draw. Defaults to 20.
+        width (int, optional): The length of the longest bar. Defaults to 40.
+
+    Returns:
+        str: The histogram.
+    """
+    levels = {int(level): count for level, count in summary["levels"].items()}
+    lowest, highest = min(levels), max(levels)
+    size = max(1, -(-(highest - lowest + 1) // bins))
+    counts = collections.Counter()
+    for level, count in levels.items():
+        counts[lowest + (level - lowest) // size * size] += count
+    most = max(counts.values())
+
+    lines = list()
+    for start in range(lowest, highest + 1, size):
+        label = f"{start}" if size == 1 else f"{start}-{start + size - 1}"
+        bar = "#" * round(counts[start] / most * width)
+        lines.append(f"  L{label:<10}{bar:<{width}} {counts[start]}")
+    return "\n".join(lines)
+
+
+def parse_list(text, kind=float):
+    """Parse a comma-separated list, e.g. "5,10,20".
+    """
+    return [kind(value) for value in text.split(",") if value]
+
+
+def parse_slope(text):
+    """Parse a bot's slope, which must be more than 0.
+    """
+    slope = float(text)
+    if (not slope > 0 or math.isinf(slope)):
+        raise argparse.ArgumentTypeError("slope must be a number more than 0")
+    return slope
+
+
+def parse_games(text):
+    """Parse the number of games, which must be at least 1.
+    """
+    games = int(text)
+    if (games < 1):
+        raise argparse.ArgumentTypeError("games must be at least 1")
+    return games
+
+
+def parse_difficulties(text):
+    """Parse a comma-separated list of difficulties, each in the settings' range (2-50).
+    """
+    difficulties = parse_list(text)
+    if (not difficulties or not all(2 <= difficulty <= 50 for difficulty in difficulties)):
+        raise argparse.ArgumentTypeError("difficulties must each be between 2 and 50")
+    return difficulties
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate bot players to calibrate Visage's difficulty.")
+    parser.add_argument("--games", default=1000, type=parse_games,
+                        help="games for each bot at each difficulty (default 1000)")
+    parser.add_argument("--difficulties", default="5,10,20", type=parse_difficulties,
+                        help="difficulties, as in the settings (2-50), comma-separated (default 5,10,20)")
+    parser.add_argument("--thresholds", default="0.5,1,2", type=parse_list,
+                        help="bots' thresholds in ΔE2000, comma-separated (default 0.5,1,2)")
+    parser.add_argument("--slope", default=0.25, type=parse_slope,
+                        help="how gradually the bots' chance of spotting a difference rises (default 0.25)")
+    parser.add_argument("--model", default="classic", choices=("classic", "perceptual"),
+                        help="color model (default classic)")
+    parser.add_argument("--seed", default=0, type=int,
+                        help="seed (default 0)")
+    parser.add_argument("--workers", type=int,
+                        help="processes to play with (default: one per CPU)")
+    parser.add_argument("--output",
+                        help="file to write the results to, as JSON")
+    args = parser.parse_args(argv)
+
+    bots = [Bot(threshold, args.slope) for threshold in args.thresholds]
+    difficulties = [difficulty / 10 for difficulty in args.difficulties]
+
+    start = time.perf_counter()
+    results = simulate(bots, difficulties, args.games,
+                       args.model, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+
+    report = list()
+    for (bot, difficulty), levels in results.items():
+        summary = summarise(levels)
+        report.append({"threshold": bot.threshold, "slope": bot.slope, "difficulty": difficulty,
+                       "lives": engine.starting_lives(difficulty), **summary})
+        print(f"Threshold {bot.threshold:g} dE, {engine.difficulty_label(difficulty)} ({engine.starting_lives(difficulty)} lives): "
+              f"level {summary['p50']} median, {summary['p10']}-{summary['p90']} (10-90%), "
+              f"mean {summary['mean']:.1f} +/- {summary['stdev']:.1f}, best {summary['max']}")
+        print(histogram(summary))
+    print(f"Played {sum(len(levels) for levels in results.values())} games in {elapsed:.1f} s.")
+
+    if (args.output):
+        with open(args.output, "w") as file:
+            json.dump({"meta": {"model": args.model, "seed": args.seed, "games": args.games},
+                       "results": report}, file, indent=1)
+    return 0
+
+
+# RUNNING
+if __name__ == "__main__":
+    sys.exit(main())
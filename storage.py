@@ -0,0 +1,432 @@
+# Visage
+# a color game by Conor Eager
+# The save file format: reading, checking and writing the player's settings & highscore.
+# This module doesn't use Tk, so it can be used without a display.
+#
+# Save files are small JSON documents:
+#   {"format": "visage-save", "version": 5, "data": {"difficulty": 1.0, ...}}
+# Every time the layout of "data" changes, SCHEMA_VERSION goes up by one and a function is added to MIGRATIONS
+# to upgrade files from the version before, so old save files keep working.
+# Version 0 is the old format, which was the whole Data object pickled.
+
+# IMPORTS
+# Import json for reading & writing save files
+import json
+
+# Import os for writing save files safely (temporary file, fsync, rename)
+import os
+
+# Import pickle and io only to read save files in the old (version 0) format
+import io
+import pickle
+
+# Import tempfile for creating the temporary file next to the save file
+import tempfile
+
+# Import threading, atexit, collections and concurrent.futures for writing save files in the background
+import atexit
+import collections
+import concurrent.futures
+import threading
+
+# Import metrics for timing how long saves take to write
+import metrics
+
+# CONSTANTS
+
+# The name saved in every file, so other JSON files aren't mistaken for save files.
+FORMAT_NAME = "visage-save"
+
+# The current version of the save file layout.
+SCHEMA_VERSION = 5
+
+# The settings & scores that are saved, with their default values.
+DEFAULTS = {
+    "button_outlines": False,
+    "button_gaps": True,
+    "highlight": "dot",
+    "difficulty": 1.0,
+    "highscore": 3,
+    "color_model": "classic",
+    "feedback_time": 2500,
+    "adaptive": False,
+    "resets": 0,
+}
+
+# The ways the incorrect color can be chosen (see colors.PuzzleGenerator and perceptual.PerceptualGenerator).
+COLOR_MODELS = ("classic", "perceptual")
+
+# The longest the game can pause to show where the different cell was after a wrong click, in milliseconds.
+MAX_FEEDBACK_TIME = 5000
+
+# CLASSES
+
+
+class SaveFormatError(ValueError):
+    """Raised when a save file can't be understood (wrong format, unknown version, or invalid values).
+    """
+    pass
+
+
+class _LegacyData:
+    """Stands in for the old Data class when reading a version 0 (pickled) save file.
+    It has no methods, so loading the file can't run any of the game's code.
+    """
+    pass
+
+
+class _LegacyUnpickler(pickle.Unpickler):
+    """An unpickler that will only create _LegacyData objects.
+    Anything else in the file (which a real Visage save file never contains) is refused,
+    so a tampered save file can't run code when it's loaded.
+    """
+
+    def find_class(self, module, name):
+        if (name == "Data" and module in ("__main__", "game")):
+            return _LegacyData
+        if ((module, name) in (("copyreg", "_reconstructor"), ("builtins", "object"))):
+            # Used by older pickle protocols to create plain objects.
+            return getattr(__import__(module), name)
+        raise pickle.UnpicklingError(
+            f"Save file contains something other than Visage data ({module}.{name}).")
+
+# FUNCTIONS
+
+
+def migrate_0_to_1(data):
+    """Upgrade a version 0 save (the old Data object's attributes) to version 1.
+    The fields are the same; only the file format changed.
+    """
+    return {key: value for key, value in data.items() if key in DEFAULTS}
+
+
+def migrate_1_to_2(data):
+    """Upgrade a version 1 save to version 2, which added the color model.
+    Players from before it was added keep the classic colors they're used to (and their highscores were set with).
+    """
+    data = dict(data)
+    data["color_model"] = "classic"
+    return data
+
+
+def migrate_2_to_3(data):
+    """Upgrade a version 2 save to version 3, which made the pause after a wrong click adjustable.
+    It starts at 2.5 seconds, which is what it always was before.
+    """
+    data = dict(data)
+    data["feedback_time"] = 2500
+    return data
+
+
+def migrate_3_to_4(data):
+    """Upgrade a version 3 save to version 4, which added adaptive difficulty. It starts off,
+    so the game plays the way it always has until it's turned on.
+    """
+    data = dict(data)
+    data["adaptive"] = False
+    return data
+
+
+def migrate_4_to_5(data):
+    """Upgrade a version 4 save to version 5, which counts how many times the highscore has been reset,
+    so a reset isn't undone by a copy of the game that still has the old highscore (see profiles.ProfileStore.save()).
+    """
+    data = dict(data)
+    data["resets"] = 0
+    return data
+
+
+# Functions to upgrade save data from one version to the next, by the version they upgrade from.
+MIGRATIONS = {
+    0: migrate_0_to_1,
+    1: migrate_1_to_2,
+    2: migrate_2_to_3,
+    3: migrate_3_to_4,
+    4: migrate_4_to_5,
+}
+
+
+def validate(data):
+    """Check that save data has the right fields, with sensible values.
+    Missing fields are filled in with their defaults, and unknown fields are dropped.
+
+    Args:
+        data (dict): The save data to check.
+
+    Raises:
+        SaveFormatError: If any of the values are invalid.
+
+    Returns:
+        dict: The checked save data.
+    """
+    if (not isinstance(data, dict)):
+        raise SaveFormatError("Save data is not a set of fields.")
+
+    fields = dict(DEFAULTS)
+    fields.update({key: value for key, value in data.items() if key in DEFAULTS})
+
+    for key in ("button_outlines", "button_gaps", "adaptive"):
+        if (not isinstance(fields[key], bool)):
+            raise SaveFormatError(f"'{key}' must be true or false.")
+
+    if (fields["highlight"] not in ("color", "dot", "none")):
+        raise SaveFormatError("'highlight' must be 'color', 'dot' or 'none'.")
+
+    if (fields["color_model"] not in COLOR_MODELS):
+        raise SaveFormatError("'color_model' must be 'classic' or 'perceptual'.")
+
+    # Numbers can't be booleans (which Python counts as numbers), and the difficulty must be one the settings allow.
+    for key in ("difficulty", "highscore"):
+        if (isinstance(fields[key], bool) or not isinstance(fields[key], (int, float))):
+            raise SaveFormatError(f"'{key}' must be a number.")
+    if (not 0.2 <= fields["difficulty"] <= 5.0):
+        raise SaveFormatError("'difficulty' must be between 0.2 and 5.0.")
+    if (not 0 <= fields["highscore"] < float("inf")):
+        raise SaveFormatError("'highscore' must be a positive number.")
+    fields["difficulty"] = float(fields["difficulty"])
+
+    if (isinstance(fields["feedback_time"], bool) or not isinstance(fields["feedback_time"], int)):
+        raise SaveFormatError("'feedback_time' must be a whole number of milliseconds.")
+    if (not 0 <= fields["feedback_time"] <= MAX_FEEDBACK_TIME):
+        raise SaveFormatError(f"'feedback_time' must be between 0 and {MAX_FEEDBACK_TIME}.")
+
+    if (isinstance(fields["resets"], bool) or not isinstance(fields["resets"], int) or fields["resets"] < 0):
+        raise SaveFormatError("'resets' must be a whole number, 0 or more.")
+
+    return fields
+
+
+def encode(fields):
+    """Turn save data into the contents of a save file.
+
+    Args:
+        fields (dict): The save data.
+
+    Returns:
+        bytes: The contents of the save file.
+    """
+    document = {"format": FORMAT_NAME,
+                "version": SCHEMA_VERSION, "data": validate(fields)}
+    return json.dumps(document, separators=(",", ":")).encode("utf-8")
+
+
+def decode(raw):
+    """Read the contents of a save file, upgrading it from older versions if needed.
+
+    Args:
+        raw (bytes): The contents of the save file.
+
+    Raises:
+        SaveFormatError: If the file isn't a valid save file.
+
+    Returns:
+        dict: The checked save data.
+    """
+    if (raw.startswith(b"\x80")):
+        # Pickle files start with this byte; JSON files never do.
+        version = 0
+        try:
+            data = vars(_LegacyUnpickler(io.BytesIO(raw)).load())
+        except Exception as e:
+            raise SaveFormatError(f"Old save file could not be read: {e}")
+    else:
+        try:
+            document = json.loads(raw.decode("utf-8"))
+        except ValueError as e:
+            raise SaveFormatError(f"Save file is not valid JSON: {e}")
+        if (not isinstance(document, dict) or document.get("format") != FORMAT_NAME):
+            raise SaveFormatError("File is not a Visage save file.")
+        version = document.get("version")
+        data = document.get("data")
+
+    if (not isinstance(version, int) or isinstance(version, bool) or version < 0):
+        raise SaveFormatError("Save file has no valid version number.")
+    if (version > SCHEMA_VERSION):
+        raise SaveFormatError(
+            f"Save file is from a newer version of Visage (format {version}, this version reads up to {SCHEMA_VERSION}).")
+
+    # Upgrade the data one version at a time.
+    while (version < SCHEMA_VERSION):
+        data = MIGRATIONS[version](data)
+        version += 1
+
+    return validate(data)
+
+
+def write_atomic(location, raw):
+    """Write a file so that it is either completely written or not changed at all, even if the game crashes part way.
+    The contents are written to a temporary file next to it, flushed to disk, and then renamed over the top.
+
+    Args:
+        location (str): The path of the file to write.
+        raw (bytes): The contents to write.
+    """
+    directory = os.path.dirname(os.path.abspath(location))
+    handle, temp_location = tempfile.mkstemp(
+        dir=directory, prefix=".visage_", suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            file.write(raw)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_location, location)
+    except BaseException:
+        # Don't leave the temporary file lying around.
+        try:
+            os.remove(temp_location)
+        except OSError:
+            pass
+        raise
+
+    # Make sure the rename itself is on disk. Directories can't be opened like this on Windows.
+    if (os.name == "posix"):
+        directory_handle = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_handle)
+        finally:
+            os.close(directory_handle)
+
+
+def save(location, fields):
+    """Save data to a save file.
+
+    Args:
+        location (str): The path of the save file.
+        fields (dict): The save data.
+    """
+    write_atomic(location, encode(fields))
+
+
+def load(location):
+    """Load data from a save file.
+
+    Args:
+        location (str): The path of the save file.
+
+    Raises:
+        FileNotFoundError: If there is no save file.
+        SaveFormatError: If the file isn't a valid save file.
+
+    Returns:
+        dict: The checked save data.
+    """
+    with open(location, "rb") as file:
+        return decode(file.read())
+
+
+class SaveWriter:
+    """This class writes save files on a background thread, so the game never has to wait for the disk.
+    If a file is saved again before the last save of it has been written, only the newest data is written.
+    Anything still waiting to be written when the game exits is written before it closes.
+    Failed saves are kept for the game to collect (with take_error()) and report to the user.
+    """
+
+    def __init__(self):
+        """Create a SaveWriter, and start its thread.
+        """
+        self.condition = threading.Condition()
+        # The saves waiting to be written: [fields, future, write function] by location, oldest first.
+        self.pending = dict()
+        self.writing = False
+        self.closed = False
+        # Saves that failed, as (location, exception), until the game collects them.
+        self.errors = collections.deque()
+
+        self.thread = threading.Thread(
+            target=self.run, name="Visage save writer", daemon=True)
+        self.thread.start()
+
+        # Finish writing before the game exits.
+        atexit.register(self.close)
+
+    def submit(self, location, fields, write=None):
+        """Ask for data to be saved. This returns straight away; the file is written in the background.
+
+        Args:
+            location (str): The path of the save file.
+            fields (dict): The save data. This should be a copy, as it is read from another thread.
+            write (function, optional): The function to write it with, taking the location and data
+            (e.g. profiles.ProfileStore.save). Defaults to save().
+
+        Returns:
+            concurrent.futures.Future: Completes once the data has been written (or fails with the error).
+            Saves that are merged together share the same Future.
+        """
+        with self.condition:
+            if (self.closed):
+                raise RuntimeError("The save writer has been closed.")
+            if (location in self.pending):
+                # Not written yet, so just replace the data waiting to be written.
+                self.pending[location][0] = fields
+                future = self.pending[location][1]
+            else:
+                future = concurrent.futures.Future()
+                self.pending[location] = [fields, future, write or save]
+            self.condition.notify_all()
+        return future
+
+    def run(self):
+        """Write saves as they come in. This runs on the writer's thread.
+        """
+        while True:
+            with self.condition:
+                while (not self.pending and not self.closed):
+                    self.condition.wait()
+                if (not self.pending):
+                    # Closed, and nothing left to write.
+                    return
+                location = next(iter(self.pending))
+                fields, future, write = self.pending.pop(location)
+                self.writing = True
+
+            try:
+                with metrics.METRICS.span("save write"):
+                    write(location, fields)
+            except Exception as e:
+                with self.condition:
+                    self.errors.append((location, e))
+                future.set_exception(e)
+            else:
+                future.set_result(location)
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+    def idle(self):
+        """Check whether everything has been written.
+
+        Returns:
+            bool: True if there is nothing waiting to be written, or being written.
+        """
+        with self.condition:
+            return not self.pending and not self.writing
+
+    def flush(self, timeout=None):
+        """Wait until everything has been written.
+
+        Args:
+            timeout (float, optional): The longest time to wait, in seconds. Defaults to None (wait forever).
+
+        Returns:
+            bool: True if everything was written, False if the timeout ran out first.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.writing, timeout)
+
+    def take_error(self):
+        """Collect the oldest failed save, if there is one.
+
+        Returns:
+            tuple: (location, exception) for the failed save, or None.
+        """
+        with self.condition:
+            return self.errors.popleft() if self.errors else None
+
+    def close(self):
+        """Write anything still waiting, then stop the writer's thread.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join()
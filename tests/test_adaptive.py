@@ -0,0 +1,93 @@
+# Visage
+# a color game by Conor Eager
+# Tests for adaptive difficulty (adaptive.py).
+
+# IMPORTS
+# Import math for the simulated player's chance of seeing a difference
+import math
+
+# Import random for seeded generators and the simulated player
+import random
+
+# Import pytest for running each test with and without NumPy
+import pytest
+
+# Import the modules being tested
+import adaptive
+import colors
+import engine
+
+# FUNCTIONS
+
+
+def chance(difference, threshold, guess):
+    """The chance of a simulated player clicking the different cell: sure well above their threshold,
+    guessing well below it."""
+    seen = 1 - math.exp(-(difference / threshold) ** 4)
+    return guess + (1 - guess) * seen
+
+
+def estimate(threshold, trials, seed=0):
+    """Play a simulated player with a known threshold, and return the generator's estimate of it."""
+    rng = random.Random(seed)
+    generator = adaptive.AdaptiveGenerator(colors.PuzzleGenerator(random.Random(seed)), 1, 255, whole=True)
+    level = 3
+    for _ in range(trials):
+        puzzle = generator.generate(level, 1.0)
+        difference = max(abs(a - b) for a, b in zip(puzzle.color, puzzle.different_color))
+        generator.observe(puzzle, rng.random() < chance(difference, threshold, 1 / level ** 2))
+    return generator.threshold(), generator
+
+# FIXTURES
+
+
+@pytest.fixture(params=["numpy", "python"])
+def implementation(request, monkeypatch):
+    """Run a test with NumPy (if it's installed), and with the pure Python version."""
+    if (request.param == "numpy" and adaptive.numpy is None):
+        pytest.skip("NumPy isn't installed")
+    if (request.param == "python"):
+        monkeypatch.setattr(adaptive, "numpy", None)
+    return request.param
+
+# TESTS
+
+
+@pytest.mark.parametrize("threshold", [3.0, 12.0, 60.0])
+def test_estimate_finds_the_threshold(implementation, threshold):
+    estimated, generator = estimate(threshold, 40)
+    assert generator.trials == 40
+    # Within a factor of 1.5 after 40 clicks (the grid without NumPy is coarser).
+    assert threshold / 1.5 < estimated < threshold * 1.5
+
+
+def test_puzzles_use_the_chosen_difference(implementation):
+    generator = adaptive.AdaptiveGenerator(colors.PuzzleGenerator(random.Random(2)), 1, 255, whole=True)
+    assert generator.intensities == sorted(set(generator.intensities))
+    assert all(isinstance(value, int) for value in generator.intensities)
+    for _ in range(10):
+        puzzle = generator.generate(5, 1.0)
+        index, guess = generator.waiting
+        assert guess == 1 / 25
+        differences = sorted(abs(a - b) for a, b in zip(puzzle.color, puzzle.different_color))
+        assert differences == [0, 0, generator.intensities[index]]
+        generator.observe(puzzle, True)
+    # A result for a puzzle that wasn't generated (or was already counted) is ignored.
+    generator.observe(puzzle, False)
+    assert generator.trials == 10
+
+
+def test_seeded_generators_repeat(implementation):
+    first, _ = estimate(10.0, 15, seed=4)
+    second, _ = estimate(10.0, 15, seed=4)
+    assert first == second
+
+
+def test_engine_reports_results():
+    state = engine.GameState(1.0, engine.puzzle_generator("classic", random.Random(0), adaptive=True), clock=lambda: 0.0)
+    assert isinstance(state.generator, adaptive.AdaptiveGenerator)
+    puzzle = state.puzzle
+    state.click(puzzle.row, puzzle.col)
+    puzzle = state.puzzle
+    state.click((puzzle.row + 1) % puzzle.level, puzzle.col)
+    assert state.generator.trials == 2
@@ -0,0 +1,159 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the session analytics (analytics.py).
+
+# IMPORTS
+# Import json for the analytics file
+import json
+
+# Import random for the values put in the sketches
+import random
+
+# Import pytest for checking errors and approximate comparisons
+import pytest
+
+# Import the module being tested
+import analytics
+
+# FUNCTIONS
+
+
+def exact_quantile(values, q):
+    """Get a quantile the same way Sketch.quantile() ranks values: the value at rank q * (n - 1)."""
+    return sorted(values)[int(q * (len(values) - 1))]
+
+# TESTS
+
+
+def test_quantiles_are_within_the_accuracy():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(6.5, 0.6) for _ in range(20_000)]
+    sketch = analytics.Sketch()
+    for value in values:
+        sketch.add(value)
+    for q in (0.0, 0.01, 0.5, 0.9, 0.99, 1.0):
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(values, q), rel=analytics.RELATIVE_ACCURACY)
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+    assert sketch.count == len(values)
+
+
+def test_known_quantiles():
+    sketch = analytics.Sketch()
+    for value in range(1, 101):
+        sketch.add(value)
+    assert sketch.quantile(0.0) == 1
+    assert sketch.quantile(0.5) == pytest.approx(50, rel=0.01)
+    assert sketch.quantile(0.9) == pytest.approx(90, rel=0.01)
+    assert sketch.quantile(1.0) == 100
+    assert analytics.Sketch().quantile(0.5) is None
+
+
+def test_merged_sketches_match_one_sketch():
+    rng = random.Random(1)
+    values = [rng.expovariate(1 / 800) for _ in range(10_000)]
+    whole, first, second = analytics.Sketch(), analytics.Sketch(), analytics.Sketch()
+    for number, value in enumerate(values):
+        whole.add(value)
+        (first if number % 3 else second).add(value)
+    first.merge(second)
+    assert first.buckets == whole.buckets and first.count == whole.count
+    for q in (0.1, 0.5, 0.95):
+        assert first.quantile(q) == whole.quantile(q)
+        assert first.quantile(q) == pytest.approx(exact_quantile(values, q), rel=analytics.RELATIVE_ACCURACY)
+
+
+def test_zero_and_tiny_values():
+    sketch = analytics.Sketch()
+    for value in (0, 0, 0, 5):
+        sketch.add(value)
+    assert sketch.quantile(0.5) == 0
+    assert sketch.quantile(1.0) == 5
+
+
+def test_bands_are_limited():
+    sketch = analytics.Sketch()
+    for exponent in range(-300, 300):
+        sketch.add(10.0 ** (exponent / 10))
+    assert len(sketch.buckets) <= analytics.MAX_BUCKETS
+    # Only the lowest values are merged together, so the highest percentiles stay accurate.
+    assert sketch.quantile(1.0) == pytest.approx(10.0 ** 29.9, rel=analytics.RELATIVE_ACCURACY)
+
+
+def test_sketch_round_trip():
+    sketch = analytics.Sketch()
+    for value in (3, 4, 4, 12.5, 800):
+        sketch.add(value)
+    copy = analytics.Sketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+    assert copy.buckets == sketch.buckets and copy.quantile(0.5) == sketch.quantile(0.5)
+    with pytest.raises(analytics.AnalyticsError):
+        analytics.Sketch.from_dict({"count": 1})
+
+
+def test_analytics_counts():
+    counted = analytics.Analytics()
+    for number in range(20):
+        counted.click(3 + number % 2, 1.0, 400 + number, number % 4 != 0)
+    counted.click(3, 2.0, 900, False)
+    counted.game_over(1.0, 12)
+    counted.game_over(1.0, 8)
+    counted.game_over(2.0, 5)
+    assert counted.hit_rate(1.0) == 0.75
+    assert counted.hit_rate() == 15 / 21
+    assert counted.hit_rate(0.5) is None
+    assert counted.reaction_times().count == 21
+    assert counted.reaction_times([4]).count == 10
+    assert counted.levels_reached(1.0).count == 2
+    assert counted.levels_reached().quantile(1.0) == 12
+
+    copy = analytics.Analytics.from_dict(json.loads(json.dumps(counted.to_dict())))
+    copy.merge(counted)
+    assert copy.hit_rate(1.0) == 0.75 and copy.reaction_times().count == 42
+
+
+def test_store_merges_saves_from_several_copies(tmp_path):
+    location = str(tmp_path / "analytics.json")
+    first, second = analytics.AnalyticsStore(location), analytics.AnalyticsStore(location)
+    try:
+        first.click(3, 1.0, 500, True)
+        first.game_over(1.0, 9)
+        second.click(3, 1.0, 700, False)
+        first.save().result()
+        second.save().result()
+        # The second copy picks up what the first saved.
+        assert second.totals.hit_rate() == 0.5 and second.totals.levels_reached().count == 1
+        assert first.idle() and first.take_error() is None
+    finally:
+        first.close()
+        second.close()
+    reopened = analytics.AnalyticsStore(location)
+    assert reopened.totals.reaction_times().count == 2
+    reopened.close()
+
+
+def test_store_keeps_failed_saves(tmp_path):
+    location = str(tmp_path / "analytics.json")
+    store = analytics.AnalyticsStore(location)
+    try:
+        store.click(3, 1.0, 500, True)
+        # Make the file impossible to write: a directory in its place.
+        (tmp_path / "analytics.json").mkdir()
+        future = store.save()
+        with pytest.raises(OSError):
+            future.result()
+        failed, error = store.take_error()
+        assert failed == location and error is future.exception()
+        assert store.take_error() is None and store.idle()
+        # What wasn't saved is kept for the next save.
+        assert store.pending.hit_rate() == 1.0
+    finally:
+        store.close()
+
+
+def test_invalid_file(tmp_path):
+    location = tmp_path / "analytics.json"
+    location.write_text("not json")
+    with pytest.raises(analytics.AnalyticsError):
+        analytics.AnalyticsStore(str(location))
+    location.write_text(json.dumps({"format": "other"}))
+    with pytest.raises(analytics.AnalyticsError):
+        analytics.AnalyticsStore(str(location))
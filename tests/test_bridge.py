@@ -0,0 +1,106 @@
+# Visage
+# a color game by Conor Eager
+# Tests for running asyncio inside Tk's event loop (bridge.py).
+
+# IMPORTS
+# Import asyncio for the coroutines being run
+import asyncio
+
+# Import time for waiting on worker threads
+import time
+
+# Import the module being tested
+import bridge
+
+# CLASSES
+
+
+class Widget:
+    """Stands in for a Tk widget: keeps the scheduled callbacks, to be run by hand with run()."""
+
+    def __init__(self):
+        self.scheduled = dict()
+        self.count = 0
+
+    def after(self, ms, callback):
+        self.count += 1
+        self.scheduled[self.count] = callback
+        return self.count
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, identifier):
+        del self.scheduled[identifier]
+
+    def run(self):
+        """Run the callbacks scheduled so far, like one pass of Tk's event loop."""
+        scheduled, self.scheduled = self.scheduled, dict()
+        for callback in scheduled.values():
+            callback()
+
+# TESTS
+
+
+def test_coroutine_runs_between_tk_events():
+    widget = Widget()
+    runner = bridge.Bridge(widget)
+    events = list()
+
+    async def work():
+        events.append("started")
+        result = await asyncio.get_running_loop().run_in_executor(None, sum, [1, 2, 3])
+        events.append(result)
+
+    try:
+        runner.run(work())
+        # Nothing runs until Tk gets to it.
+        assert events == [] and runner.busy()
+        for _ in range(1000):
+            if (not runner.busy()):
+                break
+            widget.run()
+            time.sleep(0.001)
+        assert events == ["started", 6]
+        # Once there's nothing left to run, no more steps are scheduled.
+        widget.run()
+        assert widget.scheduled == {}
+    finally:
+        runner.close()
+
+
+def test_close_cancels_running_coroutines():
+    widget = Widget()
+    runner = bridge.Bridge(widget)
+    events = list()
+
+    async def forever():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+
+    runner.run(forever())
+    widget.run()
+    runner.close()
+    assert events == ["cancelled"] and widget.scheduled == {}
+    assert runner.loop.is_closed()
+
+
+def test_failed_coroutines_are_reported():
+    widget = Widget()
+    runner = bridge.Bridge(widget)
+    reported = list()
+    runner.loop.set_exception_handler(lambda loop, context: reported.append(context["exception"]))
+
+    async def broken():
+        raise KeyError("bug")
+
+    try:
+        runner.run(broken())
+        while (runner.busy()):
+            widget.run()
+        assert [type(e) for e in reported] == [KeyError]
+    finally:
+        runner.close()
@@ -0,0 +1,60 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the color generator (colors.py).
+
+# IMPORTS
+# Import random for seeded generators
+import random
+
+# Import the module being tested
+import colors
+
+# TESTS
+
+
+def check_puzzle(puzzle, level, step):
+    """Check a puzzle is valid: colors in range, exactly one component different by the step, and the cell on the grid."""
+    assert puzzle.level == level
+    for component in puzzle.color + puzzle.different_color:
+        assert 0 <= component <= 0xFF
+    differences = [abs(a - b) for a, b in zip(puzzle.color, puzzle.different_color)]
+    assert sorted(differences) == [0, 0, step]
+    assert 0 <= puzzle.row < level and 0 <= puzzle.col < level
+
+
+def test_color_step_bounds():
+    # The step is never 0 (which used to hang the old generator), and never more than 255.
+    assert colors.color_step(1, 0.2) == 0xFF
+    assert colors.color_step(3, 1.0) == 85
+    assert colors.color_step(10000, 5.0) == 1
+    assert colors.color_step(1, 0.01) == 0xFF
+
+
+def test_generate_extreme_levels_and_difficulties():
+    generator = colors.PuzzleGenerator(random.Random(0))
+    for level in (1, 2, 3, 50, 500, 5000):
+        for difficulty in (0.2, 1.0, 5.0):
+            for _ in range(50):
+                puzzle = generator.generate(level, difficulty)
+                check_puzzle(puzzle, level, colors.color_step(level, difficulty))
+
+
+def test_generate_at_every_step():
+    generator = colors.PuzzleGenerator(random.Random(1))
+    for step in (1, 2, 127, 254, 255):
+        for _ in range(50):
+            check_puzzle(generator.generate_at(3, step), 3, step)
+
+
+def test_seeded_generators_repeat():
+    first = colors.PuzzleGenerator(random.Random(42))
+    second = colors.PuzzleGenerator(random.Random(42))
+    assert [first.generate(level, 1.0) for level in range(3, 30)] == \
+        [second.generate(level, 1.0) for level in range(3, 30)]
+
+
+def test_color_strings():
+    assert colors.to_hex((0, 0x2B, 0xFF)) == "#002BFF"
+    puzzle = colors.Puzzle(3, (1, 2, 3), (1, 2, 4), 0, 0)
+    assert puzzle.color_str == "#010203"
+    assert puzzle.different_color_str == "#010204"
@@ -0,0 +1,122 @@
+# Visage
+# a color game by Conor Eager
+# Tests for puzzle decks (deck.py).
+
+# IMPORTS
+# Import pytest for checking errors
+import pytest
+
+# Import the module being tested
+import deck
+
+# TESTS
+
+
+def test_build_and_read(tmp_path, monkeypatch):
+    # Small chunks, so the levels are split between the workers.
+    monkeypatch.setattr(deck, "CHUNK_LEVELS", 4)
+    location = str(tmp_path / "test.deck")
+    deck.build(location, 3, 30, per_level=4, difficulty=2.0, seed=7, workers=2)
+
+    opened = deck.Deck(location)
+    try:
+        assert len(opened) == 30 * 4
+        assert (opened.first_level, opened.level_count, opened.per_level) == (3, 30, 4)
+        assert (opened.difficulty, opened.seed, opened.color_model) == (2.0, 7, "classic")
+        assert opened.has_level(3) and opened.has_level(32) and not opened.has_level(33)
+        # The same puzzles as generating each level from its own seed.
+        for level in (3, 17, 32):
+            generator = deck.level_generator("classic", 7, level)
+            assert [opened.puzzle(level, attempt) for attempt in range(4)] == \
+                [generator.generate(level, 2.0) for _ in range(4)]
+        # Tries past the level's puzzles use them again.
+        assert opened.puzzle(5, 4) == opened.puzzle(5, 0)
+        assert opened[-1] == opened.puzzle(32, 3)
+        with pytest.raises(IndexError):
+            opened.puzzle(2)
+    finally:
+        opened.close()
+
+
+def test_same_deck_for_any_number_of_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(deck, "CHUNK_LEVELS", 4)
+    contents = []
+    for workers in (1, 2, 3):
+        location = tmp_path / f"{workers}.deck"
+        deck.build(str(location), 1, 25, per_level=3, seed=12345, workers=workers)
+        contents.append(location.read_bytes())
+    assert contents[0] == contents[1] == contents[2]
+
+
+def test_generator_continues_past_the_deck(tmp_path):
+    location = str(tmp_path / "test.deck")
+    deck.build(location, 3, 2, per_level=2, workers=1)
+    opened = deck.Deck(location)
+    try:
+        generator = deck.DeckGenerator(opened)
+        assert generator.generate(3, 1.0) == opened.puzzle(3, 0)
+        assert generator.generate(3, 1.0) == opened.puzzle(3, 1)
+        assert generator.generate(5, 1.0) == deck.level_generator("classic", 0, 5).generate(5, 1.0)
+    finally:
+        opened.close()
+
+
+def test_invalid_decks(tmp_path):
+    location = tmp_path / "bad.deck"
+    location.write_bytes(b"VDCK")
+    with pytest.raises(deck.DeckFormatError):
+        deck.Deck(str(location))
+    location.write_bytes(b"XXXX" + bytes(deck.HEADER_SIZE))
+    with pytest.raises(deck.DeckFormatError):
+        deck.Deck(str(location))
+
+    # A deck cut short.
+    deck.build(str(location), 3, 2, workers=1)
+    location.write_bytes(location.read_bytes()[:-1])
+    with pytest.raises(deck.DeckFormatError):
+        deck.Deck(str(location))
+
+
+@pytest.mark.parametrize("changes", [{"difficulty": 0.0}, {"difficulty": float("nan")}, {"color_model": b"hsv"},
+                                     {"first_level": 0}, {"first_level": 0xFFFF}])
+def test_invalid_deck_headers(tmp_path, changes):
+    location = tmp_path / "bad.deck"
+    deck.build(str(location), 3, 2, per_level=1, workers=1)
+    raw = location.read_bytes()
+    fields = dict(zip(("magic", "version", "record_size", "difficulty", "first_level", "level_count", "per_level",
+                       "seed", "color_model"), deck.HEADER.unpack_from(raw, 0)), **changes)
+    location.write_bytes(deck.HEADER.pack(*fields.values()) + raw[deck.HEADER.size:])
+    with pytest.raises(deck.DeckFormatError):
+        deck.Deck(str(location))
+
+
+@pytest.mark.parametrize("row, col, level", [(3, 0, 3), (0, 7, 3), (0, 0, 4)])
+def test_invalid_deck_records(tmp_path, row, col, level):
+    location = tmp_path / "bad.deck"
+    deck.build(str(location), 3, 2, per_level=1, workers=1)
+    raw = bytearray(location.read_bytes())
+    # Change the first puzzle (level 3) to one outside its level.
+    deck.RECORD.pack_into(raw, deck.HEADER_SIZE, *deck.RECORD.unpack_from(raw, deck.HEADER_SIZE)[:6], row, col, level)
+    location.write_bytes(raw)
+    opened = deck.Deck(str(location))
+    try:
+        with pytest.raises(deck.DeckFormatError):
+            opened.puzzle(3)
+        # The rest of the deck can still be played.
+        assert opened.puzzle(4).level == 4
+    finally:
+        opened.close()
+
+
+def test_invalid_build_options(tmp_path):
+    location = str(tmp_path / "test.deck")
+    with pytest.raises(ValueError):
+        deck.build(location, 0, 10)
+    with pytest.raises(ValueError):
+        deck.build(location, 3, 10, difficulty=10.0)
+    with pytest.raises(ValueError):
+        deck.build(location, 3, 10, seed=-1)
+    # Negative seeds are refused before anything is built.
+    with pytest.raises(SystemExit):
+        deck.main(["build", location, "--seed", "-1"])
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,73 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the game engine (engine.py).
+
+# IMPORTS
+# Import random for seeded generators
+import random
+
+# Import the modules being tested
+import colors
+import engine
+
+# FUNCTIONS
+
+
+def new_game(difficulty=1.0, seed=0):
+    """Start a seeded game with a clock that doesn't move."""
+    return engine.GameState(difficulty, colors.PuzzleGenerator(random.Random(seed)), clock=lambda: 0.0)
+
+
+def miss(state):
+    """Click a cell that isn't the different one."""
+    puzzle = state.puzzle
+    return state.click((puzzle.row + 1) % puzzle.level, puzzle.col)
+
+# TESTS
+
+
+def test_starting_lives():
+    assert engine.starting_lives(0.2) == 10
+    assert engine.starting_lives(0.5) == 6
+    assert engine.starting_lives(1.0) == 3
+    assert engine.starting_lives(2.0) == 2
+    assert engine.starting_lives(5.0) == 1
+
+
+def test_difficulty_label():
+    assert engine.difficulty_label(0.5) == "Easy (5)"
+    assert engine.difficulty_label(1.0) == "Normal (10)"
+    assert engine.difficulty_label(2.0) == "Hard (20)"
+    assert engine.difficulty_label(5.0) == "Insane (50)"
+
+
+def test_correct_click_moves_up_a_level():
+    state = new_game()
+    assert state.level == engine.START_LEVEL
+    assert state.click(state.puzzle.row, state.puzzle.col)
+    assert state.level == engine.START_LEVEL + 1
+    assert state.puzzle.level == state.level
+    assert state.score == state.level * 1.0
+    assert len(state.level_times) == 1
+
+
+def test_wrong_clicks_lose_lives_until_game_over():
+    state = new_game()
+    lives = state.lives
+    for lost in range(1, lives + 1):
+        assert not miss(state)
+        assert state.lives_lost == lost
+    assert state.over
+    # Clicks after the game is over are ignored.
+    assert not state.click(state.puzzle.row, state.puzzle.col)
+    assert state.level == engine.START_LEVEL
+
+
+def test_cells_marks_the_different_cell():
+    state = new_game()
+    puzzle = state.puzzle
+    cells = state.cells
+    assert len(cells) == puzzle.level ** 2
+    red, green, blue = puzzle.different_color
+    assert cells[puzzle.row * puzzle.level + puzzle.col] == (red << 16) | (green << 8) | blue
+    assert len(set(cells)) == 2
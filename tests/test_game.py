@@ -1,3 +1,259 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the game grids (game.py), drawn on the benchmarks' stub canvas so they don't need a display.
+
+# IMPORTS
+# Import types for the display settings the grids are drawn with
+import types
+
+# Import pytest for the fixtures
+import pytest
+
+# Import the benchmarks for their stub canvas, the theme for the background color, and the module being tested
+import benchmark
 import game
+import theme
+
+# CLASSES
+
+
+class StubImage:
+    """Stands in for a tk.PhotoImage: keeps the color of every pixel put into it."""
+
+    def __init__(self, size):
+        self.pixels = [[None] * size for _ in range(size)]
+
+    def put(self, data, to):
+        x1, y1, x2, y2 = to
+        # Either one color for the whole area, or a row of colors repeated down it.
+        row = data[1:-1].split() if data.startswith("{") else [data] * (x2 - x1)
+        for y in range(y1, y2):
+            self.pixels[y][x1:x2] = row[:x2 - x1]
+
+    def blank(self):
+        for row in self.pixels:
+            row[:] = [None] * len(row)
+
+# FUNCTIONS
+
+
+def display(button_gaps=True, button_outlines=False, highlight="dot"):
+    """Make the display settings a grid is drawn with (see GameWindow.use_settings())."""
+    return types.SimpleNamespace(button_gaps=button_gaps, button_outlines=button_outlines, highlight=highlight)
+
+
+def draw(grid, level, color="#101010", different_color="#202020", diff_row=0, diff_col=0):
+    """Draw a grid, and run the build to the end."""
+    done = list()
+    grid.draw(level, color, different_color, diff_row, diff_col, callback=lambda: done.append(True))
+    grid.canvas.pump()
+    assert done == [True]
+
+
+def cell_coords(grid, row, col):
+    """Get the coordinates of a cell's rectangle, rounded to the nearest pixel."""
+    return [round(value) for value in grid.canvas.items[grid.cells[row][col]][0]]
+
+# FIXTURES
+
+
+@pytest.fixture
+def canvas_grid():
+    """A 400px CanvasGrid on a stub canvas, recording the cells clicked."""
+    clicked = list()
+    grid = game.CanvasGrid(None, 400, display(), lambda row, col: clicked.append((row, col)),
+                           canvas=benchmark.StubCanvas())
+    grid.clicked = clicked
+    return grid
+
+
+@pytest.fixture
+def raster_grid():
+    """A 400px RasterGrid on a stub canvas & image."""
+    return game.RasterGrid(None, 400, display(), lambda row, col: None, canvas=benchmark.StubCanvas(),
+                           image=StubImage(400))
+
+# TESTS
+
+
+def test_cell_at(canvas_grid):
+    # Nothing to click before the grid is drawn.
+    assert canvas_grid.cell_at(10, 10) is None
+    draw(canvas_grid, 4)
+    assert canvas_grid.cell_at(0, 0) == (0, 0)
+    assert canvas_grid.cell_at(99.9, 100) == (1, 0)
+    assert canvas_grid.cell_at(250, 120) == (1, 2)
+    assert canvas_grid.cell_at(399, 399) == (3, 3)
+    for x, y in ((400, 10), (10, 400), (-1, 10), (10, -0.5)):
+        assert canvas_grid.cell_at(x, y) is None
+
+    canvas_grid.click(types.SimpleNamespace(x=350, y=50))
+    canvas_grid.click(types.SimpleNamespace(x=450, y=50))
+    assert canvas_grid.clicked == [(0, 3)]
+
+    # Nothing can be clicked while the next grid is being built.
+    canvas_grid.draw(5, "#101010", "#202020", 0, 0)
+    assert canvas_grid.cell_at(10, 10) is None
+    canvas_grid.canvas.pump()
+    assert canvas_grid.cell_at(399, 10) == (0, 4)
+
+
+def test_grid_grows_and_shrinks(canvas_grid):
+    canvas = canvas_grid.canvas
+    draw(canvas_grid, 3, diff_row=2, diff_col=1)
+    first = [list(row) for row in canvas_grid.cells]
+    assert len(canvas.find("cell")) == 9
+
+    # Moving up two levels keeps the existing cells, moved & resized, and adds the new ones around them.
+    draw(canvas_grid, 5, diff_row=4, diff_col=4)
+    assert len(canvas.find("cell")) == 25
+    assert [row[:3] for row in canvas_grid.cells[:3]] == first
+    assert all(len(row) == 5 for row in canvas_grid.cells) and len(canvas_grid.cells) == 5
+    assert cell_coords(canvas_grid, 0, 0) == [0, 0, 80, 80]
+    assert cell_coords(canvas_grid, 2, 1) == [80, 160, 160, 240]
+    assert cell_coords(canvas_grid, 4, 4) == [320, 320, 400, 400]
+    fills = {canvas.itemcget(cell, "fill") for row in canvas_grid.cells for cell in row}
+    assert fills == {"#101010", "#202020"}
+    assert canvas.itemcget(canvas_grid.cells[4][4], "fill") == "#202020"
+    # A gap line either side of every row and column.
+    assert len(canvas.find("gap")) == 2 * 6
+
+    # Going back down removes the rows and columns past the new level.
+    draw(canvas_grid, 2, diff_row=1, diff_col=0)
+    assert len(canvas.find("cell")) == 4
+    assert canvas_grid.cells == [row[:2] for row in first[:2]]
+    assert cell_coords(canvas_grid, 1, 1) == [200, 200, 400, 400]
+    assert canvas.itemcget(canvas_grid.cells[1][0], "fill") == "#202020"
+    assert canvas.itemcget(canvas_grid.cells[0][0], "fill") == "#101010"
+
+
+def test_retrying_a_level_reuses_the_cells(canvas_grid):
+    canvas = canvas_grid.canvas
+    draw(canvas_grid, 6, diff_row=1, diff_col=2)
+    cells = [list(row) for row in canvas_grid.cells]
+    next_item = canvas.next_id
+
+    # A wrong click retries the same level with new colors: the cells are only recolored.
+    draw(canvas_grid, 6, "#303030", "#404040", diff_row=5, diff_col=0)
+    assert canvas_grid.cells == cells and canvas.next_id == next_item
+    assert canvas.itemcget(cells[5][0], "fill") == "#404040"
+    assert canvas.itemcget(cells[1][2], "fill") == "#303030"
+
+    # Changing the gap or outline settings makes the cells again, in the new style.
+    canvas_grid.data.button_outlines = True
+    draw(canvas_grid, 6)
+    assert len(canvas.find("cell")) == 36
+    assert not set(cells[0]) & set(canvas.find("cell"))
+    assert canvas.itemcget(canvas_grid.cells[0][0], "width") == 4
+
+
+def test_cancel_stops_a_chunked_build(canvas_grid, monkeypatch):
+    # No time for more than one chunk of cells per frame.
+    monkeypatch.setattr(game.CanvasGrid, "FRAME_BUDGET", 0)
+    canvas = canvas_grid.canvas
+    progress, done = list(), list()
+    canvas_grid.draw(30, "#101010", "#202020", 3, 4, progress=lambda built, total: progress.append((built, total)),
+                     callback=lambda: done.append(True))
+    # Run the first chunk (queued with after_idle()) and the second (queued with after()) by hand.
+    for _ in range(2):
+        canvas.queue.pop(0)()
+    assert progress == [(16, 900), (32, 900)] and len(canvas.queue) == 1
+
+    canvas_grid.cancel()
+    # Nothing more is scheduled, the build never finishes, and the grid is left whole.
+    assert canvas.queue == [] and done == []
+    assert canvas_grid.steps is None and canvas_grid.pending is None
+    assert len(canvas.find("cell")) == 900 and all(len(row) == 30 for row in canvas_grid.cells)
+    assert canvas_grid.cell_at(399, 399) == (29, 29)
+
+    # Drawing again carries on from the cells that are there.
+    next_item = canvas.next_id
+    draw(canvas_grid, 30, diff_row=3, diff_col=4)
+    assert canvas.next_id == next_item
+    assert canvas.itemcget(canvas_grid.cells[3][4], "fill") == "#202020"
+
+
+def test_drawing_again_cancels_the_build(canvas_grid, monkeypatch):
+    monkeypatch.setattr(game.CanvasGrid, "FRAME_BUDGET", 0)
+    first = list()
+    canvas_grid.draw(20, "#101010", "#202020", 0, 0, callback=lambda: first.append(True))
+    canvas_grid.canvas.queue.pop(0)()
+    draw(canvas_grid, 10, diff_row=9, diff_col=9)
+    # Only the newest build finishes.
+    assert first == [] and len(canvas_grid.canvas.find("cell")) == 100
+
+
+def test_raster_layout(raster_grid):
+    draw(raster_grid, 40, diff_row=3, diff_col=5)
+    columns, rows = raster_grid.pixels
+    # 10px cells, with a 1px gap either side of each border.
+    assert columns[:12] == [(0, game.RasterGrid.GAP)] + [(0, game.RasterGrid.CELL)] * 8 + \
+        [(0, game.RasterGrid.GAP), (1, game.RasterGrid.GAP), (1, game.RasterGrid.CELL)]
+    assert rows == columns and raster_grid.spans[0][5] == (51, 59)
+    # The different cell is drawn inside its borders.
+    pixels = raster_grid.image.pixels
+    assert pixels[35][55] == "#202020" and pixels[35][45] == "#101010" and pixels[30][55] == theme.BACKGROUND
+
+    # Outlines go 1px inside the gaps; small cells have neither.
+    raster_grid.data.button_outlines = True
+    raster_grid.layout()
+    assert [kind for index, kind in raster_grid.pixels[0][:3]] == \
+        [game.RasterGrid.GAP, game.RasterGrid.OUTLINE, game.RasterGrid.CELL]
+    draw(raster_grid, 100)
+    assert {kind for index, kind in raster_grid.pixels[0]} == {game.RasterGrid.CELL}
+
+
+def test_raster_cell_at(raster_grid):
+    raster_grid.draw(50, "#101010", "#202020", 0, 0)
+    # Nothing can be clicked until the grid is drawn.
+    assert raster_grid.cell_at(10, 10) is None
+    raster_grid.canvas.pump()
+    assert raster_grid.cell_at(0, 0) == (0, 0)
+    assert raster_grid.cell_at(399, 17) == (2, 49)
+    for x, y in ((400, 10), (10, 400), (-1, 10)):
+        assert raster_grid.cell_at(x, y) is None
+    # Zoomed in, the same point is a different cell.
+    raster_grid.zoom_at(0, 0, 2)
+    assert raster_grid.cell_at(399, 17) == (1, 24)
+
+
+def test_raster_zoom_and_pan_are_kept_inside_the_grid(raster_grid):
+    draw(raster_grid, 40)
+    # Zooming keeps the cell under the mouse where it is.
+    cell = raster_grid.cell_at(300, 100)
+    raster_grid.zoom_at(300, 100, 1000)
+    assert raster_grid.zoom == game.RasterGrid.MAX_ZOOM and raster_grid.cell_at(300, 100) == cell
+    raster_grid.zoom_at(300, 100, 0.001)
+    assert raster_grid.zoom == 1.0 and raster_grid.offset == [0.0, 0.0]
+
+    raster_grid.zoom_at(0, 0, 2)
+    raster_grid.move(-50, 10_000)
+    assert raster_grid.offset == [0.0, 400.0]
+    assert raster_grid.cell_at(0, 399) == (39, 0)
+    raster_grid.move(10_000, -10_000)
+    assert raster_grid.offset == [400.0, 0.0]
+
+
+def test_raster_cells_are_never_less_than_a_pixel(raster_grid):
+    # A 1000 level in a 400px image is zoomed in until the cells are a pixel across.
+    draw(raster_grid, 1000, diff_row=600, diff_col=600)
+    assert raster_grid.zoom == 2.5
+    raster_grid.zoom_at(200, 200, 0.5)
+    assert raster_grid.zoom == 2.5
+    # Every cell in view gets its own pixel: none are skipped.
+    columns = [index for index, kind in raster_grid.pixels[0]]
+    assert columns == list(range(columns[0], columns[0] + 400))
+    # The view is centred, so the different cell is in it, and drawn.
+    x, y = (600 - columns[0], 600 - raster_grid.pixels[1][0][0])
+    assert raster_grid.image.pixels[y][x] == "#202020"
+    assert raster_grid.cell_at(x, y) == (600, 600)
 
-# No tests yet.
+    # Even past the usual furthest zoom.
+    draw(raster_grid, 5000)
+    assert raster_grid.zoom == 12.5
+    raster_grid.zoom_at(200, 200, 2)
+    assert raster_grid.zoom == 12.5
+    # Back at a smaller level, the view can be zoomed out again.
+    draw(raster_grid, 40)
+    raster_grid.zoom_at(200, 200, 0.001)
+    assert raster_grid.zoom == 1.0
@@ -0,0 +1,71 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the game history (history.py).
+
+# IMPORTS
+# Import pytest for approximate comparisons
+import pytest
+
+# Import the module being tested
+import history
+
+# FUNCTIONS
+
+
+def filled_store(location=":memory:"):
+    """Make a history with a few games on two difficulties."""
+    store = history.HistoryStore(location)
+    for number, (difficulty, level) in enumerate([(1.0, 5), (2.0, 4), (1.0, 9), (2.0, 12), (1.0, 3)]):
+        store.record(difficulty, level, 1, 10.0 + number, [0.5] * (level - 2), finished_at=1000.0 + number)
+    store.flush()
+    return store
+
+# TESTS
+
+
+def test_leaderboard_order_and_pages():
+    store = filled_store()
+    try:
+        assert [game.score for game in store.leaderboard()] == [24.0, 9.0, 8.0, 5.0, 3.0]
+        assert [game.score for game in store.leaderboard(limit=2, offset=2)] == [8.0, 5.0]
+        assert [game.level for game in store.leaderboard(difficulty=1.0)] == [9, 5, 3]
+        best = store.leaderboard(limit=1)[0]
+        assert best.difficulty == 2.0 and best.finished_at == 1003.0 and best.duration == 13.0
+        assert list(best.level_times) == pytest.approx([0.5] * 10)
+    finally:
+        store.close()
+
+
+def test_ties_go_to_the_earlier_game():
+    store = history.HistoryStore()
+    try:
+        store.record(1.0, 6, 0, 1.0, [], finished_at=2000.0)
+        store.record(1.0, 6, 0, 1.0, [], finished_at=1000.0)
+        store.flush()
+        assert [game.finished_at for game in store.leaderboard()] == [1000.0, 2000.0]
+    finally:
+        store.close()
+
+
+def test_count_and_reset():
+    store = filled_store()
+    try:
+        assert store.count() == 5
+        assert store.count(difficulty=2.0) == 2
+        store.reset(difficulty=2.0).result()
+        assert store.count() == 3 and store.count(difficulty=2.0) == 0
+        store.reset().result()
+        assert store.count() == 0 and store.leaderboard() == []
+    finally:
+        store.close()
+
+
+def test_games_are_kept_on_disk(tmp_path):
+    location = str(tmp_path / "history.db")
+    filled_store(location).close()
+    store = history.HistoryStore(location)
+    try:
+        assert store.count() == 5
+        assert store.leaderboard(limit=1)[0].level == 12
+    finally:
+        store.close()
@@ -0,0 +1,51 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the hot path timings (metrics.py).
+
+# IMPORTS
+# Import the module being tested
+import metrics
+
+# TESTS
+
+
+def test_ring_keeps_the_most_recent_samples():
+    ring = metrics.Ring(4)
+    assert list(ring.values()) == []
+    for ns in (1, 2, 3):
+        ring.add(ns)
+    assert sorted(ring.values()) == [1, 2, 3]
+    # Past the end, the oldest samples are replaced.
+    for ns in (4, 5, 6):
+        ring.add(ns)
+    assert sorted(ring.values()) == [3, 4, 5, 6]
+    assert ring.count == 6
+
+
+def test_nearest_rank_percentiles():
+    assert metrics.percentiles(range(1, 101)) == [50, 95, 99]
+    assert metrics.percentiles([30, 10, 20], (0, 34, 50, 67, 100)) == [10, 20, 20, 30, 30]
+    # Each percentile is one of the samples.
+    assert metrics.percentiles([7]) == [7, 7, 7]
+    assert metrics.percentiles([]) == [None, None, None]
+
+
+def test_summary_and_report():
+    timings = metrics.Metrics(size=8)
+    for ms in range(1, 11):
+        timings.record("click", ms * 1_000_000)
+    with timings.span("save"):
+        pass
+    summary = timings.summary()
+    assert list(summary) == ["click", "save"]
+    # Every click is counted, but only the last 8 are kept for the percentiles.
+    assert summary["click"] == (10, 6.0, 10.0, 10.0)
+    assert summary["save"][0] == 1 and summary["save"][1] >= 0
+
+    lines = timings.report().splitlines()
+    assert lines[0].split() == ["span", "n", "p50", "p95", "p99", "(ms)"]
+    assert lines[1].split() == ["click", "10", "6.00", "10.00", "10.00"]
+    assert lines[2].split()[:2] == ["save", "1"]
+
+    timings.clear()
+    assert timings.summary() == {} and len(timings.report().splitlines()) == 1
@@ -0,0 +1,110 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the perceptual color model (perceptual.py).
+
+# IMPORTS
+# Import random for seeded generators and random colors
+import random
+
+# Import pytest for approximate comparisons and skipping tests without NumPy
+import pytest
+
+# Import the module being tested
+import perceptual
+
+# CONSTANTS
+
+# The test data from Sharma, Wu & Dalal, "The CIEDE2000 Color-Difference Formula: Implementation Notes,
+# Supplementary Test Data, and Mathematical Observations" (2005), table 1: (L, a, b), (L, a, b), ΔE2000.
+SHARMA = [
+    ((50.0000, 2.6772, -79.7751), (50.0000, 0.0000, -82.7485), 2.0425),
+    ((50.0000, 3.1571, -77.2803), (50.0000, 0.0000, -82.7485), 2.8615),
+    ((50.0000, 2.8361, -74.0200), (50.0000, 0.0000, -82.7485), 3.4412),
+    ((50.0000, -1.3802, -84.2814), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -1.1848, -84.8006), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, -0.9009, -85.5211), (50.0000, 0.0000, -82.7485), 1.0000),
+    ((50.0000, 0.0000, 0.0000), (50.0000, -1.0000, 2.0000), 2.3669),
+    ((50.0000, -1.0000, 2.0000), (50.0000, 0.0000, 0.0000), 2.3669),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0009), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0010), 7.1792),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0011), 7.2195),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0012), 7.2195),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0009, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0010, -2.4900), 4.8045),
+    ((50.0000, -0.0010, 2.4900), (50.0000, 0.0011, -2.4900), 4.7461),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 0.0000, -2.5000), 4.3065),
+    ((50.0000, 2.5000, 0.0000), (73.0000, 25.0000, -18.0000), 27.1492),
+    ((50.0000, 2.5000, 0.0000), (61.0000, -5.0000, 29.0000), 22.8977),
+    ((50.0000, 2.5000, 0.0000), (56.0000, -27.0000, -3.0000), 31.9030),
+    ((50.0000, 2.5000, 0.0000), (58.0000, 24.0000, 15.0000), 19.4535),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.1736, 0.5854), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2972, 0.0000), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 1.8634, 0.5757), 1.0000),
+    ((50.0000, 2.5000, 0.0000), (50.0000, 3.2592, 0.3350), 1.0000),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((63.0109, -31.0961, -5.8663), (62.8187, -29.7946, -4.0864), 1.2630),
+    ((61.2901, 3.7196, -5.3901), (61.4292, 2.2480, -4.9620), 1.8731),
+    ((35.0831, -44.1164, 3.7933), (35.0232, -40.0716, 1.5901), 1.8645),
+    ((22.7233, 20.0904, -46.6940), (23.0331, 14.9730, -42.5619), 2.0373),
+    ((36.4612, 47.8580, 18.3852), (36.2715, 50.5065, 21.2231), 1.4146),
+    ((90.8027, -2.0831, 1.4410), (91.1528, -1.6435, 0.0447), 1.4441),
+    ((90.9257, -0.5406, -0.9208), (88.6381, -0.8985, -0.7239), 1.5381),
+    ((6.7747, -0.2908, -2.4247), (5.8714, -0.0985, -2.2286), 0.6377),
+    ((2.0776, 0.0795, -1.1350), (0.9033, -0.0636, -0.5514), 0.9082),
+]
+
+needs_numpy = pytest.mark.skipif(perceptual.numpy is None, reason="NumPy isn't installed")
+
+# TESTS
+
+
+@pytest.mark.parametrize("lab1, lab2, expected", SHARMA)
+def test_delta_e_matches_published_data(lab1, lab2, expected):
+    assert perceptual.delta_e(lab1, lab2) == pytest.approx(expected, abs=5e-5)
+    # The difference is the same both ways round.
+    assert perceptual.delta_e(lab2, lab1) == pytest.approx(expected, abs=5e-5)
+
+
+@needs_numpy
+def test_delta_e_batch_matches_published_data():
+    # (Pairs 10 and 14 have hues exactly opposite each other, the one case with no shorter arc between them.)
+    for lab1, lab2, expected in SHARMA:
+        result = perceptual.delta_e_batch(lab1, perceptual.numpy.array([lab2]))
+        assert float(result[0]) == pytest.approx(expected, abs=5e-5)
+
+
+@needs_numpy
+def test_delta_e_batch_matches_delta_e():
+    rng = random.Random(0)
+    for _ in range(20):
+        lab1 = perceptual.to_lab(tuple(rng.randrange(0x100) for _ in range(3)))
+        others = [perceptual.to_lab(tuple(rng.randrange(0x100) for _ in range(3))) for _ in range(500)]
+        # Include small differences in every direction, as the game uses.
+        others += [tuple(value + rng.uniform(-2, 2) for value in lab1) for _ in range(500)]
+        # And colors with no chroma (no hue at all).
+        others += [(rng.uniform(0, 100), 0.0, 0.0), (lab1[0], 0.0, 0.0)]
+        results = perceptual.delta_e_batch(lab1, perceptual.numpy.array(others))
+        for lab2, result in zip(others, results):
+            assert float(result) == pytest.approx(perceptual.delta_e(lab1, lab2), rel=1e-9, abs=1e-9)
+
+
+def test_to_lab():
+    assert perceptual.to_lab((255, 255, 255)) == pytest.approx((100, 0, 0), abs=1e-3)
+    assert perceptual.to_lab((0, 0, 0)) == pytest.approx((0, 0, 0), abs=1e-9)
+    assert perceptual.to_lab((255, 0, 0)) == pytest.approx((53.2408, 80.0925, 67.2032), abs=1e-3)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_generated_differences_are_close_to_the_target(monkeypatch, use_numpy):
+    if (use_numpy and perceptual.numpy is None):
+        pytest.skip("NumPy isn't installed")
+    if (not use_numpy):
+        monkeypatch.setattr(perceptual, "numpy", None)
+    generator = perceptual.PerceptualGenerator(random.Random(3))
+    for level in (3, 10, 40):
+        target = perceptual.target_difference(level, 1.0)
+        for _ in range(20):
+            puzzle = generator.generate(level, 1.0)
+            assert puzzle.color != puzzle.different_color
+            difference = perceptual.delta_e(perceptual.to_lab(puzzle.color), perceptual.to_lab(puzzle.different_color))
+            assert difference == pytest.approx(target, rel=0.25)
@@ -0,0 +1,117 @@
+# Visage
+# a color game by Conor Eager
+# Tests for player profiles (profiles.py).
+
+# IMPORTS
+# Import threading for saving from several threads at once
+import threading
+
+# Import pytest for checking errors
+import pytest
+
+# Import the modules being tested
+import profiles
+import storage
+
+# TESTS
+
+
+def test_create_rename_delete(tmp_path):
+    store = profiles.ProfileStore(str(tmp_path))
+    assert store.profiles() == [] and store.current() is None
+
+    alice = store.create(" Alice ")
+    bob = store.create("bob", dict(storage.DEFAULTS, highscore=12))
+    assert store.profiles() == [(alice, "Alice"), (bob, "bob")]
+    assert store.load(alice) == storage.DEFAULTS
+    assert store.load(bob)["highscore"] == 12
+
+    store.rename(bob, "Bob")
+    assert store.name(bob) == "Bob"
+    store.select(bob)
+    assert store.current() == bob
+
+    store.delete(bob)
+    assert store.profiles() == [(alice, "Alice")]
+    assert store.current() == alice
+    assert not (tmp_path / f"profile-{bob}.json").exists()
+    # IDs aren't reused.
+    assert store.create("Bob") not in (alice, bob)
+
+
+def test_invalid_names_and_missing_profiles(tmp_path):
+    store = profiles.ProfileStore(str(tmp_path))
+    alice = store.create("Alice")
+    for name in ("", "   ", "x" * (profiles.MAX_NAME + 1), "ALICE"):
+        with pytest.raises(profiles.ProfileError):
+            store.create(name)
+    # Renaming a player to their own name (in any case) is allowed.
+    store.rename(alice, "alice")
+    with pytest.raises(profiles.ProfileError):
+        store.rename("999999", "Zed")
+    with pytest.raises(profiles.ProfileError):
+        store.select("999999")
+    with pytest.raises(profiles.ProfileError):
+        store.delete("999999")
+
+
+def test_changes_from_other_copies_are_seen(tmp_path):
+    store = profiles.ProfileStore(str(tmp_path))
+    other = profiles.ProfileStore(str(tmp_path))
+    alice = store.create("Alice")
+    assert other.profiles() == [(alice, "Alice")]
+    bob = other.create("Bob")
+    assert store.name(bob) == "Bob"
+    with pytest.raises(profiles.ProfileError):
+        store.create("bob")
+
+
+def test_save_keeps_the_higher_highscore(tmp_path):
+    store = profiles.ProfileStore(str(tmp_path))
+    location = store.location(store.create("Alice"))
+    store.save(location, dict(storage.DEFAULTS, highscore=40, difficulty=2.0))
+    # Another copy of the game, started before that score, saves its own settings and a lower score.
+    store.save(location, dict(storage.DEFAULTS, highscore=10, difficulty=0.5))
+    fields = storage.load(location)
+    assert fields["highscore"] == 40 and fields["difficulty"] == 0.5
+    store.save(location, dict(storage.DEFAULTS, highscore=50))
+    assert storage.load(location)["highscore"] == 50
+
+
+def test_reset_highscore_persists(tmp_path):
+    store = profiles.ProfileStore(str(tmp_path))
+    location = store.location(store.create("Alice"))
+    store.save(location, dict(storage.DEFAULTS, highscore=42))
+    # "Reset Highscore" sets the score back to 3 and counts the reset.
+    store.save(location, dict(storage.DEFAULTS, highscore=3, resets=1))
+    assert storage.load(location)["highscore"] == 3
+    # Another copy of the game, which still has the score from before the reset, doesn't bring it back.
+    store.save(location, dict(storage.DEFAULTS, highscore=42, difficulty=2.0))
+    fields = storage.load(location)
+    assert (fields["highscore"], fields["resets"], fields["difficulty"]) == (3, 1, 2.0)
+    # Scores after the reset are kept as usual.
+    store.save(location, dict(storage.DEFAULTS, highscore=8, resets=1))
+    store.save(location, dict(storage.DEFAULTS, highscore=5, resets=1))
+    assert storage.load(location)["highscore"] == 8
+
+
+def test_concurrent_saves_keep_the_best_score(tmp_path):
+    location = profiles.ProfileStore(str(tmp_path)).location("000001")
+    stores = [profiles.ProfileStore(str(tmp_path)) for _ in range(4)]
+
+    def save(store, scores):
+        for score in scores:
+            store.save(location, dict(storage.DEFAULTS, highscore=score))
+
+    threads = [threading.Thread(target=save, args=(store, range(i, 100, 4))) for i, store in enumerate(stores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert storage.load(location)["highscore"] == 99
+
+
+def test_invalid_index(tmp_path):
+    (tmp_path / "index.json").write_text("{}")
+    with pytest.raises(profiles.ProfileError):
+        profiles.ProfileStore(str(tmp_path)).profiles()
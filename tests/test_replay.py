@@ -0,0 +1,82 @@
+# Visage
+# a color game by Conor Eager
+# Tests for session logs & replays (replay.py).
+
+# IMPORTS
+# Import random for choosing the clicks
+import random
+
+# Import pytest for checking errors and running the same test for each color model
+import pytest
+
+# Import the modules being tested
+import replay
+import storage
+
+# FUNCTIONS
+
+
+def play(settings, seed=1, clicks=40):
+    """Play a game as a player would (mostly right, sometimes wrong), logging it.
+
+    Returns:
+        tuple: The session log, and the finished game state.
+    """
+    session = replay.Session(seed, settings, started=0.0)
+    now = [0.0]
+    state = session.new_game(clock=lambda: now[0])
+    rng = random.Random(seed)
+    for number in range(clicks):
+        if (state.over):
+            break
+        puzzle = state.puzzle
+        row, col = puzzle.row, puzzle.col
+        if (rng.random() < 0.2):
+            row = (row + 1) % puzzle.level
+        now[0] = number * 0.75
+        session.record(number * 750, row, col, puzzle)
+        state.click(row, col)
+    return session, state
+
+
+def settings(**changes):
+    """Make a game's settings, as the game window logs them."""
+    return dict(storage.DEFAULTS, deck=None, **changes)
+
+# TESTS
+
+
+@pytest.mark.parametrize("color_model, adaptive", [("classic", False), ("perceptual", False), ("classic", True)])
+def test_logged_session_replays_the_same_game(color_model, adaptive):
+    session, state = play(settings(color_model=color_model, adaptive=adaptive))
+    logged = replay.Session.decode(session.encode())
+    assert (logged.seed, logged.settings, logged.clicks) == (session.seed, session.settings, session.clicks)
+
+    result = replay.replay(logged)
+    assert result.mismatches == []
+    assert result.clicks == len(session.clicks)
+    assert (result.level, result.score) == (state.level, state.score)
+
+
+def test_changed_settings_are_caught():
+    session, _ = play(settings())
+    session.settings["difficulty"] = 2.0
+    assert replay.replay(session).mismatches
+
+
+def test_save_and_load(tmp_path):
+    session, _ = play(settings())
+    location = replay.store(session, str(tmp_path))
+    loaded = replay.Session.load(location)
+    assert loaded.clicks == session.clicks and loaded.started == session.started
+
+
+def test_invalid_logs():
+    session, _ = play(settings(), clicks=3)
+    raw = session.encode()
+    with pytest.raises(replay.SessionFormatError):
+        replay.Session.decode(raw[:-1])
+    with pytest.raises(replay.SessionFormatError):
+        replay.Session.decode(b"{}\n")
+    with pytest.raises(replay.SessionFormatError):
+        replay.Session.decode(b"not a log")
@@ -0,0 +1,96 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the game server (server.py).
+
+# IMPORTS
+# Import asyncio for running a real server
+import asyncio
+
+# Import json for the protocol
+import json
+
+# Import the module being tested
+import server
+
+# FUNCTIONS
+
+
+def request(game_server, sessions, **fields):
+    """Send one request straight to a server, and decode the answer."""
+    return json.loads(game_server.respond(json.dumps(fields).encode("utf-8") + b"\n", sessions))
+
+# TESTS
+
+
+def test_new_game_sends_the_whole_puzzle():
+    game_server, sessions = server.Server(), dict()
+    answer = request(game_server, sessions, op="new", seed=1, id="a")
+    assert answer["ok"] and answer["id"] == "a" and answer["level"] == 3 and not answer["over"]
+    puzzle = answer["puzzle"]
+    assert puzzle["level"] == 3 and puzzle["color"] != puzzle["different_color"]
+    assert 0 <= puzzle["row"] < 3 and 0 <= puzzle["col"] < 3
+    assert game_server.open_sessions == 1
+
+
+def test_playing_a_game():
+    game_server, sessions = server.Server(), dict()
+    answer = request(game_server, sessions, op="new", seed=2, difficulty=5.0)
+    number, puzzle = answer["session"], answer["puzzle"]
+    answer = request(game_server, sessions, op="click", session=number, row=puzzle["row"], col=puzzle["col"])
+    assert answer["correct"] and answer["level"] == 4 and answer["puzzle"]["level"] == 4
+
+    # Insane has one life: a miss ends the game, and points out the cell that was missed.
+    puzzle = answer["puzzle"]
+    answer = request(game_server, sessions, op="click", session=number,
+                     row=(puzzle["row"] + 1) % 4, col=puzzle["col"])
+    assert not answer["correct"] and answer["over"] and "puzzle" not in answer
+    assert answer["answer"] == {"row": puzzle["row"], "col": puzzle["col"]}
+    assert sessions == {} and game_server.open_sessions == 0
+
+
+def test_bad_requests_are_answered_with_errors():
+    game_server, sessions = server.Server(), dict()
+    for line in (b"not json\n", b"[]\n", b"[" * 100_000 + b"\n", b"\xff\n"):
+        answer = json.loads(game_server.respond(line, sessions))
+        assert answer["ok"] is False and answer["error"]
+    for fields in ({"op": "fly"}, {"op": "new", "difficulty": 9}, {"op": "new", "model": "hsv"},
+                   {"op": "new", "seed": "x"}, {"op": "click", "session": 1, "row": 0, "col": 0}):
+        assert request(game_server, sessions, **fields)["ok"] is False
+
+
+def test_unexpected_errors_are_answered(monkeypatch, capsys):
+    game_server, sessions = server.Server(), dict()
+
+    def broken(request, sessions):
+        raise KeyError("bug")
+    monkeypatch.setitem(game_server.operations, "stats", broken)
+    answer = request(game_server, sessions, op="stats", id=7)
+    assert answer["ok"] is False and answer["id"] == 7
+    assert "KeyError" in capsys.readouterr().err
+    # The server carries on.
+    assert request(game_server, sessions, op="new")["ok"]
+
+
+def test_connection():
+    async def run():
+        game_server = server.Server()
+        listener = await asyncio.start_server(game_server.handle, "127.0.0.1", 0, limit=server.MAX_LINE)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            # Requests can be sent without waiting for the answers, and are answered in order.
+            writer.write(b'{"op": "new", "id": 1}\n[[[\n{"op": "stats", "id": 2}\n')
+            answers = [json.loads(await reader.readline()) for _ in range(3)]
+            writer.close()
+            await writer.wait_closed()
+            # Closing the connection ends its games.
+            for _ in range(100):
+                if (game_server.connections == 0):
+                    break
+                await asyncio.sleep(0.01)
+            return answers, game_server.open_sessions
+
+    answers, open_sessions = asyncio.run(run())
+    assert [answer.get("id") for answer in answers] == [1, None, 2]
+    assert [answer["ok"] for answer in answers] == [True, False, True]
+    assert answers[2]["sessions"] == 1 and open_sessions == 0
@@ -0,0 +1,53 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the bot simulator (simulate.py).
+
+# IMPORTS
+# Import pytest for checking errors
+import pytest
+
+# Import the module being tested
+import simulate
+
+# TESTS
+
+
+def test_chance_curve():
+    bot = simulate.Bot(1.0, 0.25)
+    assert bot.chance(1.0) == 0.5
+    assert bot.chance(0.5) < 0.1 < 0.9 < bot.chance(2.0)
+    assert bot.chance(0) == 0.0
+    # A bot with no threshold sees everything.
+    assert simulate.Bot(0, 0.25).chance(0.01) == 1.0
+
+
+def test_very_sharp_bots_dont_overflow():
+    bot = simulate.Bot(1.0, 1e-9)
+    assert bot.chance(0.5) == pytest.approx(0.0)
+    assert bot.chance(1.0) == 0.5
+    assert bot.chance(2.0) == 1.0
+
+
+def test_same_games_for_the_same_seed():
+    bot = simulate.Bot(1.0, 0.25)
+    first = simulate.play_many(bot, 1.0, "classic", range(5))
+    assert first == simulate.play_many(bot, 1.0, "classic", range(5))
+    assert all(level >= 3 for level in first)
+
+
+@pytest.mark.parametrize("slope", ["0", "-1", "nan", "inf"])
+def test_slope_must_be_positive(slope):
+    with pytest.raises(SystemExit):
+        simulate.main(["--slope", slope, "--games", "1"])
+
+
+@pytest.mark.parametrize("option, value", [("--games", "0"), ("--games", "-5"), ("--difficulties", "0"),
+                                           ("--difficulties", "5,60"), ("--difficulties", "1.9"), ("--difficulties", ",")])
+def test_games_and_difficulties_must_be_in_range(option, value):
+    with pytest.raises(SystemExit):
+        simulate.main([option, value])
+
+
+def test_smallest_run(capsys):
+    assert simulate.main(["--games", "1", "--difficulties", "2,50", "--thresholds", "1", "--workers", "1"]) == 0
+    assert "Played 2 games" in capsys.readouterr().out
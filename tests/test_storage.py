@@ -0,0 +1,165 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the save file format (storage.py).
+
+# IMPORTS
+# Import json, pickle, sys and types for writing save files in the old formats
+import json
+import pickle
+import sys
+import types
+
+# Import threading for holding up the save writer
+import threading
+
+# Import pytest for checking errors
+import pytest
+
+# Import the module being tested
+import storage
+
+# FUNCTIONS
+
+
+def document(version, data):
+    """Make the contents of a JSON save file."""
+    return json.dumps({"format": storage.FORMAT_NAME, "version": version, "data": data}).encode("utf-8")
+
+
+def legacy_pickle(monkeypatch, attributes):
+    """Make the contents of a version 0 save file: a pickled game.Data object, as the old game wrote it."""
+    module = types.ModuleType("game")
+
+    class Data:
+        pass
+    Data.__module__ = "game"
+    Data.__qualname__ = "Data"
+    module.Data = Data
+    monkeypatch.setitem(sys.modules, "game", module)
+    data = Data()
+    data.__dict__.update(attributes)
+    return pickle.dumps(data)
+
+# TESTS
+
+
+def test_round_trip(tmp_path):
+    location = str(tmp_path / "save.json")
+    fields = dict(storage.DEFAULTS, highscore=12.5, difficulty=2.0)
+    storage.save(location, fields)
+    assert storage.load(location) == fields
+    # Nothing is left behind by the atomic write.
+    assert [path.name for path in tmp_path.iterdir()] == ["save.json"]
+
+
+def test_validate_fills_defaults_and_drops_unknown_fields():
+    fields = storage.validate({"highscore": 7, "unknown": 1})
+    assert fields == dict(storage.DEFAULTS, highscore=7)
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"button_outlines": "yes"},
+    {"highlight": "glow"},
+    {"color_model": "hsv"},
+    {"difficulty": True},
+    {"difficulty": 0.1},
+    {"difficulty": 5.5},
+    {"highscore": -1},
+    {"highscore": float("inf")},
+    {"feedback_time": 1.5},
+    {"feedback_time": 6000},
+    {"adaptive": 1},
+    {"resets": -1},
+    {"resets": 1.5},
+])
+def test_validate_rejects_bad_values(data):
+    with pytest.raises(storage.SaveFormatError):
+        storage.validate(data)
+
+
+def test_decode_rejects_other_files():
+    with pytest.raises(storage.SaveFormatError):
+        storage.decode(b"not json")
+    with pytest.raises(storage.SaveFormatError):
+        storage.decode(json.dumps({"format": "other"}).encode("utf-8"))
+    with pytest.raises(storage.SaveFormatError):
+        storage.decode(document(storage.SCHEMA_VERSION + 1, {}))
+    with pytest.raises(storage.SaveFormatError):
+        storage.decode(document(True, {}))
+
+
+def test_migrations_from_every_version():
+    data = {"button_outlines": True, "button_gaps": False, "highlight": "color",
+            "difficulty": 0.5, "highscore": 9}
+    # Version 1 had no color model: players from then keep the classic colors.
+    fields = storage.decode(document(1, data))
+    assert fields == dict(storage.DEFAULTS, **data, color_model="classic")
+    # Version 2 had no feedback time, version 3 no adaptive difficulty.
+    fields = storage.decode(document(2, dict(data, color_model="perceptual")))
+    assert fields["color_model"] == "perceptual" and fields["feedback_time"] == 2500
+    fields = storage.decode(document(3, dict(data, color_model="classic", feedback_time=500)))
+    assert fields["feedback_time"] == 500 and fields["adaptive"] is False
+    # Version 4 didn't count highscore resets.
+    fields = storage.decode(document(4, dict(data, color_model="classic", feedback_time=500, adaptive=True)))
+    assert fields["adaptive"] is True and fields["resets"] == 0
+
+
+def test_legacy_pickle_import(monkeypatch):
+    raw = legacy_pickle(monkeypatch, {"button_outlines": False, "button_gaps": True, "highlight": "dot",
+                                      "difficulty": 2.0, "highscore": 40, "font": ("IBM Plex Sans", 20)})
+    fields = storage.decode(raw)
+    assert fields == dict(storage.DEFAULTS, difficulty=2.0, highscore=40, color_model="classic")
+
+
+def test_legacy_pickle_refuses_other_objects():
+    # A tampered save file that would run code when unpickled.
+    raw = pickle.dumps(types.SimpleNamespace(highscore=1))
+    with pytest.raises(storage.SaveFormatError):
+        storage.decode(raw)
+
+
+def test_writer_merges_back_to_back_saves(tmp_path):
+    location = str(tmp_path / "save.json")
+    started, release = threading.Event(), threading.Event()
+    written = []
+
+    def write(location, fields):
+        started.set()
+        release.wait(5)
+        written.append(fields["highscore"])
+        storage.save(location, fields)
+
+    writer = storage.SaveWriter()
+    try:
+        first = writer.submit(location, dict(storage.DEFAULTS, highscore=1), write)
+        assert started.wait(5)
+        # While the first save is being written, the next two are merged into one.
+        second = writer.submit(location, dict(storage.DEFAULTS, highscore=2), write)
+        third = writer.submit(location, dict(storage.DEFAULTS, highscore=3), write)
+        assert second is third and second is not first
+        assert not writer.idle()
+        release.set()
+        assert writer.flush(5)
+        assert written == [1, 3]
+        assert storage.load(location)["highscore"] == 3
+        assert first.result() == location and third.result() == location
+    finally:
+        release.set()
+        writer.close()
+
+
+def test_writer_keeps_failed_saves(tmp_path):
+    location = str(tmp_path / "missing" / "save.json")
+    writer = storage.SaveWriter()
+    try:
+        future = writer.submit(location, dict(storage.DEFAULTS))
+        assert writer.flush(5)
+        assert isinstance(future.exception(), OSError)
+        failed, error = writer.take_error()
+        assert failed == location and error is future.exception()
+        assert writer.take_error() is None
+    finally:
+        writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(location, dict(storage.DEFAULTS))
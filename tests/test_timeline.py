@@ -0,0 +1,121 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the animation timeline (timeline.py).
+
+# IMPORTS
+# Import the module being tested
+import timeline
+
+# CLASSES
+
+
+class Widget:
+    """Stands in for a Tk widget: keeps the scheduled callbacks, to be run by hand with run()."""
+
+    def __init__(self):
+        self.scheduled = dict()
+        self.count = 0
+
+    def after(self, ms, callback):
+        self.count += 1
+        self.scheduled[self.count] = callback
+        return self.count
+
+    def after_cancel(self, identifier):
+        del self.scheduled[identifier]
+
+    def run(self):
+        """Run the callbacks scheduled so far, like one pass of Tk's event loop."""
+        scheduled, self.scheduled = self.scheduled, dict()
+        for callback in scheduled.values():
+            callback()
+
+
+class Clock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# FUNCTIONS
+
+
+def new_timeline():
+    widget, clock = Widget(), Clock()
+    return timeline.Timeline(widget, clock), widget, clock
+
+# TESTS
+
+
+def test_tween_runs_to_the_end():
+    line, widget, clock = new_timeline()
+    progress, finished = list(), list()
+    line.tween(100, progress.append, lambda: finished.append(True))
+    for _ in range(4):
+        clock.now += 0.04
+        widget.run()
+    assert progress[0] == 0.0 and progress[-1] == 1.0
+    assert progress == sorted(progress)
+    assert finished == [True]
+    # Nothing left to do, so no timer is left running.
+    assert line.tasks == [] and line.pending is None and widget.scheduled == {}
+
+
+def test_cancel_tween_mid_run():
+    line, widget, clock = new_timeline()
+    progress, finished = list(), list()
+    task = line.tween(100, progress.append, lambda: finished.append(True))
+    clock.now = 0.05
+    widget.run()
+    assert progress == [0.0, 0.5]
+
+    task.cancel()
+    assert line.pending is None and widget.scheduled == {}
+    clock.now = 1.0
+    widget.run()
+    assert progress == [0.0, 0.5] and finished == []
+    # Cancelling again does nothing.
+    task.cancel()
+
+
+def test_one_timer_for_many_tasks():
+    line, widget, clock = new_timeline()
+    events = list()
+    first = line.at(10, lambda: events.append("first"))
+    line.at(30, lambda: events.append("second"))
+    assert len(widget.scheduled) == 1
+    first.cancel()
+    # The other task is still waiting, so the timer keeps going.
+    assert len(widget.scheduled) == 1
+    clock.now = 0.02
+    widget.run()
+    assert events == []
+    clock.now = 0.03
+    widget.run()
+    assert events == ["second"]
+
+
+def test_callback_cancelling_another_task():
+    line, widget, clock = new_timeline()
+    events, later = list(), list()
+    line.at(5, lambda: later[0].cancel())
+    later.append(line.at(10, lambda: events.append("later")))
+    # Both are due on the same tick; the first cancels the second before it runs.
+    clock.now = 0.02
+    widget.run()
+    assert events == [] and line.tasks == []
+
+
+def test_cancel_all():
+    line, widget, clock = new_timeline()
+    events = list()
+    line.tween(50, events.append)
+    line.at(10, lambda: events.append("done"))
+    line.cancel_all()
+    assert widget.scheduled == {} and line.pending is None
+    clock.now = 1.0
+    widget.run()
+    assert events == [0.0]
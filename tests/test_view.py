@@ -0,0 +1,65 @@
+# Visage
+# a color game by Conor Eager
+# Tests for the view state (view.py).
+
+# IMPORTS
+# Import the module being tested
+import view
+
+# CLASSES
+
+
+class Widget:
+    """Stands in for a Tk widget: records every configure() call."""
+
+    def __init__(self):
+        self.calls = list()
+
+    def configure(self, **options):
+        self.calls.append(options)
+
+# TESTS
+
+
+def test_only_changed_options_are_configured():
+    screen, label = view.View(), Widget()
+    assert screen.set(label, text="Level 3", fg="white")
+    assert not screen.set(label, text="Level 3", fg="white")
+    assert screen.set(label, text="Level 4", fg="white")
+    assert label.calls == [{"text": "Level 3", "fg": "white"}, {"text": "Level 4"}]
+    assert (screen.pushed, screen.skipped) == (2, 1)
+
+
+def test_tracked_options_are_skipped():
+    screen = view.View()
+    label = screen.track(Widget(), text="", bg="black")
+    assert not screen.set(label, text="")
+    assert screen.set(label, text="Hi", bg="black")
+    assert label.calls == [{"text": "Hi"}]
+    assert screen.get(label, "bg") == "black"
+    assert screen.get(label, "fg", "white") == "white"
+
+
+def test_none_is_a_real_value():
+    screen, label = view.View(), Widget()
+    # An option set to None is still sent the first time (it may not be the widget's default).
+    assert screen.set(label, image=None)
+    assert not screen.set(label, image=None)
+    assert screen.get(label, "image", "default") is None
+
+
+def test_widgets_are_kept_apart():
+    screen, first, second = view.View(), Widget(), Widget()
+    screen.set(first, text="A")
+    assert screen.set(second, text="A")
+    assert first.calls == second.calls == [{"text": "A"}]
+
+
+def test_forget():
+    screen, first, second = view.View(), Widget(), Widget()
+    screen.set(first, text="A")
+    screen.set(second, text="B")
+    screen.forget(first)
+    assert screen.set(first, text="A") and not screen.set(second, text="B")
+    screen.forget()
+    assert screen.set(first, text="A") and screen.set(second, text="B")
@@ -0,0 +1,105 @@
+# Visage
+# a color game by Conor Eager
+# The theme: the colors, fonts and widget styles shared by every screen.
+# Fonts are named Tk fonts, created once and shared by every widget that uses them, so changing one
+# (e.g. with set_family()) updates every widget at once, instead of each widget resolving its own font.
+
+# IMPORTS
+# Import Tk's font module for named fonts
+import tkinter.font as tkfont
+
+# CONSTANTS
+
+# The colors.
+BACKGROUND = "#2b2b2b"
+FOREGROUND = "#ffffff"
+# Used for buttons that can't be pressed.
+DISABLED = "#424242"
+# Used for the cells' outlines.
+OUTLINE = "#d9d9d9"
+# Used for good, middling and bad things (e.g. Easy, Normal and Hard, or correct & incorrect clicks).
+GOOD = "#33d17a"
+WARNING = "#f6d32d"
+BAD = "#e01b24"
+# Used behind the timings overlay.
+OVERLAY = "#000000"
+
+# The font families.
+FAMILY = "IBM Plex Sans"
+MONO_FAMILY = "IBM Plex Mono"
+
+# Widget styles, to pass to a widget's constructor or configure() with **.
+# Normal text on the background.
+NORMAL = {"bg": BACKGROUND, "fg": FOREGROUND}
+# The chosen option, in a row of option buttons.
+SELECTED = {"bg": FOREGROUND, "fg": BACKGROUND}
+
+# The fonts created so far, by (family, size, weight). See font().
+_fonts = dict()
+
+# The Tk window the fonts belong to, once there is one. See setup().
+_root = None
+
+# FUNCTIONS
+
+
+def setup(root):
+    """Start using named fonts, once the Tk window has been created.
+    Until this is called (e.g. in the benchmarks, which can run without a display), font() gives plain font tuples,
+    which Tk resolves itself.
+
+    Args:
+        root (tk.Tk): The game's window.
+    """
+    global _root
+    _root = root
+
+
+def font(size=0, weight="normal", family=None):
+    """Get a font. Each font is only created the first time it is asked for,
+    and the same one is shared by every widget after that.
+
+    Args:
+        size (int, optional): The size, in points. Defaults to 0 (Tk's default size).
+        weight (str, optional): "normal" or "bold". Defaults to "normal".
+        family (str, optional): The font family. Defaults to FAMILY.
+
+    Returns:
+        tkfont.Font: The font (or a font tuple, before setup() is called).
+    """
+    if (family is None):
+        family = FAMILY
+    if (_root is None):
+        return (family, size, weight)
+    key = (family, size, weight)
+    if (key not in _fonts):
+        _fonts[key] = tkfont.Font(
+            _root, family=family, size=size, weight=weight)
+    return _fonts[key]
+
+
+def cell_font(level):
+    """Get the font for the dots drawn on a grid's cells, sized to fit them.
+
+    Args:
+        level (int): The number of rows and columns in the grid.
+
+    Returns:
+        tkfont.Font: The font.
+    """
+    return font(round(100/level))
+
+
+def set_family(family):
+    """Change the family of every font in the normal family. Every widget using them is updated by Tk at once.
+
+    Args:
+        family (str): The new font family.
+    """
+    global FAMILY
+    for (old_family, size, weight), named_font in list(_fonts.items()):
+        if (old_family == FAMILY):
+            named_font.configure(family=family)
+            del _fonts[(old_family, size, weight)]
+            _fonts[(family, size, weight)] = named_font
+    FAMILY = family
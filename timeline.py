@@ -0,0 +1,142 @@
+# Visage
+# a color game by Conor Eager
+# The animation timeline: one place to schedule timed events & animations (tweens), driven by a single Tk timer,
+# so everything still waiting to happen on a screen can be cancelled at once when the screen changes.
+# This module doesn't use Tk directly (it is given a widget to schedule its ticks with), so it can be used without a display.
+
+# IMPORTS
+# Import time for the clock
+import time
+
+# CLASSES
+
+
+class Task:
+    """A single event or animation on the timeline. Returned by Timeline.tween() and Timeline.at(),
+    so it can be cancelled.
+    """
+    __slots__ = ("timeline", "start", "duration", "update", "done", "cancelled")
+
+    def __init__(self, timeline, start, duration, update, done):
+        self.timeline = timeline
+        self.start = start
+        self.duration = duration
+        self.update = update
+        self.done = done
+        self.cancelled = False
+
+    def progress(self, now):
+        """Work out how far through the task is.
+
+        Args:
+            now (float): The current time, in seconds.
+
+        Returns:
+            float: From 0 (just started) to 1 (finished).
+        """
+        if (self.duration <= 0):
+            return 1.0
+        return min(1.0, (now - self.start) / self.duration)
+
+    def cancel(self):
+        """Cancel the task. Its update and done callbacks won't be called again."""
+        self.timeline.cancel(self)
+
+
+class Timeline:
+    """This class runs timed events & animations.
+    However many tasks are waiting, only one timer is scheduled with Tk: each tick moves every task on,
+    and the timer stops when there's nothing left to do.
+    """
+
+    # The time between ticks, in milliseconds (about 60 per second).
+    TICK = 16
+
+    def __init__(self, widget, clock=time.perf_counter):
+        """Create a timeline.
+
+        Args:
+            widget (tk.Widget): Any widget, used to schedule the ticks (with after()).
+            clock (function, optional): The clock to use, in seconds. Defaults to time.perf_counter.
+        """
+        self.widget = widget
+        self.clock = clock
+        self.tasks = list()
+        # The scheduled tick, if there is one.
+        self.pending = None
+
+    def tween(self, duration, update=None, done=None):
+        """Start an animation.
+
+        Args:
+            duration (int): How long the animation lasts, in milliseconds.
+            update (function, optional): Called straight away with 0, then on every tick with how far through the
+            animation is (0 to 1), and finally with 1. Defaults to None.
+            done (function, optional): Called once the animation has finished. Defaults to None.
+
+        Returns:
+            Task: The animation, which can be cancelled.
+        """
+        task = Task(self, self.clock(), duration / 1000, update, done)
+        self.tasks.append(task)
+        if (update):
+            update(0.0)
+        if (self.pending is None):
+            self.pending = self.widget.after(Timeline.TICK, self.tick)
+        return task
+
+    def at(self, delay, callback):
+        """Call a function after a delay.
+
+        Args:
+            delay (int): How long to wait, in milliseconds.
+            callback (function): The function to call.
+
+        Returns:
+            Task: The event, which can be cancelled.
+        """
+        return self.tween(delay, done=callback)
+
+    def tick(self):
+        """Move every task on. Tasks that have finished are removed, and their done callbacks called.
+        """
+        self.pending = None
+        now = self.clock()
+        for task in list(self.tasks):
+            # An earlier task's callback may have cancelled this one.
+            if (task.cancelled):
+                continue
+            progress = task.progress(now)
+            if (task.update):
+                task.update(progress)
+            if (progress >= 1 and not task.cancelled):
+                self.tasks.remove(task)
+                task.cancelled = True
+                if (task.done):
+                    task.done()
+
+        if (self.tasks and self.pending is None):
+            self.pending = self.widget.after(Timeline.TICK, self.tick)
+
+    def cancel(self, task):
+        """Cancel a task.
+
+        Args:
+            task (Task): The task to cancel.
+        """
+        if (not task.cancelled):
+            task.cancelled = True
+            self.tasks.remove(task)
+        if (not self.tasks and self.pending is not None):
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+
+    def cancel_all(self):
+        """Cancel every task, e.g. when the screen they belong to is left.
+        """
+        for task in self.tasks:
+            task.cancelled = True
+        self.tasks = list()
+        if (self.pending is not None):
+            self.widget.after_cancel(self.pending)
+            self.pending = None
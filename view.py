@@ -0,0 +1,88 @@
+# Visage
+# a color game by Conor Eager
+# The view state: remembers the options last given to each widget, so a screen can work out what every widget should
+# look like from the game's data as often as it likes, while only the options that actually changed are sent to Tk.
+# Every configure() is a round trip from Python to Tcl, even when nothing changes, so skipping them keeps
+# screens that update on every keystroke or click cheap.
+# This module doesn't use Tk directly (it is given the widgets to configure), so it can be used without a display.
+
+# CONSTANTS
+
+# Stands in for an option that hasn't been set through the view yet, so it's never mistaken for a real value.
+UNSET = object()
+
+# CLASSES
+
+
+class View:
+    """This class keeps the options last set on each of a screen's widgets.
+    Screens declare how their widgets should look with set(); only the options that differ from what the
+    widget already has are passed to its configure(), and widgets that don't change aren't touched at all.
+    All of a widget's changes should go through the view, or it won't know what the widget really shows.
+    """
+
+    def __init__(self):
+        # The options set on each widget so far, by widget.
+        self.applied = dict()
+        # How many configure() calls were made, and how many were skipped as nothing had changed.
+        self.pushed = 0
+        self.skipped = 0
+
+    def track(self, widget, **options):
+        """Record the options a widget was created with, without configuring it.
+
+        Args:
+            widget (tk.Widget): The widget.
+            **options: The options it was created with.
+
+        Returns:
+            tk.Widget: The widget, so it can be tracked as it's created.
+        """
+        self.applied.setdefault(widget, dict()).update(options)
+        return widget
+
+    def set(self, widget, **options):
+        """Make sure a widget has the given options, configuring only those that have changed.
+
+        Args:
+            widget (tk.Widget): The widget.
+            **options: The options it should have (e.g. text, bg, fg, state).
+
+        Returns:
+            bool: True if the widget was configured, False if it already had these options.
+        """
+        applied = self.applied.setdefault(widget, dict())
+        changed = {option: value for option, value in options.items()
+                   if applied.get(option, UNSET) != value}
+        if (not changed):
+            self.skipped += 1
+            return False
+        widget.configure(**changed)
+        applied.update(changed)
+        self.pushed += 1
+        return True
+
+    def get(self, widget, option, default=None):
+        """Get an option last set on a widget, without asking Tk.
+
+        Args:
+            widget (tk.Widget): The widget.
+            option (str): The option's name.
+            default (optional): Returned if the option hasn't been set through the view. Defaults to None.
+
+        Returns:
+            The option's value.
+        """
+        value = self.applied.get(widget, dict()).get(option, UNSET)
+        return default if value is UNSET else value
+
+    def forget(self, widget=None):
+        """Forget the options set on a widget (e.g. once it's destroyed), or on every widget.
+
+        Args:
+            widget (tk.Widget, optional): The widget to forget. Defaults to None (every widget).
+        """
+        if (widget is None):
+            self.applied = dict()
+        else:
+            self.applied.pop(widget, None)